@@ -1,20 +1,50 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf import FlaskForm
-from wtforms import StringField, FloatField, IntegerField, SelectField, TextAreaField
+from wtforms import Form, FieldList, FormField
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, FloatField, IntegerField, SelectField, TextAreaField, BooleanField, DateField
 from wtforms.validators import DataRequired, NumberRange, Regexp, Email, Length, Optional, URL
 from flask_caching import Cache
+from werkzeug.datastructures import MultiDict
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex, CreateTable
 import os
+import io
+import csv
+import json
+import hmac
+import shutil
+import tempfile
+import click
 import logging
-from datetime import date, datetime
+from itertools import islice
+from datetime import date, datetime, timezone
 
-# Importa a função calculate_amortization do módulo loan_simulation
-from loan_simulation import calculate_amortization
+# Importa o cache de simulações, que encapsula calculate_amortization (módulo loan_simulation)
+from simulation_cache import SimulationCache
+from loan_simulation import (calculate_amortization, calculate_amortization_summary, calculate_amortization_summary_batch, iter_amortization,
+                             calculate_sensitivity_grid, solve_max_principal, solve_max_principal_batch,
+                             solve_min_term_batch)
+from bulk_simulation import run_bulk_simulation, format_results
+from variable_rate_simulation import RATE_MODELS, run_variable_rate_simulation
+from prepayment_simulation import AMORTIZATION_SYSTEMS, PREPAYMENT_MODES, calculate_segmented_amortization
+from company_catalog import CompanyCatalog, decode_cursor, encode_cursor
+from company_import import IMPORT_FORMATS, import_companies, parse_company_json, read_company_rows
+from rate_history import backfill_rate_history, rates_as_of, watch_rate_changes
+from traffic_recorder import TrafficRecorder
+from conditional_requests import conditional, make_etag, source_stamp
+from db_engine import REPLICA_BIND, RoutingSession, configure_sqlite, engine_options, read_only, use_primary
+from request_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetrics
+from queue_logging import RouteSamplingFilter, setup_queue_logging
+from outbound_queue import STATUSES as OUTBOX_STATUSES, DeliveryWorker, LogSender, OutboundQueue, SmtpSender
 
 # --- Configuração de Logging ---
 # Configura o logger para exibir mensagens INFO ou superiores, com formato detalhado.
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
+# Log de acesso ('Acessando rota ...'): o único amostrado por LOG_SAMPLE_RATES; auditoria e erros ficam em `logger`
+access_logger = logging.getLogger(f'{__name__}.access')
 
 
 # --- Configuração do Aplicativo ---
@@ -23,10 +53,114 @@ class Config:
     # URI do banco de dados, prioriza variável de ambiente 'DATABASE_URL' ou usa SQLite local.
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Desativa o rastreamento de modificações do SQLAlchemy para economizar memória.
+    # Pool de conexões (por processo; ignorado pelo SQLite em memória). pool_pre_ping descarta conexões
+    # derrubadas pelo servidor antes de usá-las; pool_recycle renova conexões antigas (em segundos).
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    }
+    # PRAGMAs aplicados a cada conexão SQLite: WAL deixa leitores e escritor trabalharem em paralelo.
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    # Réplica de leitura opcional: as consultas das rotas GET somente leitura (decorador read_only) vão para ela.
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
     # Chave secreta para segurança de sessões e CSRF. Obtém da variável de ambiente ou gera uma aleatória.
     SECRET_KEY = os.environ.get('SECRET_KEY', os.urandom(32))
-    CACHE_TYPE = 'SimpleCache'  # Tipo de cache a ser usado (cache em memória simples).
+    # Backend de cache. 'SimpleCache' é por processo (cada worker do gunicorn tem sua cópia);
+    # 'FileSystemCache' e 'RedisCache' são compartilhados entre os workers.
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
     CACHE_DEFAULT_TIMEOUT = 300  # Tempo de expiração padrão para itens em cache (5 minutos).
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'financiaai:')  # Evita colisões em backends compartilhados.
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'financiaai-cache'))  # FileSystemCache.
+    # RedisCache (requer o pacote 'redis'); aceita qualquer servidor compatível com o protocolo Redis.
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # Páginas em cache. A página inicial é invalidada a cada alteração de financeira, então pode ter TTL longo.
+    INDEX_CACHE_TIMEOUT = int(os.environ.get('INDEX_CACHE_TIMEOUT', 3600))
+    STATIC_PAGE_CACHE_TIMEOUT = int(os.environ.get('STATIC_PAGE_CACHE_TIMEOUT', 86400))
+    # Cache HTTP (ETag/304): por quanto tempo navegadores e CDNs usam as páginas estáticas sem revalidar.
+    # A página inicial é sempre revalidada (no-cache), respondendo 304 enquanto o catálogo não mudar.
+    HTTP_STATIC_PAGE_MAX_AGE = int(os.environ.get('HTTP_STATIC_PAGE_MAX_AGE', 3600))
+    # Entra nos ETags calculados sem renderizar; padrão: a modificação mais recente do código e dos templates.
+    HTTP_CACHE_SALT = os.environ.get('HTTP_CACHE_SALT')
+    # Intervalo (s) entre as verificações do catálogo de financeiras em memória contra o banco, para ver
+    # alterações feitas por outros workers ou processos (0 = a cada requisição).
+    CATALOG_REVALIDATE_SECONDS = float(os.environ.get('CATALOG_REVALIDATE_SECONDS', 2))
+    # Fragmentos de template em cache (ex: lista de financeiras da simulação, por versão do catálogo).
+    FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 3600))
+    # Cache de resultados de simulação (LRU local por processo + cache compartilhado do Flask-Caching).
+    SIMULATION_CACHE_SIZE = int(os.environ.get('SIMULATION_CACHE_SIZE', 512))  # Máximo de entradas locais.
+    SIMULATION_CACHE_TIMEOUT = int(os.environ.get('SIMULATION_CACHE_TIMEOUT', 600))  # Expiração no cache compartilhado.
+    SIMULATION_CACHE_EVICTION = os.environ.get('SIMULATION_CACHE_EVICTION', 'lru')  # Política de descarte: 'lru' ou 'fifo'.
+    COMPARISON_MAX_RESULTS = 100  # Máximo de financeiras exibidas no ranking da comparação.
+    INDEX_PAGE_SIZE = 50  # Financeiras por página na página inicial (paginação por chave, parâmetro 'after').
+    # Busca/autocompletar de financeiras (índice de prefixos em memória): resultados padrão e máximo.
+    COMPANY_SEARCH_DEFAULT_RESULTS = 10
+    COMPANY_SEARCH_MAX_RESULTS = 50
+    # Acima deste número de financeiras, a simulação troca a lista completa por um campo de busca.
+    COMPANY_SELECT_MAX_OPTIONS = 200
+    API_SCHEDULE_PAGE_SIZE = 60  # Linhas da tabela de amortização por página na API JSON (padrão).
+    API_SCHEDULE_MAX_PAGE_SIZE = 360  # Máximo de linhas por página na API JSON.
+    BULK_SIMULATION_CHUNK_SIZE = 5000  # Linhas de CSV simuladas por bloco na simulação em lote.
+    # Processos usados pela rota de simulação em lote (1 = no próprio worker do gunicorn).
+    BULK_SIMULATION_WORKERS = int(os.environ.get('BULK_SIMULATION_WORKERS', 1))
+    # Grade de sensibilidade taxa × prazo: máximo de taxas por grade e eixo padrão (taxa atual ± 5 passos de 0,1 p.p.).
+    SENSITIVITY_MAX_RATES = 50
+    SENSITIVITY_RATE_STEP = 0.1
+    SENSITIVITY_RATE_POINTS = 11
+    SENSITIVITY_PANEL_TERMS = (5, 10, 15, 20, 25, 30)  # Prazos (anos) exibidos no painel da página de simulação.
+    # Simulação de Monte Carlo com taxa variável (trajetórias processadas em blocos; >1 processo usa um pool).
+    VARIABLE_RATE_DEFAULT_PATHS = 2000
+    VARIABLE_RATE_MAX_PATHS = int(os.environ.get('VARIABLE_RATE_MAX_PATHS', 100000))
+    VARIABLE_RATE_CHUNK_SIZE = 5000
+    VARIABLE_RATE_WORKERS = int(os.environ.get('VARIABLE_RATE_WORKERS', 1))
+    # Máximo de trajetórias nas faixas mês a mês (percentis exatos até esse número; acima dele, de uma amostra).
+    VARIABLE_RATE_BAND_PATHS = int(os.environ.get('VARIABLE_RATE_BAND_PATHS', 5000))
+    PREPAYMENT_MAX_EVENTS = 120  # Máximo de amortizações antecipadas por simulação.
+    # Pré-aprovação: maior valor que cabe na parcela-alvo (informada ou renda * comprometimento).
+    PRE_APPROVAL_COMMITMENT_RATIO = 0.30  # Comprometimento máximo da renda mensal com a parcela.
+    PRE_APPROVAL_REFERENCE_PAYMENT = 2000.0  # Parcela de referência dos valores exibidos na página inicial.
+    PRE_APPROVAL_REFERENCE_YEARS = 10  # Prazo (anos) de referência dos valores exibidos na página inicial.
+    PRE_APPROVAL_MAX_PRINCIPAL = 1000000  # Limite dos valores pré-aprovados (o mesmo da simulação).
+    COMPANY_IMPORT_BATCH_SIZE = 500  # Financeiras validadas, verificadas e inseridas por bloco na importação em lote.
+    # Token exigido pela API de importação (cabeçalho 'Authorization: Bearer <token>'). Sem token
+    # configurado, a API fica desativada (404) e a importação só é feita pelo comando 'flask import-companies'.
+    COMPANY_IMPORT_API_TOKEN = os.environ.get('COMPANY_IMPORT_API_TOKEN')
+    COMPANY_IMPORT_MAX_BYTES = int(os.environ.get('COMPANY_IMPORT_MAX_BYTES', 5 * 1024 * 1024))  # Tamanho máximo do envio.
+    # Instrumentação por rota exposta em /metrics (formato texto do Prometheus). As sondas podem ser
+    # desativadas individualmente: 'latency', 'sql', 'engine', 'template' e 'cache' (separadas por vírgula).
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_PROBES = os.environ.get('METRICS_PROBES', 'latency,sql,engine,template,cache')
+    # Logging: 'queue' entrega os registros a uma thread em segundo plano (formatação e escrita fora da
+    # requisição); 'sync' escreve diretamente, como o basicConfig padrão.
+    LOG_MODE = os.environ.get('LOG_MODE', 'queue')
+    # Amostragem das linhas INFO do log de acesso por endpoint, ex: 'index=0.1,terms=0.01'. Avisos, erros e as
+    # demais mensagens (ex: inclusão e importação de financeiras) são sempre mantidos.
+    LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+    LOG_SAMPLE_DEFAULT = float(os.environ.get('LOG_SAMPLE_DEFAULT', 1.0))  # Taxa dos endpoints não listados.
+    # Fila persistente (SQLite) das mensagens de contato, enviadas em segundo plano com novas tentativas.
+    OUTBOX_DATABASE = os.environ.get('OUTBOX_DATABASE')  # Padrão: outbox.db na pasta instance do aplicativo.
+    # 'thread': cada processo que atende requisições consome a fila em uma thread, iniciada na primeira
+    # requisição (comandos da CLI e scripts não iniciam a thread); 'none': apenas 'flask deliver-messages'.
+    OUTBOX_WORKER = os.environ.get('OUTBOX_WORKER', 'thread')
+    OUTBOX_MAX_ATTEMPTS = 8  # Tentativas antes de desistir da mensagem (status 'failed').
+    OUTBOX_BACKOFF_BASE = 30  # Espera (s) antes da segunda tentativa; dobra a cada falha.
+    OUTBOX_BACKOFF_MAX = 3600  # Espera máxima (s) entre tentativas.
+    OUTBOX_POLL_INTERVAL = 5  # Intervalo (s) de verificação da fila (mensagens de outros processos e novas tentativas).
+    # Servidor SMTP. Sem MAIL_SERVER as mensagens são apenas registradas no log.
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 25))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '0') == '1'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_SENDER = os.environ.get('MAIL_SENDER', 'nao-responda@financiaai.com.br')
+    CONTACT_RECIPIENT = os.environ.get('CONTACT_RECIPIENT', 'contato@financiaai.com.br')
+    # Gravação opcional do tráfego em JSONL, para reprodução em testes de carga (benchmarks/replay_traffic.py).
+    TRAFFIC_RECORDER_ENABLED = os.environ.get('TRAFFIC_RECORDER_ENABLED', '0') == '1'
+    TRAFFIC_RECORDER_PATH = os.environ.get('TRAFFIC_RECORDER_PATH')  # Padrão: requests.jsonl na pasta instance.
+    TRAFFIC_RECORDER_EXCLUDE = ('static', 'metrics')  # Endpoints não gravados.
 
 
 class DevelopmentConfig(Config):
@@ -40,17 +174,142 @@ class ProductionConfig(Config):
     """Configurações específicas para o ambiente de produção."""
     DEBUG = False  # Desativa o modo de depuração em produção para segurança e performance.
     ENV = 'production'  # Define o ambiente como produção.
+    # Mais conexões por worker e um cache maior de SQL compilado (query_cache_size; padrão do SQLAlchemy: 500).
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'query_cache_size': 1200,
+    }
     # Para produção, DATABASE_URL deve ser uma string de conexão para um banco de dados persistente.
     # Ex: app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL_PROD')
 
 
+# Configurações disponíveis, selecionadas pela variável de ambiente APP_CONFIG
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+
 # --- Inicialização do Flask e Extensões ---
 app = Flask(__name__)
-# Carrega a configuração. Pode ser alterado para ProductionConfig em um ambiente de produção.
-app.config.from_object(DevelopmentConfig)
+# Carrega a configuração: APP_CONFIG=production em produção (padrão: development).
+app_config_name = os.environ.get('APP_CONFIG', 'development')
+if app_config_name not in CONFIGS:
+    raise ValueError(f"APP_CONFIG inválido: '{app_config_name}'. Use um de: {', '.join(CONFIGS)}.")
+app.config.from_object(CONFIGS[app_config_name])
+# Opções do pool adaptadas ao banco (o SQLite em memória não aceita as de tamanho do pool)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+if app.config['DATABASE_REPLICA_URL']:
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: dict(
+        engine_options(app.config['DATABASE_REPLICA_URL'], app.config['SQLALCHEMY_ENGINE_OPTIONS']),
+        url=app.config['DATABASE_REPLICA_URL']
+    )}
+
+# Logging em segundo plano (QueueHandler/QueueListener) ou síncrono, com amostragem por rota
+if app.config['LOG_MODE'] == 'queue':
+    # Cada processo (inclusive os workers criados por fork, ex: gunicorn --preload) inicia o próprio listener
+    log_queue_handler = setup_queue_logging(app.config['LOG_SAMPLE_RATES'], app.config['LOG_SAMPLE_DEFAULT'],
+                                            sampled_loggers=[access_logger.name])
+else:
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(RouteSamplingFilter(app.config['LOG_SAMPLE_RATES'], app.config['LOG_SAMPLE_DEFAULT'],
+                                              loggers=[access_logger.name]))
 
-db = SQLAlchemy(app)
+if not app.config['HTTP_CACHE_SALT']:
+    app.config['HTTP_CACHE_SALT'] = source_stamp(app.root_path)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})  # Leituras das rotas read_only na réplica
+with app.app_context():
+    for engine in db.engines.values():
+        configure_sqlite(engine, app.config['SQLITE_JOURNAL_MODE'], app.config['SQLITE_SYNCHRONOUS'])
 cache = Cache(app)
+# Métricas por rota; com METRICS_ENABLED desligado nenhuma sonda é registrada e timing() não faz nada.
+request_metrics = RequestMetrics(probes=app.config['METRICS_PROBES'])
+if app.config['METRICS_ENABLED']:
+    request_metrics.init_app(app, cache)
+simulation_cache = SimulationCache(
+    cache,
+    maxsize=app.config['SIMULATION_CACHE_SIZE'],
+    timeout=app.config['SIMULATION_CACHE_TIMEOUT'],
+    eviction=app.config['SIMULATION_CACHE_EVICTION'],
+    compute=request_metrics.timed(calculate_amortization)  # Só as falhas do cache chegam ao motor
+)
+if app.config['METRICS_ENABLED'] and request_metrics.enabled('cache'):
+    request_metrics.gauge('simulation_cache_hit_ratio', "Taxa de acertos do cache de simulações (local).",
+                          lambda: simulation_cache.stats()['hit_ratio'])
+    request_metrics.gauge('simulation_cache_entries', "Entradas no nível local do cache de simulações.",
+                          lambda: simulation_cache.stats()['size'])
+
+
+def make_mail_sender():
+    """Cria o remetente da fila de mensagens: SMTP se MAIL_SERVER estiver configurado, senão apenas log."""
+    if not app.config['MAIL_SERVER']:
+        return LogSender()
+    return SmtpSender(
+        app.config['MAIL_SERVER'],
+        app.config['MAIL_PORT'],
+        sender=app.config['MAIL_SENDER'],
+        recipient=app.config['CONTACT_RECIPIENT'],
+        username=app.config['MAIL_USERNAME'],
+        password=app.config['MAIL_PASSWORD'],
+        use_tls=app.config['MAIL_USE_TLS']
+    )
+
+
+# Fila de envio das mensagens de contato: a requisição só grava a mensagem; o envio fica com o worker
+os.makedirs(app.instance_path, exist_ok=True)
+outbound_queue = OutboundQueue(
+    app.config['OUTBOX_DATABASE'] or os.path.join(app.instance_path, 'outbox.db'),
+    max_attempts=app.config['OUTBOX_MAX_ATTEMPTS'],
+    backoff_base=app.config['OUTBOX_BACKOFF_BASE'],
+    backoff_max=app.config['OUTBOX_BACKOFF_MAX']
+)
+delivery_worker = DeliveryWorker(outbound_queue, make_mail_sender(), poll_interval=app.config['OUTBOX_POLL_INTERVAL'])
+
+
+@app.before_request
+def start_delivery_worker():
+    """
+    Inicia a thread de envio na primeira requisição atendida pelo processo (e não na importação do
+    módulo): cada worker do gunicorn, mesmo com --preload, tem a sua própria thread.
+    """
+    if app.config['OUTBOX_WORKER'] == 'thread' and not delivery_worker.is_running():
+        delivery_worker.start()
+
+
+def outbox_depth():
+    """Mensagens na fila de envio por status, nos rótulos 'status' do Prometheus."""
+    stats = outbound_queue.stats()
+    return {(status,): stats[status] for status in OUTBOX_STATUSES}
+
+
+def outbox_latency_quantiles():
+    """Latência de entrega das últimas mensagens enviadas, nos rótulos 'quantile' do Prometheus."""
+    stats = outbound_queue.stats()
+    return {('0.5',): stats['latency_p50_seconds'], ('0.95',): stats['latency_p95_seconds']}
+
+
+if app.config['METRICS_ENABLED']:
+    request_metrics.gauge('outbox_messages', "Mensagens na fila de envio, por status.",
+                          outbox_depth, label_names=('status',))
+    request_metrics.gauge('outbox_oldest_pending_seconds', "Idade da mensagem pendente mais antiga.",
+                          lambda: outbound_queue.stats()['oldest_pending_seconds'])
+    request_metrics.gauge('outbox_delivery_latency_seconds', "Latência de entrega (criação até envio).",
+                          outbox_latency_quantiles, label_names=('quantile',))
+
+# Gravação do tráfego (opcional): a requisição só enfileira o registro; a escrita é feita por uma thread
+traffic_recorder = None
+if app.config['TRAFFIC_RECORDER_ENABLED']:
+    traffic_recorder = TrafficRecorder(
+        app,
+        path=app.config['TRAFFIC_RECORDER_PATH'] or os.path.join(app.instance_path, 'requests.jsonl'),
+        exclude=app.config['TRAFFIC_RECORDER_EXCLUDE']
+    )
 
 
 # --- Modelos de Banco de Dados ---
@@ -78,9 +337,9 @@ class FinanceCompany(db.Model):
         website_url (str): URL do website.
     """
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)  # Índice para ordenação e busca por nome
     code = db.Column(db.String(10), unique=True, nullable=False)
-    basic_interest_rate = db.Column(db.Float, nullable=False)
+    basic_interest_rate = db.Column(db.Float, nullable=False, index=True)  # Índice para ordenação por taxa
     last_updated = db.Column(db.Date, nullable=False, default=date.today)
     cnpj = db.Column(db.String(18), unique=True, nullable=False) # Added CNPJ column
     country = db.Column(db.String(50), nullable=True) # Alterado para nullable=True para campos opcionais
@@ -123,6 +382,37 @@ class FinanceCompany(db.Model):
         }
 
 
+class InterestRateHistory(db.Model):
+    """
+    Histórico (somente de inclusão) das taxas de juros das financeiras. A taxa atual continua
+    desnormalizada em FinanceCompany.basic_interest_rate (e no catálogo em memória); o histórico
+    só é consultado nas simulações com data de referência (as_of).
+    Atributos:
+        id (int): Chave primária.
+        company_id (int): Financeira.
+        annual_rate (float): Taxa de juros anual em porcentagem.
+        effective_date (date): Data a partir da qual a taxa vale.
+        recorded_at (datetime): Momento em que a linha foi gravada.
+    """
+    __table_args__ = (
+        # Consulta "taxa vigente em uma data": por financeira, a maior data de vigência até a data
+        db.Index('ix_interest_rate_history_company_date', 'company_id', 'effective_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('finance_company.id'), nullable=False)
+    annual_rate = db.Column(db.Float, nullable=False)
+    effective_date = db.Column(db.Date, nullable=False, default=date.today)
+    recorded_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<InterestRateHistory {self.company_id} {self.effective_date}: {self.annual_rate}>"
+
+
+# Cada inserção de financeira ou alteração de taxa pelo ORM grava uma nova linha no histórico
+watch_rate_changes(FinanceCompany, InterestRateHistory)
+
+
 # --- Formulários WTForms ---
 class LoanSimulationForm(FlaskForm):
     """Formulário para simulação de empréstimos."""
@@ -139,6 +429,228 @@ class LoanSimulationForm(FlaskForm):
         Optional(),  # Campo opcional
         NumberRange(min=0, message="A amortização extra não pode ser negativa.")
     ], default=0.00)
+    sensitivity = BooleanField('Mostrar grade de sensibilidade (taxa × prazo)')
+    as_of = DateField('Taxa vigente em (opcional)', validators=[Optional()])
+
+
+class SimulationApiForm(LoanSimulationForm):
+    """
+    Parâmetros da API JSON de simulação. Reaproveita as regras de LoanSimulationForm, mas recebe
+    a financeira pelo id (sem lista de opções) e aceita a paginação da tabela de amortização.
+    """
+    class Meta:
+        csrf = False  # API sem sessão/cookies, dispensa o token CSRF.
+
+    company = IntegerField('Financeira', validators=[DataRequired(message="Informe a financeira (id).")])
+    offset = IntegerField('Deslocamento', validators=[
+        Optional(),
+        NumberRange(min=0, message="O deslocamento não pode ser negativo.")
+    ], default=0)
+    limit = IntegerField('Limite', validators=[
+        Optional(),
+        NumberRange(min=0, message="O limite não pode ser negativo.")
+    ])
+    format = SelectField('Formato', choices=[('json', 'JSON'), ('ndjson', 'NDJSON')], validators=[Optional()],
+                         default='json')
+
+
+class LoanComparisonForm(FlaskForm):
+    """Formulário para comparar uma mesma simulação entre todas as financeiras."""
+    class Meta:
+        csrf = False  # Enviado via GET e sem efeitos colaterais, dispensa o token CSRF.
+
+    principal = FloatField('Valor do Empréstimo (R$)', validators=[
+        DataRequired(message="O valor do empréstimo é obrigatório."),
+        NumberRange(min=100, max=1000000, message="O valor deve ser entre R$100 e R$1.000.000.")
+    ])
+    years = IntegerField('Prazo (anos)', validators=[
+        DataRequired(message="O prazo em anos é obrigatório."),
+        NumberRange(min=1, max=30, message="O prazo deve ser entre 1 e 30 anos.")
+    ])
+    extra_amortization = FloatField('Amortização Extra (R$ - opcional)', validators=[
+        Optional(),  # Campo opcional
+        NumberRange(min=0, message="A amortização extra não pode ser negativa.")
+    ], default=0.00)
+    as_of = DateField('Taxa vigente em (opcional)', validators=[Optional()])
+
+
+class SensitivityGridForm(FlaskForm):
+    """
+    Parâmetros da API da grade de sensibilidade: as taxas variam em torno da taxa da financeira
+    (rate_points taxas espaçadas de rate_step p.p.) e os prazos vão de years_min a years_max.
+    """
+    class Meta:
+        csrf = False  # API sem sessão/cookies, dispensa o token CSRF.
+
+    company = IntegerField('Financeira', validators=[DataRequired(message="Informe a financeira (id).")])
+    principal = FloatField('Valor do Empréstimo (R$)', validators=[
+        DataRequired(message="O valor do empréstimo é obrigatório."),
+        NumberRange(min=100, max=1000000, message="O valor deve ser entre R$100 e R$1.000.000.")
+    ])
+    extra_amortization = FloatField('Amortização Extra (R$ - opcional)', validators=[
+        Optional(),
+        NumberRange(min=0, message="A amortização extra não pode ser negativa.")
+    ], default=0.00)
+    rate_step = FloatField('Passo da Taxa (p.p.)', validators=[
+        Optional(),
+        NumberRange(min=0.01, max=5, message="O passo da taxa deve ser entre 0,01 e 5 pontos percentuais.")
+    ])
+    rate_points = IntegerField('Número de Taxas', validators=[
+        Optional(),
+        NumberRange(min=1, max=Config.SENSITIVITY_MAX_RATES,
+                    message=f"O número de taxas deve ser entre 1 e {Config.SENSITIVITY_MAX_RATES}.")
+    ])
+    years_min = IntegerField('Prazo Mínimo (anos)', validators=[
+        Optional(),
+        NumberRange(min=1, max=30, message="O prazo deve ser entre 1 e 30 anos.")
+    ], default=1)
+    years_max = IntegerField('Prazo Máximo (anos)', validators=[
+        Optional(),
+        NumberRange(min=1, max=30, message="O prazo deve ser entre 1 e 30 anos.")
+    ], default=30)
+    years_step = IntegerField('Passo do Prazo (anos)', validators=[
+        Optional(),
+        NumberRange(min=1, max=29, message="O passo do prazo deve ser entre 1 e 29 anos.")
+    ], default=1)
+    as_of = DateField('Taxa vigente em (opcional)', validators=[Optional()])
+
+
+class VariableRateSimulationForm(SimulationApiForm):
+    """
+    Parâmetros da simulação com taxa variável: os mesmos da API de simulação, mais o modelo de
+    evolução da taxa (a taxa inicial é a da financeira), o número de trajetórias e a semente.
+    """
+    model = SelectField('Modelo de Taxa', choices=[(model, model) for model in RATE_MODELS], validators=[Optional()],
+                        default='random_walk')
+    volatility = FloatField('Volatilidade (p.p. ao ano)', validators=[
+        Optional(),
+        NumberRange(min=0, max=50, message="A volatilidade deve ser entre 0 e 50 pontos percentuais.")
+    ], default=1.0)
+    mean_reversion = FloatField('Velocidade de Reversão à Média', validators=[
+        Optional(),
+        NumberRange(min=0, max=10, message="A reversão à média deve ser entre 0 e 10.")
+    ], default=0.5)
+    long_term_rate = FloatField('Taxa de Longo Prazo (%)', validators=[
+        Optional(),
+        NumberRange(min=0, max=100, message="A taxa de longo prazo deve ser entre 0% e 100%.")
+    ])
+    paths = IntegerField('Trajetórias', validators=[
+        Optional(),
+        NumberRange(min=1, max=Config.VARIABLE_RATE_MAX_PATHS,
+                    message=f"O número de trajetórias deve ser entre 1 e {Config.VARIABLE_RATE_MAX_PATHS}.")
+    ])
+    seed = IntegerField('Semente', validators=[
+        Optional(),
+        NumberRange(min=0, message="A semente não pode ser negativa.")
+    ])
+
+
+class PrepaymentForm(Form):
+    """Uma amortização antecipada (subformulário de PrepaymentSimulationForm)."""
+    month = IntegerField('Mês', validators=[
+        DataRequired(message="O mês da amortização é obrigatório."),
+        NumberRange(min=1, max=360, message="O mês deve ser entre 1 e 360.")
+    ])
+    amount = FloatField('Valor (R$)', validators=[
+        DataRequired(message="O valor da amortização é obrigatório."),
+        NumberRange(min=0.01, message="O valor da amortização deve ser positivo.")
+    ])
+
+
+class PrepaymentSimulationForm(FlaskForm):
+    """Parâmetros da simulação com amortizações antecipadas pontuais (Tabela Price ou SAC)."""
+    class Meta:
+        csrf = False  # API sem sessão/cookies, dispensa o token CSRF.
+
+    company = IntegerField('Financeira', validators=[DataRequired(message="Informe a financeira (id).")])
+    principal = FloatField('Valor do Empréstimo (R$)', validators=[
+        DataRequired(message="O valor do empréstimo é obrigatório."),
+        NumberRange(min=100, max=1000000, message="O valor deve ser entre R$100 e R$1.000.000.")
+    ])
+    years = IntegerField('Prazo (anos)', validators=[
+        DataRequired(message="O prazo em anos é obrigatório."),
+        NumberRange(min=1, max=30, message="O prazo deve ser entre 1 e 30 anos.")
+    ])
+    system = SelectField('Sistema de Amortização', choices=[(system, system) for system in AMORTIZATION_SYSTEMS],
+                         validators=[Optional()], default='price')
+    mode = SelectField('Após a Amortização', choices=[(mode, mode) for mode in PREPAYMENT_MODES],
+                       validators=[Optional()], default='reduce_payment')
+    prepayments = FieldList(FormField(PrepaymentForm), max_entries=Config.PREPAYMENT_MAX_EVENTS)
+    schedule = BooleanField('Incluir Tabela de Amortização')
+    as_of = DateField('Taxa vigente em (opcional)', validators=[Optional()])
+
+
+class PreApprovalForm(FlaskForm):
+    """
+    Parâmetros da API de pré-aprovação. A parcela-alvo é informada diretamente (payment) ou
+    calculada pela renda (income * commitment_ratio). Com years, retorna o maior valor por
+    financeira; com principal, o menor prazo.
+    """
+    class Meta:
+        csrf = False  # API sem sessão/cookies, dispensa o token CSRF.
+
+    company = IntegerField('Financeira', validators=[Optional()])
+    payment = FloatField('Parcela Máxima (R$)', validators=[
+        Optional(),
+        NumberRange(min=1, message="A parcela máxima deve ser positiva.")
+    ])
+    income = FloatField('Renda Mensal (R$)', validators=[
+        Optional(),
+        NumberRange(min=1, message="A renda mensal deve ser positiva.")
+    ])
+    commitment_ratio = FloatField('Comprometimento da Renda', validators=[
+        Optional(),
+        NumberRange(min=0.01, max=1, message="O comprometimento deve ser entre 0.01 e 1.")
+    ])
+    years = IntegerField('Prazo (anos)', validators=[
+        Optional(),
+        NumberRange(min=1, max=30, message="O prazo deve ser entre 1 e 30 anos.")
+    ])
+    principal = FloatField('Valor do Empréstimo (R$)', validators=[
+        Optional(),
+        NumberRange(min=100, max=1000000, message="O valor deve ser entre R$100 e R$1.000.000.")
+    ])
+    extra_amortization = FloatField('Amortização Extra (R$ - opcional)', validators=[
+        Optional(),
+        NumberRange(min=0, message="A amortização extra não pode ser negativa.")
+    ], default=0.00)
+
+    def validate(self, extra_validators=None):
+        """Exige a parcela (ou a renda) e exatamente um entre prazo e valor do empréstimo."""
+        if not super().validate(extra_validators):
+            return False
+        if self.payment.data is None and self.income.data is None:
+            self.payment.errors.append("Informe a parcela máxima (payment) ou a renda mensal (income).")
+            return False
+        if (self.years.data is None) == (self.principal.data is None):
+            self.years.errors.append("Informe o prazo (years) ou o valor do empréstimo (principal), mas não ambos.")
+            return False
+        return True
+
+
+class CompanySearchForm(FlaskForm):
+    """Parâmetros da busca/autocompletar de financeiras."""
+    class Meta:
+        csrf = False  # Enviado via GET e sem efeitos colaterais, dispensa o token CSRF.
+
+    q = StringField('Busca', validators=[
+        DataRequired(message="Informe o nome, o código ou o CNPJ a buscar."),
+        Length(max=100, message="A busca deve ter no máximo 100 caracteres.")
+    ])
+    limit = IntegerField('Resultados', validators=[
+        Optional(),
+        NumberRange(min=1, max=Config.COMPANY_SEARCH_MAX_RESULTS,
+                    message=f"O número de resultados deve ser entre 1 e {Config.COMPANY_SEARCH_MAX_RESULTS}.")
+    ])
+
+
+class BulkSimulationForm(FlaskForm):
+    """Formulário de envio de um CSV de cenários para simulação em lote."""
+    file = FileField('Arquivo CSV', validators=[
+        FileRequired(message="Selecione um arquivo CSV."),
+        FileAllowed(['csv'], message="Envie um arquivo no formato CSV.")
+    ])
+    output_format = SelectField('Formato de Saída', choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], default='csv')
 
 
 class AddCompanyForm(FlaskForm):
@@ -206,23 +718,302 @@ class ContactForm(FlaskForm):
 
 
 # --- Funções Utilitárias ---
-# A função calculate_amortization foi movida para loan_simulation.py
+# A função calculate_amortization foi movida para loan_simulation.py e é acessada via simulation_cache.
+
+def load_company_catalog():
+    """Carrega, em uma única consulta, apenas as colunas do catálogo de financeiras mantido em memória."""
+    # Sempre do banco principal: o snapshot fica associado à versão atual e não pode vir atrasado da réplica
+    with use_primary():
+        return db.session.query(
+            FinanceCompany.id, FinanceCompany.name, FinanceCompany.code,
+            FinanceCompany.basic_interest_rate, FinanceCompany.last_updated, FinanceCompany.cnpj
+        ).all()
+
+
+def load_company_catalog_stamp():
+    """
+    Marca do catálogo no banco, obtida em uma única consulta agregada: muda quando uma financeira é
+    incluída ou removida (contagem, maior id), quando uma taxa é alterada (soma das taxas, data da
+    última atualização) ou quando um nome é trocado por outro de tamanho diferente.
+    """
+    with use_primary():
+        return tuple(db.session.query(
+            db.func.count(FinanceCompany.id), db.func.max(FinanceCompany.id), db.func.max(FinanceCompany.last_updated),
+            db.func.sum(FinanceCompany.basic_interest_rate), db.func.sum(db.func.length(FinanceCompany.name))
+        ).one())
+
+
+# Snapshot em memória do catálogo, reconstruído apenas quando uma financeira é inserida, alterada ou removida
+# (após o commit neste processo ou, nos demais, quando a marca do banco muda).
+company_catalog = CompanyCatalog(load_company_catalog, cache, stamp_loader=load_company_catalog_stamp,
+                                 revalidate_interval=app.config['CATALOG_REVALIDATE_SECONDS'])
+company_catalog.watch(FinanceCompany)
+
+
+# Variações da página inicial em cache (uma por valor do parâmetro 'sort')
+INDEX_SORT_OPTIONS = ('name', 'rate')
+
+
+def index_cache_key(sort_by=None, after=None):
+    """Chave de cache da página inicial para a ordenação e o cursor informados (ou os da requisição atual)."""
+    if sort_by is None:
+        sort_by = request.args.get('sort', 'name')
+        after = request.args.get('after')
+    if sort_by not in INDEX_SORT_OPTIONS:
+        sort_by = 'name'
+    key = f"view/index/sort={sort_by}"
+    return f"{key}/after={after}" if after else key
+
+
+def is_index_next_page():
+    """Só a primeira página de cada ordenação fica no cache (é a única limpa por purge_company_pages)."""
+    return bool(request.args.get('after'))
+
+
+def index_validators():
+    """
+    Validadores HTTP da página inicial, calculados sem renderizá-la: o ETag vem do conteúdo do catálogo
+    (e da ordenação) e o Last-Modified da data de atualização mais recente entre as financeiras. Nenhum
+    dos dois depende do processo que atende a requisição (a versão do catálogo, sim, com SimpleCache),
+    então todos os workers respondem com o mesmo ETag e o 304 vale qualquer que seja o worker.
+    """
+    catalog = company_catalog.snapshot()
+    etag = make_etag(app.config['HTTP_CACHE_SALT'], index_cache_key(), catalog.digest, datetime.now().year)
+    last_updated = catalog.last_updated
+    last_modified = (datetime.combine(last_updated, datetime.min.time(), tzinfo=timezone.utc)
+                     if last_updated else None)
+    return etag, last_modified
+
+
+@company_catalog.on_change
+def purge_company_pages():
+    """Remove do cache todas as variações da página inicial após uma alteração no catálogo."""
+    cache.delete_many(*[index_cache_key(sort_by) for sort_by in INDEX_SORT_OPTIONS])
+    logger.info("Cache da página inicial invalidado após alteração no catálogo de financeiras.")
+
+
+def ensure_indexes():
+    """Cria os índices declarados em FinanceCompany que ainda não existam (ex: bancos criados antes dos índices)."""
+    for index in FinanceCompany.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+
+def ensure_rate_history():
+    """
+    Cria a tabela do histórico de taxas (e seu índice) se ainda não existir e inclui no histórico as
+    financeiras que não têm nenhuma linha. Roda na inicialização do aplicativo, também sob o gunicorn:
+    sem a tabela, os eventos de watch_rate_changes fariam falhar toda inclusão ou alteração de financeira
+    em bancos criados antes do histórico. IF NOT EXISTS deixa vários workers iniciarem ao mesmo tempo.
+
+    Returns:
+        int: Financeiras incluídas no histórico.
+    """
+    history_table = InterestRateHistory.__table__
+    with db.engine.begin() as connection:
+        connection.execute(CreateTable(history_table, if_not_exists=True))
+        for index in history_table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    if not db.inspect(db.engine).has_table(FinanceCompany.__tablename__):
+        return 0  # Banco vazio: as tabelas são criadas por 'flask init-db'
+    backfilled = backfill_rate_history(db.session, FinanceCompany, InterestRateHistory)
+    db.session.commit()
+    return backfilled
+
+
+with app.app_context():
+    try:
+        ensure_rate_history()
+    except SQLAlchemyError as e:
+        # Não impede a inicialização (ex: banco somente leitura); 'flask init-db' repete a verificação
+        db.session.rollback()
+        logger.warning(f"Não foi possível verificar o histórico de taxas na inicialização: {e}")
+
+
+def run_company_import(rows, batch_size=None):
+    """
+    Importa financeiras em lote em uma única transação: ou todas as linhas válidas e inéditas são
+    gravadas, ou nenhuma (em caso de erro inesperado).
+
+    Args:
+        rows (iterable): Dicionários com os campos do formulário AddCompanyForm.
+        batch_size (int): Linhas por bloco (padrão: COMPANY_IMPORT_BATCH_SIZE).
+
+    Returns:
+        dict: Relatório da importação (ver company_import.import_companies).
+    """
+    try:
+        report = import_companies(
+            rows, FinanceCompany, db.session, AddCompanyForm,
+            batch_size=batch_size or app.config['COMPANY_IMPORT_BATCH_SIZE'],
+            history_model=InterestRateHistory
+        )
+        if report['inserted']:
+            # O INSERT em lote não dispara os eventos do ORM; marca a sessão para atualizar o catálogo no commit
+            company_catalog.mark_dirty(db.session)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(
+        f"Importação de financeiras concluída: Inseridas={report['inserted']}, "
+        f"Inválidas={len(report['invalid'])}, Duplicadas={len(report['duplicates'])}")
+    return report
+
+
+def load_rates_by_code():
+    """Retorna as taxas de juros anuais de todas as financeiras indexadas pelo código (do catálogo em memória)."""
+    return company_catalog.snapshot().rates_by_code
+
+
+def companies_as_of(companies, as_of):
+    """
+    Retorna as financeiras com a taxa vigente na data `as_of`, resolvida em uma única consulta ao
+    histórico. Sem data (ou com a data de hoje), usa as taxas atuais do catálogo em memória.
+    Financeiras sem taxa registrada até a data (ex: cadastradas depois) ficam de fora.
+
+    Raises:
+        ValueError: Se a data for futura.
+    """
+    if as_of is None or as_of == date.today():
+        return list(companies)
+    if as_of > date.today():
+        raise ValueError("A data de referência da taxa não pode ser futura.")
+    rates = rates_as_of(db.session, InterestRateHistory, as_of, [company.id for company in companies])
+    return [company._replace(basic_interest_rate=rates[company.id]) for company in companies if company.id in rates]
+
+
+def company_as_of(company, as_of):
+    """
+    Retorna a financeira com a taxa vigente na data `as_of` (ver companies_as_of).
+
+    Raises:
+        ValueError: Se a data for futura ou não houver taxa registrada para a financeira até a data.
+    """
+    companies = companies_as_of([company], as_of)
+    if not companies:
+        raise ValueError(f"Não há taxa registrada para a financeira {company.name} em {as_of:%d/%m/%Y}.")
+    return companies[0]
+
+
+def rank_company_offers(companies, principal_value, years_value, extra_amortization_value=0.0):
+    """
+    Simula o mesmo empréstimo em todas as financeiras de uma só vez e as ordena pelo custo total.
+
+    Args:
+        companies (list): Financeiras com os atributos id, name, code e basic_interest_rate.
+        principal_value (float): O valor principal do empréstimo.
+        years_value (int): O prazo do empréstimo em anos.
+        extra_amortization_value (float): Valor de amortização extra por mês (opcional).
+
+    Returns:
+        list: Dicionários com os dados de cada financeira e da simulação, do menor para o maior custo total.
+    """
+    if not companies:
+        return []
+    with request_metrics.timing('engine'):
+        totals = calculate_amortization_summary_batch(
+            principal_value,
+            [company.basic_interest_rate for company in companies],
+            years_value,
+            extra_amortization_value or 0.0
+        )
+    ranking = []
+    # Ordenação estável: empates no custo total mantêm a ordem recebida (por nome).
+    for position, index in enumerate(totals['total_paid'].argsort(kind='stable'), start=1):
+        company = companies[index]
+        ranking.append({
+            'position': position,
+            'id': company.id,
+            'name': company.name,
+            'code': company.code,
+            'basic_interest_rate': company.basic_interest_rate,
+            'monthly_payment': float(totals['first_payment'][index]),
+            'total_interest': float(totals['total_interest'][index]),
+            'total_paid': float(totals['total_paid'][index]),
+            'payoff_month': int(totals['months'][index]),
+        })
+    return ranking
+
+
+def sensitivity_rate_axis(center_rate, rate_step=None, rate_points=None):
+    """
+    Monta o eixo de taxas da grade de sensibilidade: `rate_points` taxas espaçadas de `rate_step`
+    pontos percentuais, centradas na taxa informada (taxas negativas são descartadas).
+    """
+    rate_step = rate_step or app.config['SENSITIVITY_RATE_STEP']
+    rate_points = rate_points or app.config['SENSITIVITY_RATE_POINTS']
+    first = -(rate_points // 2)
+    rates = (round(center_rate + step * rate_step, 6) for step in range(first, first + rate_points))
+    return [rate for rate in rates if rate >= 0]
+
+
+def build_sensitivity_grid(principal_value, center_rate, years_values, extra_amortization_value=0.0,
+                           rate_step=None, rate_points=None):
+    """
+    Calcula a grade de sensibilidade taxa × prazo em torno da taxa informada.
+
+    Returns:
+        dict: Taxa central ('center_rate'), eixos 'rates' e 'years' e matrizes (linhas = taxas, colunas = prazos) 'monthly_payment',
+            'total_interest' e 'total_paid', arredondadas em centavos e prontas para JSON/templates.
+    """
+    with request_metrics.timing('engine'):
+        grid = calculate_sensitivity_grid(
+            principal_value,
+            sensitivity_rate_axis(center_rate, rate_step, rate_points),
+            years_values,
+            extra_amortization_value or 0.0
+        )
+    return {
+        'center_rate': center_rate,
+        'rates': grid['rates'].tolist(),
+        'years': grid['years'].tolist(),
+        'monthly_payment': grid['monthly_payment'].round(2).tolist(),
+        'total_interest': grid['total_interest'].round(2).tolist(),
+        'total_paid': grid['total_paid'].round(2).tolist(),
+    }
+
+
+def calculate_pre_approvals(companies, target_payment, years_value, extra_amortization_value=0.0):
+    """
+    Calcula, em uma única chamada vetorizada, o maior valor que cada financeira pode oferecer
+    para a parcela-alvo e o prazo informados (limitado a PRE_APPROVAL_MAX_PRINCIPAL).
+
+    Args:
+        companies (list): Financeiras com os atributos id e basic_interest_rate.
+        target_payment (float): Parcela máxima.
+        years_value (int): Prazo em anos.
+        extra_amortization_value (float): Valor de amortização extra por mês (opcional).
+
+    Returns:
+        dict: Valor pré-aprovado (arredondado em centavos) indexado pelo id da financeira.
+    """
+    if not companies:
+        return {}
+    with request_metrics.timing('engine'):
+        amounts = solve_max_principal_batch(
+            target_payment,
+            [company.basic_interest_rate for company in companies],
+            years_value,
+            extra_amortization_value or 0.0
+        ).clip(0, app.config['PRE_APPROVAL_MAX_PRINCIPAL'])
+    return {company.id: round(float(amount), 2) for company, amount in zip(companies, amounts)}
+
 
 # Filtros Jinja Personalizados
 @app.template_filter('calculate_pre_approved')
 def calculate_pre_approved(interest_rate):
     """
-    Estima um valor pré-aprovado com base na taxa de juros.
-    Quanto menor a taxa, maior o valor pré-aprovado (dentro de limites).
+    Estima o valor pré-aprovado para a taxa de juros informada: o maior valor cuja parcela cabe na
+    parcela de referência (PRE_APPROVAL_REFERENCE_PAYMENT) no prazo de referência.
+    Para muitas financeiras de uma vez, prefira calculate_pre_approvals.
     """
     try:
-        # Baseado em uma lógica simples de que taxas mais baixas permitem valores maiores
-        # Assegura que o valor esteja entre 10.000 e 500.000
-        pre_approved_amount = 500000 - (interest_rate * 5000)  # Ajuste o multiplicador conforme a necessidade
-        return max(10000, min(pre_approved_amount, 500000))
+        pre_approved_amount = solve_max_principal(
+            app.config['PRE_APPROVAL_REFERENCE_PAYMENT'], interest_rate, app.config['PRE_APPROVAL_REFERENCE_YEARS'])
+        return min(pre_approved_amount, app.config['PRE_APPROVAL_MAX_PRINCIPAL'])
     except (TypeError, ValueError) as e:
         logger.error(f"Erro ao calcular valor pré-aprovado para taxa {interest_rate}: {e}")
-        return 10000  # Retorna um valor padrão em caso de erro
+        return 0.0  # Sem valor pré-aprovado em caso de erro
 
 
 @app.template_filter('dateformat')
@@ -258,50 +1049,80 @@ def internal_server_error(e):
 
 # --- Rotas do Aplicativo ---
 @app.route('/')
-@cache.cached(timeout=60, query_string=True)  # Cache de 1 minuto para a página inicial
+# 304 enquanto a versão do catálogo não mudar, sem renderizar nem ler o cache da página
+@conditional(index_validators, cache_control={'public': True, 'no_cache': True})
+# Uma entrada por ordenação; invalidada por purge_company_pages quando o catálogo muda
+@cache.cached(timeout=app.config['INDEX_CACHE_TIMEOUT'], key_prefix=index_cache_key, unless=is_index_next_page)
+@read_only
 def index():
-    """Rota da página inicial."""
-    logger.info("Acessando rota index")
-    sort_by = request.args.get('sort', 'name')  # Parâmetro de query para ordenação
-    if sort_by == 'rate':
-        companies = FinanceCompany.query.order_by(FinanceCompany.basic_interest_rate.asc()).all()
-    else:
-        companies = FinanceCompany.query.order_by(FinanceCompany.name.asc()).all()
-    return render_template('index.html', companies=companies, sort_by=sort_by)
+    """Rota da página inicial, com a lista de financeiras paginada por chave (parâmetros 'sort' e 'after')."""
+    access_logger.info("Acessando rota index")
+    sort_by = 'rate' if request.args.get('sort') == 'rate' else 'name'  # Parâmetro de query para ordenação
+    catalog = company_catalog.snapshot()  # Catálogo em memória, já ordenado por nome e por taxa
+    after = None
+    if request.args.get('after'):
+        try:
+            after = decode_cursor(request.args['after'], sort_by)
+        except ValueError:
+            logger.warning("Cursor de paginação inválido na página inicial: %s", request.args['after'])
+    companies, last_key = catalog.page(sort_by, after, app.config['INDEX_PAGE_SIZE'])
+    # Valores pré-aprovados das financeiras da página, calculados em uma única chamada vetorizada
+    pre_approval = {
+        'target_payment': app.config['PRE_APPROVAL_REFERENCE_PAYMENT'],
+        'years': app.config['PRE_APPROVAL_REFERENCE_YEARS'],
+        'amounts': calculate_pre_approvals(
+            companies, app.config['PRE_APPROVAL_REFERENCE_PAYMENT'], app.config['PRE_APPROVAL_REFERENCE_YEARS']),
+    }
+    return render_template(
+        'index.html',
+        companies=companies,
+        total_companies=len(catalog),
+        sort_by=sort_by,
+        is_first_page=after is None,
+        next_cursor=encode_cursor(last_key) if last_key else None,
+        pre_approval=pre_approval
+    )
 
 
 @app.route('/loan_simulation', methods=['GET', 'POST'])
+@read_only
 def loan_simulation():
     """Rota para a página de simulação de empréstimo."""
-    logger.info("Acessando rota loan_simulation")
+    access_logger.info("Acessando rota loan_simulation")
     form = LoanSimulationForm()
-    companies = FinanceCompany.query.all()
-    form.company.choices = [(c.id, c.name) for c in companies]  # Popula as opções da financeira
+    catalog = company_catalog.snapshot()  # Catálogo em memória: nenhuma consulta ao banco de dados
+    companies = catalog.by_name
+    form.company.choices = catalog.choices  # Popula as opções da financeira
 
     schedule = None
     summary = None
+    sensitivity = None
     # Variáveis para repopular o formulário e manter o estado da simulação
     principal_value = ''
     years_value = ''
     selected_company_id = None
     extra_amortization_value = '0.00'
+    as_of_value = ''
 
     if form.validate_on_submit():
         try:
-            company = FinanceCompany.query.get(form.company.data)
+            company = catalog.get(form.company.data)
             if not company:
                 flash("Financeira selecionada não encontrada.", 'error')
             else:
+                # Taxa vigente na data informada (histórico); sem data, a taxa atual do catálogo
+                company = company_as_of(company, form.as_of.data)
+                as_of_value = form.as_of.data.isoformat() if form.as_of.data else ''
                 # Armazena os valores para repopular o formulário
                 principal_value = f"{form.principal.data:.2f}"
                 years_value = str(form.years.data)
                 selected_company_id = form.company.data
                 extra_amortization_value = f"{form.extra_amortization.data:.2f}"
 
-                # Calcula a amortização usando a função utilitária importada
-                schedule, total_interest, total_principal_paid, total_paid = calculate_amortization(
+                # Calcula a amortização, reaproveitando resultados de simulações idênticas já feitas
+                schedule, total_interest, total_principal_paid, total_paid = simulation_cache.get_or_compute(
+                    company,
                     principal_value=form.principal.data,
-                    annual_interest_rate=company.basic_interest_rate,
                     years_value=form.years.data,
                     extra_amortization_value=form.extra_amortization.data
                 )
@@ -311,9 +1132,17 @@ def loan_simulation():
                     "total_principal": f"{total_principal_paid:.2f}",
                     "total_paid": f"{total_paid:.2f}"
                 }
+                if form.sensitivity.data:
+                    # Painel opcional: a mesma simulação variando taxa e prazo, em uma única chamada vetorizada
+                    sensitivity = build_sensitivity_grid(
+                        form.principal.data,
+                        company.basic_interest_rate,
+                        sorted(set(app.config['SENSITIVITY_PANEL_TERMS']) | {form.years.data}),
+                        form.extra_amortization.data
+                    )
                 flash('Simulação calculada com sucesso!', 'success')
-                logger.info(
-                    f"Simulação de empréstimo concluída: Principal={form.principal.data}, Anos={form.years.data}, Empresa={company.name}")
+                logger.info("Simulação de empréstimo concluída: Principal=%s, Anos=%s, Empresa=%s",
+                            form.principal.data, form.years.data, company.name)
         except ValueError as ve:
             # Captura erros de validação da função calculate_amortization
             flash(f"Erro de validação: {str(ve)}", 'error')
@@ -331,24 +1160,481 @@ def loan_simulation():
         years_value = request.form.get('years', '')
         selected_company_id = request.form.get('company', None)
         extra_amortization_value = request.form.get('extra_amortization', '0.00')
+        as_of_value = request.form.get('as_of', '')
+
+    # Catálogos grandes: campo de busca com autocompletar (/api/companies/search) no lugar da lista completa
+    use_company_search = len(catalog) > app.config['COMPANY_SELECT_MAX_OPTIONS']
+    selected_company = None
+    if use_company_search and selected_company_id:
+        try:
+            selected_company = catalog.get(int(selected_company_id))
+        except (TypeError, ValueError):
+            pass
 
     return render_template(
         'loan_simulation.html',
         form=form,
         companies=companies,
+        catalog_version=catalog.version,  # Chave do fragmento em cache com a lista de financeiras
+        use_company_search=use_company_search,
+        selected_company=selected_company,
+        fragment_cache_timeout=app.config['FRAGMENT_CACHE_TIMEOUT'],
         schedule=schedule,
         summary=summary,
+        sensitivity=sensitivity,
+        show_sensitivity=form.sensitivity.data,
         principal_value=principal_value,
         years_value=years_value,
         selected_company_id=selected_company_id,
-        extra_amortization_value=extra_amortization_value
+        extra_amortization_value=extra_amortization_value,
+        as_of_value=as_of_value
     )
 
 
+@app.route('/api/simulate', methods=['GET', 'POST'])
+def api_simulate():
+    """
+    API JSON de simulação de empréstimo.
+
+    Parâmetros (query string, formulário ou corpo JSON): company (id), principal, years,
+    extra_amortization, offset, limit e format ('json' ou 'ndjson').
+    - format=json: retorna o sumário e uma página da tabela de amortização (offset/limit).
+      Com limit=0 apenas o sumário é calculado, sem montar a tabela.
+    - format=ndjson: transmite as linhas da tabela (uma por linha, em JSON) à medida que são calculadas.
+    """
+    access_logger.info("Acessando rota api_simulate")
+    params = request.get_json(silent=True) if request.is_json else None
+    formdata = MultiDict(params) if isinstance(params, dict) else request.values
+    form = SimulationApiForm(formdata=formdata)
+    if not form.validate():
+        return jsonify({'errors': form.errors}), 400
+
+    company = company_catalog.snapshot().get(form.company.data)
+    if not company:
+        return jsonify({'errors': {'company': ["Financeira não encontrada."]}}), 404
+    try:
+        company = company_as_of(company, form.as_of.data)
+    except ValueError as ve:
+        return jsonify({'errors': {'as_of': [str(ve)]}}), 400
+
+    principal = form.principal.data
+    years = form.years.data
+    extra = form.extra_amortization.data or 0.0
+    offset = form.offset.data or 0
+    limit = form.limit.data
+    company_data = {
+        'id': company.id,
+        'name': company.name,
+        'code': company.code,
+        'basic_interest_rate': company.basic_interest_rate,
+    }
+    if form.as_of.data:
+        company_data['as_of'] = form.as_of.data.isoformat()
+
+    try:
+        if form.format.data == 'ndjson':
+            rows = iter_amortization(principal, company.basic_interest_rate, years, extra)
+            rows = islice(rows, offset, offset + limit if limit is not None else None)
+            return Response(
+                stream_with_context(json.dumps(row) + '\n' for row in rows),
+                mimetype='application/x-ndjson'
+            )
+
+        limit = app.config['API_SCHEDULE_PAGE_SIZE'] if limit is None else min(limit, app.config['API_SCHEDULE_MAX_PAGE_SIZE'])
+        if limit == 0:
+            # Apenas o sumário: usa o caminho rápido que não monta a tabela
+            with request_metrics.timing('engine'):
+                total_interest, total_principal_paid, total_paid, payoff_month = calculate_amortization_summary(
+                    principal, company.basic_interest_rate, years, extra)
+            rows = []
+        else:
+            schedule, total_interest, total_principal_paid, total_paid = simulation_cache.get_or_compute(
+                company, principal_value=principal, years_value=years, extra_amortization_value=extra)
+            payoff_month = len(schedule)
+            rows = list(schedule[offset:offset + limit])
+    except ValueError as ve:
+        logger.error(f"Erro de validação na API de simulação: {ve}")
+        return jsonify({'errors': {'simulation': [str(ve)]}}), 400
+
+    return jsonify({
+        'company': company_data,
+        'summary': {
+            'principal': principal,
+            'years': years,
+            'extra_amortization': extra,
+            'total_interest': total_interest,
+            'total_principal': total_principal_paid,
+            'total_paid': total_paid,
+            'payoff_month': payoff_month,
+        },
+        'schedule': {
+            'offset': offset,
+            'limit': limit,
+            'total': payoff_month,
+            'rows': rows,
+        },
+    })
+
+
+@app.route('/api/simulate/variable_rate', methods=['GET', 'POST'])
+def api_simulate_variable_rate():
+    """
+    API JSON de simulação com taxa variável (Monte Carlo).
+
+    Parâmetros (query string, formulário ou corpo JSON): company (id; a taxa inicial é a da
+    financeira), principal, years, extra_amortization, model ('random_walk' ou 'mean_reverting'),
+    volatility, mean_reversion, long_term_rate, paths e seed. Retorna, para cada percentil, as
+    faixas mês a mês da taxa, da parcela e do saldo devedor, e os percentis dos totais. As faixas
+    usam até VARIABLE_RATE_BAND_PATHS trajetórias (informado em band_paths).
+    """
+    access_logger.info("Acessando rota api_simulate_variable_rate")
+    params = request.get_json(silent=True) if request.is_json else None
+    formdata = MultiDict(params) if isinstance(params, dict) else request.values
+    form = VariableRateSimulationForm(formdata=formdata)
+    if not form.validate():
+        return jsonify({'errors': form.errors}), 400
+
+    company = company_catalog.snapshot().get(form.company.data)
+    if not company:
+        return jsonify({'errors': {'company': ["Financeira não encontrada."]}}), 404
+    try:
+        company = company_as_of(company, form.as_of.data)  # Taxa inicial: a vigente na data, se informada
+    except ValueError as ve:
+        return jsonify({'errors': {'as_of': [str(ve)]}}), 400
+
+    try:
+        with request_metrics.timing('engine'):
+            result = run_variable_rate_simulation(
+                form.principal.data,
+                company.basic_interest_rate,
+                form.years.data,
+                form.extra_amortization.data or 0.0,
+                model=form.model.data or 'random_walk',
+                volatility=form.volatility.data if form.volatility.data is not None else 1.0,
+                mean_reversion=form.mean_reversion.data if form.mean_reversion.data is not None else 0.5,
+                long_term_rate=form.long_term_rate.data,
+                paths=form.paths.data or app.config['VARIABLE_RATE_DEFAULT_PATHS'],
+                seed=form.seed.data,
+                chunk_size=app.config['VARIABLE_RATE_CHUNK_SIZE'],
+                workers=app.config['VARIABLE_RATE_WORKERS'],
+                band_paths=app.config['VARIABLE_RATE_BAND_PATHS']
+            )
+    except ValueError as ve:
+        logger.error(f"Erro de validação na simulação com taxa variável: {ve}")
+        return jsonify({'errors': {'simulation': [str(ve)]}}), 400
+
+    def bands(values, ndigits=2):
+        """Converte uma matriz (percentis × meses) ou vetor de percentis em {'p50': ...}."""
+        return {f"p{percentile:g}": row.round(ndigits).tolist()
+                for percentile, row in zip(result['percentiles'], values)}
+
+    return jsonify({
+        'company': {
+            'id': company.id,
+            'name': company.name,
+            'code': company.code,
+            'basic_interest_rate': company.basic_interest_rate,
+        },
+        'paths': result['paths'],
+        'band_paths': result['band_paths'],
+        'months': result['months'],
+        'percentiles': result['percentiles'],
+        'rate': bands(result['rate'], 4),
+        'payment': bands(result['payment']),
+        'balance': bands(result['balance']),
+        'total_interest': bands(result['total_interest']),
+        'total_paid': bands(result['total_paid']),
+        'mean_total_interest': round(result['mean_total_interest'], 2),
+    })
+
+
+@app.route('/api/simulate/prepayments', methods=['POST'])
+def api_simulate_prepayments():
+    """
+    API JSON de simulação com amortizações antecipadas pontuais.
+
+    Corpo JSON (ou formulário): company (id), principal, years, system ('price' ou 'sac'),
+    mode ('reduce_payment' ou 'reduce_term'), prepayments (lista de {month, amount}; em formulário,
+    campos prepayments-0-month, prepayments-0-amount, ...), schedule (inclui a tabela mês a mês) e
+    as_of (opcional: usa a taxa vigente nessa data, AAAA-MM-DD).
+    O sumário é calculado trecho a trecho; a tabela só é montada quando pedida.
+    """
+    access_logger.info("Acessando rota api_simulate_prepayments")
+    params = request.get_json(silent=True) if request.is_json else None
+    if isinstance(params, dict):
+        formdata = MultiDict({key: value for key, value in params.items() if key != 'prepayments'})
+        prepayments = params.get('prepayments') or []
+        if not isinstance(prepayments, list) or not all(isinstance(item, dict) for item in prepayments):
+            return jsonify({'errors': {'prepayments': ["Informe as amortizações como uma lista de {month, amount}."]}}), 400
+        # Mesmo formato dos campos de FieldList: prepayments-<índice>-<campo>
+        for index, item in enumerate(prepayments):
+            for field in ('month', 'amount'):
+                if item.get(field) is not None:
+                    formdata[f'prepayments-{index}-{field}'] = item[field]
+    else:
+        formdata = request.values
+    try:
+        form = PrepaymentSimulationForm(formdata=formdata)
+    except IndexError:  # Mais entradas que o máximo aceito pelo FieldList
+        return jsonify({'errors': {'prepayments': [
+            f"Informe no máximo {app.config['PREPAYMENT_MAX_EVENTS']} amortizações antecipadas."]}}), 400
+    if not form.validate():
+        return jsonify({'errors': form.errors}), 400
+
+    company = company_catalog.snapshot().get(form.company.data)
+    if not company:
+        return jsonify({'errors': {'company': ["Financeira não encontrada."]}}), 404
+    try:
+        company = company_as_of(company, form.as_of.data)
+    except ValueError as ve:
+        return jsonify({'errors': {'as_of': [str(ve)]}}), 400
+
+    try:
+        with request_metrics.timing('engine'):
+            result = calculate_segmented_amortization(
+                form.principal.data,
+                company.basic_interest_rate,
+                form.years.data,
+                [(entry.month.data, entry.amount.data) for entry in form.prepayments],
+                system=form.system.data or 'price',
+                mode=form.mode.data or 'reduce_payment'
+            )
+    except ValueError as ve:
+        logger.error(f"Erro de validação na simulação com amortizações antecipadas: {ve}")
+        return jsonify({'errors': {'simulation': [str(ve)]}}), 400
+
+    summary = result.summary()
+    company_data = {
+        'id': company.id,
+        'name': company.name,
+        'code': company.code,
+        'basic_interest_rate': company.basic_interest_rate,
+    }
+    if form.as_of.data:
+        company_data['as_of'] = form.as_of.data.isoformat()
+    response = {
+        'company': company_data,
+        'principal': form.principal.data,
+        'years': form.years.data,
+        'mode': form.mode.data or 'reduce_payment',
+        'summary': {key: round(value, 2) if isinstance(value, float) else value for key, value in summary.items()},
+    }
+    if form.schedule.data:
+        response['schedule'] = result.to_schedule().to_columns(2)
+    return jsonify(response)
+
+
+@app.route('/api/sensitivity', methods=['GET', 'POST'])
+def api_sensitivity():
+    """
+    API JSON da grade de sensibilidade taxa × prazo.
+
+    Parâmetros (query string, formulário ou corpo JSON): company (id), principal, extra_amortization,
+    rate_step e rate_points (eixo de taxas em torno da taxa da financeira), years_min, years_max e
+    years_step (eixo de prazos) e as_of (opcional: o eixo de taxas fica em torno da taxa vigente
+    nessa data). Retorna a parcela, os juros totais e o custo total de cada célula.
+    """
+    access_logger.info("Acessando rota api_sensitivity")
+    params = request.get_json(silent=True) if request.is_json else None
+    formdata = MultiDict(params) if isinstance(params, dict) else request.values
+    form = SensitivityGridForm(formdata=formdata)
+    if not form.validate():
+        return jsonify({'errors': form.errors}), 400
+
+    company = company_catalog.snapshot().get(form.company.data)
+    if not company:
+        return jsonify({'errors': {'company': ["Financeira não encontrada."]}}), 404
+    try:
+        company = company_as_of(company, form.as_of.data)
+    except ValueError as ve:
+        return jsonify({'errors': {'as_of': [str(ve)]}}), 400
+
+    years_min = form.years_min.data or 1
+    years_max = form.years_max.data or 30
+    if years_min > years_max:
+        return jsonify({'errors': {'years_min': ["O prazo mínimo não pode ser maior que o prazo máximo."]}}), 400
+
+    try:
+        grid = build_sensitivity_grid(
+            form.principal.data,
+            company.basic_interest_rate,
+            list(range(years_min, years_max + 1, form.years_step.data or 1)),
+            form.extra_amortization.data,
+            rate_step=form.rate_step.data,
+            rate_points=form.rate_points.data
+        )
+    except ValueError as ve:
+        logger.error(f"Erro de validação na grade de sensibilidade: {ve}")
+        return jsonify({'errors': {'simulation': [str(ve)]}}), 400
+
+    company_data = {
+        'id': company.id,
+        'name': company.name,
+        'code': company.code,
+        'basic_interest_rate': company.basic_interest_rate,
+    }
+    if form.as_of.data:
+        company_data['as_of'] = form.as_of.data.isoformat()
+    return jsonify({
+        'company': company_data,
+        'principal': form.principal.data,
+        'extra_amortization': form.extra_amortization.data or 0.0,
+        'grid': grid,
+    })
+
+
+@app.route('/api/pre_approval', methods=['GET', 'POST'])
+def api_pre_approval():
+    """
+    API JSON de pré-aprovação (problema inverso da simulação).
+
+    Parâmetros (query string, formulário ou corpo JSON): payment (parcela máxima) ou income e
+    commitment_ratio (parcela = renda * comprometimento); years (retorna o maior valor por
+    financeira) ou principal (retorna o menor prazo por financeira); extra_amortization e
+    company (opcional; sem ele, todas as financeiras são calculadas em uma única chamada).
+    """
+    access_logger.info("Acessando rota api_pre_approval")
+    params = request.get_json(silent=True) if request.is_json else None
+    formdata = MultiDict(params) if isinstance(params, dict) else request.values
+    form = PreApprovalForm(formdata=formdata)
+    if not form.validate():
+        return jsonify({'errors': form.errors}), 400
+
+    catalog = company_catalog.snapshot()
+    if form.company.data is not None:
+        company = catalog.get(form.company.data)
+        if not company:
+            return jsonify({'errors': {'company': ["Financeira não encontrada."]}}), 404
+        companies = [company]
+    else:
+        companies = list(catalog.by_name)
+
+    if form.payment.data is not None:
+        target_payment = form.payment.data
+    else:
+        target_payment = form.income.data * (form.commitment_ratio.data or app.config['PRE_APPROVAL_COMMITMENT_RATIO'])
+    extra = form.extra_amortization.data or 0.0
+
+    offers = [{
+        'id': company.id,
+        'name': company.name,
+        'code': company.code,
+        'basic_interest_rate': company.basic_interest_rate,
+    } for company in companies]
+    if companies:
+        try:
+            if form.years.data is not None:
+                amounts = calculate_pre_approvals(companies, target_payment, form.years.data, extra)
+                for offer in offers:
+                    offer['max_principal'] = amounts[offer['id']]
+            else:
+                with request_metrics.timing('engine'):
+                    min_years = solve_min_term_batch(
+                        target_payment, form.principal.data, [company.basic_interest_rate for company in companies],
+                        extra)
+                for offer, years in zip(offers, min_years):
+                    offer['min_years'] = int(years) or None  # None: nenhum prazo até 30 anos atende à parcela
+        except ValueError as ve:
+            logger.error(f"Erro de validação na pré-aprovação: {ve}")
+            return jsonify({'errors': {'simulation': [str(ve)]}}), 400
+
+    return jsonify({
+        'target_payment': round(target_payment, 2),
+        'years': form.years.data,
+        'principal': form.principal.data,
+        'extra_amortization': extra,
+        'offers': offers,
+    })
+
+
+@app.route('/metrics')
+def metrics():
+    """Métricas por rota (latência, SQL, motor, templates e cache) no formato texto do Prometheus."""
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(request_metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route('/compare')
+@read_only
+def compare_companies():
+    """Rota para comparar uma simulação entre todas as financeiras em uma única requisição."""
+    access_logger.info("Acessando rota compare_companies")
+    form = LoanComparisonForm(formdata=request.args if request.args else None)
+    ranking = None
+    total_companies = 0
+
+    if request.args:
+        if form.validate():
+            try:
+                companies = companies_as_of(company_catalog.snapshot().by_name, form.as_of.data)
+                total_companies = len(companies)
+                ranking = rank_company_offers(
+                    companies,
+                    principal_value=form.principal.data,
+                    years_value=form.years.data,
+                    extra_amortization_value=form.extra_amortization.data
+                )[:app.config['COMPARISON_MAX_RESULTS']]
+                logger.info("Comparação concluída: Principal=%s, Anos=%s, Financeiras=%s",
+                            form.principal.data, form.years.data, total_companies)
+            except ValueError as ve:
+                flash(f"Erro de validação: {str(ve)}", 'error')
+                logger.error(f"Erro de validação na comparação: {ve}")
+        else:
+            for field, errors in form.errors.items():
+                for error in errors:
+                    flash(f"Erro no campo '{getattr(form, field).label.text}': {error}", 'error')
+
+    return render_template('compare.html', form=form, ranking=ranking, total_companies=total_companies)
+
+
+@app.route('/bulk_simulation', methods=['GET', 'POST'])
+def bulk_simulation():
+    """Rota para simular um CSV de cenários, devolvendo os resultados em streaming (CSV ou NDJSON)."""
+    access_logger.info("Acessando rota bulk_simulation")
+    form = BulkSimulationForm()
+    if form.validate_on_submit():
+        rates = load_rates_by_code()
+        output_format = form.output_format.data
+        # O Flask fecha os arquivos enviados ao fim da view, antes do streaming da resposta;
+        # por isso o CSV é copiado (em blocos) para um arquivo temporário próprio.
+        upload = tempfile.TemporaryFile()
+        shutil.copyfileobj(form.file.data.stream, upload)
+        upload.seek(0)
+        text_stream = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+        try:
+            # O cabeçalho é validado antes de iniciar a resposta, para devolver erros de formato ao usuário
+            results = run_bulk_simulation(
+                text_stream,
+                rates,
+                workers=app.config['BULK_SIMULATION_WORKERS'],
+                chunk_size=app.config['BULK_SIMULATION_CHUNK_SIZE']
+            )
+        except ValueError as ve:
+            text_stream.close()
+            flash(f"Erro no arquivo enviado: {str(ve)}", 'error')
+            logger.warning(f"CSV de simulação em lote inválido: {ve}")
+        else:
+            logger.info("Simulação em lote iniciada: Formato=%s, Financeiras=%s", output_format, len(rates))
+            extension = 'csv' if output_format == 'csv' else 'ndjson'
+            response = Response(
+                stream_with_context(format_results(results, output_format)),
+                mimetype='text/csv' if output_format == 'csv' else 'application/x-ndjson',
+                headers={'Content-Disposition': f'attachment; filename=simulacoes.{extension}'}
+            )
+            response.call_on_close(text_stream.close)
+            return response
+    elif request.method == 'POST':  # Formulário submetido, mas não validou (erros de validação do WTForms)
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(f"Erro no campo '{getattr(form, field).label.text}': {error}", 'error')
+    return render_template('bulk_simulation.html', form=form)
+
+
 @app.route('/add_company', methods=['GET', 'POST'])
 def add_company():
     """Rota para adicionar uma nova instituição financeira."""
-    logger.info("Acessando rota add_company")
+    access_logger.info("Acessando rota add_company")
     form = AddCompanyForm()
     if form.validate_on_submit():
         try:
@@ -384,7 +1670,7 @@ def add_company():
                 db.session.add(new_company)
                 db.session.commit()  # Salva no banco de dados
                 flash('Financeira adicionada com sucesso!', 'success')
-                logger.info(f"Nova empresa adicionada: {form.name.data}")
+                logger.info("Nova empresa adicionada: %s", form.name.data)
                 return redirect(url_for('loan_simulation'))  # Redireciona para evitar re-envio do formulário
         except Exception as e:
             db.session.rollback()  # Desfaz alterações no banco em caso de erro
@@ -399,45 +1685,116 @@ def add_company():
     return render_template('add_company.html', form=form)
 
 
+@app.route('/api/companies/import', methods=['POST'])
+def api_import_companies():
+    """
+    API de importação de financeiras em lote.
+
+    Aceita um arquivo enviado no campo 'file' (.csv com cabeçalho ou .json) ou um corpo JSON com a
+    lista de financeiras. Cada linha é validada com as regras de AddCompanyForm; linhas inválidas
+    ou com código/CNPJ já cadastrado são ignoradas e listadas no relatório.
+
+    Exige o token COMPANY_IMPORT_API_TOKEN no cabeçalho 'Authorization: Bearer <token>'; sem token
+    configurado a rota não existe (404).
+    """
+    access_logger.info("Acessando rota api_import_companies")
+    token = app.config['COMPANY_IMPORT_API_TOKEN']
+    if not token:
+        abort(404)
+    scheme, _, provided = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(provided.strip().encode(), token.encode()):
+        logger.warning("Tentativa de importação de financeiras sem token válido.")
+        return jsonify({'errors': {'authorization': ["Token de importação ausente ou inválido."]}}), 401
+    if request.content_length is None or request.content_length > app.config['COMPANY_IMPORT_MAX_BYTES']:
+        return jsonify({'errors': {'file': [
+            f"Envio ausente ou maior que o limite de {app.config['COMPANY_IMPORT_MAX_BYTES']} bytes."]}}), 413
+    upload = request.files.get('file')
+    try:
+        if upload and upload.filename:
+            input_format = upload.filename.rsplit('.', 1)[-1].lower()
+            text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            rows = read_company_rows(text_stream, input_format)
+        elif request.is_json:
+            rows = parse_company_json(request.get_json(silent=True))
+        else:
+            return jsonify({'errors': {'file': ["Envie um arquivo CSV ou JSON, ou um corpo JSON."]}}), 400
+        report = run_company_import(rows)
+    except (ValueError, csv.Error) as ve:
+        logger.warning(f"Arquivo de importação de financeiras inválido: {ve}")
+        return jsonify({'errors': {'file': [str(ve)]}}), 400
+    return jsonify(report)
+
+
+@app.route('/api/companies/search')
+def api_company_search():
+    """
+    API JSON de busca/autocompletar de financeiras: prefixo do nome (ou de uma palavra dele), do
+    código ou do CNPJ (com ou sem pontuação), sem diferenciar maiúsculas nem acentos.
+
+    Parâmetros (query string): q (termo buscado) e limit (opcional, máximo de resultados).
+    Respondida pelo índice de prefixos do catálogo em memória, sem consultar o banco de dados.
+    """
+    access_logger.info("Acessando rota api_company_search")
+    form = CompanySearchForm(formdata=request.args)
+    if not form.validate():
+        return jsonify({'errors': form.errors}), 400
+    matches = company_catalog.snapshot().search(
+        form.q.data, form.limit.data or app.config['COMPANY_SEARCH_DEFAULT_RESULTS'])
+    return jsonify({
+        'query': form.q.data,
+        'results': [{
+            'id': company.id,
+            'name': company.name,
+            'code': company.code,
+            'cnpj': company.cnpj,
+            'basic_interest_rate': company.basic_interest_rate,
+        } for company in matches],
+    })
+
+
 @app.route('/company/<int:id>')
+@read_only
 def company_details(id):
     """Exibe detalhes de uma instituição financeira específica."""
-    logger.info(f"Acessando rota company_details para ID {id}")
+    access_logger.info("Acessando rota company_details para ID %s", id)
     # Busca a empresa pelo ID ou retorna 404 se não encontrada
     company = FinanceCompany.query.get_or_404(id)
     return render_template('company_details.html', company=company)
 
 
 @app.route('/terms')
-@cache.cached(timeout=3600)  # Cache de 1 hora para páginas estáticas
+@conditional(cache_control={'public': True, 'max_age': app.config['HTTP_STATIC_PAGE_MAX_AGE']})  # ETag do corpo
+@cache.cached(timeout=app.config['STATIC_PAGE_CACHE_TIMEOUT'])  # Páginas estáticas: cache longo (1 dia por padrão)
 def terms():
     """Página de Termos de Uso."""
-    logger.info("Acessando rota terms")
+    access_logger.info("Acessando rota terms")
     return render_template('terms.html')
 
 
 @app.route('/privacy')
-@cache.cached(timeout=3600)  # Cache de 1 hora para páginas estáticas
+@conditional(cache_control={'public': True, 'max_age': app.config['HTTP_STATIC_PAGE_MAX_AGE']})  # ETag do corpo
+@cache.cached(timeout=app.config['STATIC_PAGE_CACHE_TIMEOUT'])  # Páginas estáticas: cache longo (1 dia por padrão)
 def privacy():
     """Página de Política de Privacidade."""
-    logger.info("Acessando rota privacy")
+    access_logger.info("Acessando rota privacy")
     return render_template('privacy.html')
 
 
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
     """Página de Contato com formulário."""
-    logger.info("Acessando rota contact")
+    access_logger.info("Acessando rota contact")
     form = ContactForm()
     if form.validate_on_submit():
         try:
-            # Lógica para enviar e-mail (simulada aqui, substituir por um serviço de e-mail real)
             contact_data = {
                 "name": form.name.data,
                 "email": form.email.data,
                 "message": form.message.data
             }
-            logger.info(f"Formulário de contato submetido: {contact_data}")
+            # Apenas grava na fila persistente; o envio (com novas tentativas) é feito em segundo plano
+            message_id = outbound_queue.enqueue('contact', contact_data)
+            logger.info("Formulário de contato submetido: mensagem %s enfileirada", message_id)
             flash("Mensagem enviada com sucesso! Entraremos em contato em breve.", 'success')
             return redirect(url_for('contact'))  # Redireciona para evitar re-envio
         except Exception as e:
@@ -450,10 +1807,80 @@ def contact():
     return render_template('contact.html', form=form)
 
 
+# --- Comandos de Linha de Comando (flask <comando>) ---
+@app.cli.command('bulk-simulate')
+@click.argument('input_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--output', '-o', type=click.File('w'), default='-', help="Arquivo de saída (padrão: saída padrão).")
+@click.option('--format', 'output_format', type=click.Choice(['csv', 'ndjson']), default='csv', help="Formato de saída.")
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True, help="Número de processos.")
+@click.option('--chunk-size', type=int, default=app.config['BULK_SIMULATION_CHUNK_SIZE'], show_default=True,
+              help="Linhas simuladas por bloco.")
+def bulk_simulate_command(input_file, output, output_format, workers, chunk_size):
+    """Simula um CSV de cenários (principal, years, company_code, extra_amortization)."""
+    rates = load_rates_by_code()
+    try:
+        # O cabeçalho é validado já na chamada: um CSV inválido vira uma mensagem de erro, não um traceback
+        results = run_bulk_simulation(input_file, rates, workers=workers, chunk_size=chunk_size)
+        for line in format_results(results, output_format):
+            output.write(line)
+    except ValueError as ve:
+        raise click.ClickException(str(ve))
+
+
+@app.cli.command('import-companies')
+@click.argument('input_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'input_format', type=click.Choice(IMPORT_FORMATS), default=None,
+              help="Formato de entrada (padrão: pela extensão do arquivo).")
+@click.option('--batch-size', type=int, default=app.config['COMPANY_IMPORT_BATCH_SIZE'], show_default=True,
+              help="Financeiras por bloco.")
+def import_companies_command(input_file, input_format, batch_size):
+    """Importa financeiras de um CSV (com cabeçalho) ou JSON, com as mesmas validações do formulário."""
+    input_format = input_format or os.path.splitext(input_file.name)[1].lstrip('.').lower() or 'csv'
+    try:
+        report = run_company_import(read_company_rows(input_file, input_format), batch_size=batch_size)
+    except (ValueError, csv.Error) as ve:
+        raise click.ClickException(str(ve))
+    for item in report['invalid']:
+        click.echo(f"Linha {item['row']}: inválida {item['errors']}", err=True)
+    for item in report['duplicates']:
+        click.echo(f"Linha {item['row']}: {item['field']} '{item['value']}' já cadastrado", err=True)
+    click.echo(f"{report['inserted']} financeira(s) importada(s), {len(report['invalid'])} inválida(s), "
+               f"{len(report['duplicates'])} duplicada(s).")
+
+
+@app.cli.command('deliver-messages')
+@click.option('--once', is_flag=True, help="Envia as mensagens prontas e encerra (padrão: continua consumindo a fila).")
+def deliver_messages_command(once):
+    """Consome a fila de mensagens de contato (alternativa à thread de cada processo, OUTBOX_WORKER=none)."""
+    worker = DeliveryWorker(outbound_queue, make_mail_sender(), poll_interval=app.config['OUTBOX_POLL_INTERVAL'])
+    if once:
+        processed = worker.drain()
+        stats = outbound_queue.stats()
+        click.echo(f"{processed} mensagem(ns) processada(s); pendentes: {stats['pending']}, "
+                   f"com falha definitiva: {stats['failed']}.")
+        return
+    click.echo("Consumindo a fila de mensagens (Ctrl+C para encerrar)...")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Cria as tabelas e os índices que ainda não existirem no banco de dados."""
+    db.create_all()
+    ensure_indexes()
+    backfilled = ensure_rate_history()
+    click.echo(f"Tabelas e índices verificados; {backfilled} financeira(s) incluída(s) no histórico de taxas.")
+
+
 # --- Execução do Aplicativo ---
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()  # Cria as tabelas do banco de dados se ainda não existirem
+        ensure_indexes()  # Cria os índices que faltarem em bancos já existentes
+        ensure_rate_history()  # Financeiras sem histórico de taxas
 
         # Adiciona instituições financeiras de exemplo se o banco estiver vazio
         if not FinanceCompany.query.first():
@@ -0,0 +1,86 @@
+# benchmarks/bench_amortization_batch.py
+"""
+Compara o cálculo em lote (calculate_amortization_batch) com chamadas sucessivas a
+calculate_amortization e confere se os resultados batem ao centavo.
+
+Uso:
+    python benchmarks/bench_amortization_batch.py [--loans 10000] [--seed 42]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_simulation import calculate_amortization, calculate_amortization_batch  # noqa: E402
+
+
+def generate_loans(n_loans, seed):
+    """Gera empréstimos aleatórios dentro dos limites aceitos pelo formulário de simulação."""
+    rng = np.random.default_rng(seed)
+    principal = np.round(rng.uniform(100, 1_000_000, n_loans), 2)
+    rates = np.round(rng.uniform(0, 30, n_loans), 2)
+    rates[rng.random(n_loans) < 0.05] = 0.0  # Inclui alguns empréstimos sem juros
+    years = rng.integers(1, 31, n_loans)
+    extra = np.where(rng.random(n_loans) < 0.5, np.round(rng.uniform(0, 5000, n_loans), 2), 0.0)
+    return principal, rates, years, extra
+
+
+def run_scalar(principal, rates, years, extra):
+    return [
+        calculate_amortization(float(p), float(r), int(y), float(e))
+        for p, r, y, e in zip(principal, rates, years, extra)
+    ]
+
+
+def check_results(scalar_results, batch):
+    """Retorna a maior diferença absoluta encontrada entre os dois cálculos."""
+    max_diff = 0.0
+    for i, (schedule, total_interest, total_principal, total_paid) in enumerate(scalar_results):
+        months = len(schedule)
+        if months != batch['months'][i]:
+            raise AssertionError(f"Empréstimo {i}: {months} meses no escalar, {batch['months'][i]} no lote.")
+        for key in ('payment', 'interest', 'principal', 'balance'):
+            expected = np.frombuffer(getattr(schedule, key))
+            max_diff = max(max_diff, float(np.max(np.abs(expected - batch[key][i, :months]), initial=0.0)))
+        max_diff = max(max_diff,
+                       abs(total_interest - batch['total_interest'][i]),
+                       abs(total_principal - batch['total_principal'][i]),
+                       abs(total_paid - batch['total_paid'][i]))
+    return max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=10000, help="Número de empréstimos no lote.")
+    parser.add_argument('--seed', type=int, default=42, help="Semente do gerador de dados.")
+    args = parser.parse_args()
+
+    principal, rates, years, extra = generate_loans(args.loans, args.seed)
+
+    start = time.perf_counter()
+    scalar_results = run_scalar(principal, rates, years, extra)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculate_amortization_batch(principal, rates, years, extra)
+    batch_time = time.perf_counter() - start
+
+    max_diff = check_results(scalar_results, batch)
+    print(f"Empréstimos:            {args.loans}")
+    print(f"Escalar (loop):         {scalar_time:.3f} s")
+    print(f"Lote (NumPy):           {batch_time:.3f} s")
+    print(f"Aceleração:             {scalar_time / batch_time:.1f}x")
+    print(f"Maior diferença (R$):   {max_diff:.2e}")
+    if max_diff >= 0.005:
+        print("ERRO: os resultados divergem em mais de meio centavo.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmarks/bench_amortization_cents.py
+"""
+Compara o motor em centavos inteiros (calculate_amortization(..., engine='cents')) com o motor
+em ponto flutuante e com uma implementação de referência em Decimal, conferindo se o motor em
+centavos reproduz a referência centavo a centavo.
+
+Uso:
+    python benchmarks/bench_amortization_cents.py [--loans 2000] [--seed 42] [--rounding half_up] [--max-ratio 2.0]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP
+from fractions import Fraction
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_simulation import ROUNDING_MODES, calculate_amortization  # noqa: E402
+
+DECIMAL_ROUNDING = {
+    'half_up': ROUND_HALF_UP,
+    'half_even': ROUND_HALF_EVEN,
+    'down': ROUND_DOWN,
+    'up': ROUND_CEILING,
+}
+CENT = Decimal('0.01')
+
+
+def generate_loans(n_loans, seed):
+    """Gera empréstimos aleatórios dentro dos limites aceitos pelo formulário de simulação."""
+    rng = np.random.default_rng(seed)
+    principal = np.round(rng.uniform(100, 1_000_000, n_loans), 2)
+    rates = np.round(rng.uniform(0, 30, n_loans), 2)
+    rates[rng.random(n_loans) < 0.05] = 0.0  # Inclui alguns empréstimos sem juros
+    years = rng.integers(1, 31, n_loans)
+    extra = np.where(rng.random(n_loans) < 0.5, np.round(rng.uniform(0, 5000, n_loans), 2), 0.0)
+    return [(float(p), float(r), int(y), float(e)) for p, r, y, e in zip(principal, rates, years, extra)]
+
+
+def decimal_schedule(principal_value, annual_interest_rate, years_value, extra_amortization_value, rounding):
+    """
+    Referência em Decimal com as mesmas regras do motor em centavos. A parcela da Tabela Price é
+    calculada em ponto flutuante exatamente como no motor, para isolar a comparação dos juros e saldos.
+    """
+    mode = DECIMAL_ROUNDING[rounding]
+    annual_rate = Decimal(str(annual_interest_rate))
+    rate_float = float(Fraction(str(annual_interest_rate)) / 1200)
+    total_months = years_value * 12
+    balance = Decimal(str(principal_value)).quantize(CENT)
+    extra = Decimal(str(extra_amortization_value)).quantize(CENT)
+
+    def installment(balance, months):
+        if rate_float:
+            value = int(balance * 100) * (rate_float / (1 - math.pow(1 + rate_float, -months)))
+            if rounding == 'half_even':
+                cents = round(value)
+            elif rounding == 'half_up':
+                cents = math.floor(value + 0.5)
+            elif rounding == 'down':
+                cents = math.floor(value)
+            else:
+                cents = math.ceil(value)
+            return Decimal(cents) / 100
+        return (balance / months).quantize(CENT, rounding=mode)
+
+    rows = []
+    payment = installment(balance, total_months)
+    month = 1
+    while balance > 0 and month <= total_months:
+        # Uma única divisão: o quociente só cai exatamente na metade do centavo quando é exato
+        interest = (balance * annual_rate / 1200).quantize(CENT, rounding=mode)
+        amortization = payment - interest + max(min(extra, balance - (payment - interest)), Decimal(0))
+        if balance < amortization or month == total_months:
+            amortization = balance
+        balance -= amortization
+        rows.append((interest + amortization, interest, amortization, balance))
+        month += 1
+        if balance > 0 and month <= total_months:
+            payment = installment(balance, total_months - month + 1)
+    return rows
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=2000, help="Número de empréstimos simulados.")
+    parser.add_argument('--seed', type=int, default=42, help="Semente do gerador de dados.")
+    parser.add_argument('--rounding', choices=ROUNDING_MODES, default='half_up', help="Regra de arredondamento.")
+    parser.add_argument('--max-ratio', type=float, default=2.0,
+                        help="Razão máxima aceita entre o tempo do motor em centavos e o do motor float.")
+    args = parser.parse_args()
+
+    loans = generate_loans(args.loans, args.seed)
+
+    _, float_time = timed(lambda: [calculate_amortization(*loan) for loan in loans])
+    cents_results, cents_time = timed(
+        lambda: [calculate_amortization(*loan, engine='cents', rounding=args.rounding) for loan in loans])
+    decimal_results, decimal_time = timed(
+        lambda: [decimal_schedule(*loan, args.rounding) for loan in loans])
+
+    mismatches = 0
+    for (schedule, _, total_principal, _), reference, loan in zip(cents_results, decimal_results, loans):
+        cents_rows = [tuple(Decimal(round(value * 100)) / 100 for value in (row['payment'], row['interest'],
+                                                                          row['principal'], row['balance']))
+                      for row in schedule]
+        if cents_rows != reference or round(total_principal * 100) != round(loan[0] * 100):
+            mismatches += 1
+
+    ratio = cents_time / float_time
+    print(f"Empréstimos:              {args.loans} (arredondamento {args.rounding})")
+    print(f"Motor float:              {float_time:.3f} s")
+    print(f"Motor centavos:           {cents_time:.3f} s ({ratio:.2f}x o float)")
+    print(f"Referência Decimal:       {decimal_time:.3f} s ({decimal_time / cents_time:.1f}x o motor em centavos)")
+    print(f"Divergências da Decimal:  {mismatches}")
+    if mismatches:
+        print("ERRO: o motor em centavos diverge da referência em Decimal.")
+        return 1
+    if ratio > args.max_ratio:
+        print(f"ERRO: o motor em centavos é mais de {args.max_ratio:.1f}x mais lento que o float.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
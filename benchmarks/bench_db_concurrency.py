@@ -0,0 +1,187 @@
+# benchmarks/bench_db_concurrency.py
+"""
+Benchmark de concorrência do banco de dados: threads leitoras (consulta de uma financeira pelo id,
+como em /company/<id>) disputando o banco SQLite com threads escritoras (inserções em lote, como na
+importação de financeiras), comparando os modos de journal do SQLite.
+
+Modos:
+    - delete: configuração padrão do SQLite (rollback journal, synchronous=FULL): os leitores esperam
+      enquanto uma escrita é gravada;
+    - wal: a configuração do aplicativo (db_engine.configure_sqlite: WAL e synchronous=NORMAL).
+
+Em cada modo o banco é recriado com --rows financeiras e as threads rodam por --duration segundos,
+com o mesmo pool de conexões do aplicativo (SQLALCHEMY_ENGINE_OPTIONS da configuração escolhida
+por APP_CONFIG). São exibidas a vazão de leituras e escritas e as latências de leitura p50/p95/p99.
+
+Uso:
+    python benchmarks/bench_db_concurrency.py [--modes delete,wal] [--readers 8] [--writers 1]
+        [--duration 5] [--rows 10000] [--write-batch 200] [--output resultados.json]
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# O banco precisa ser definido antes de importar o aplicativo (lido em Config)
+DB_DIR = tempfile.mkdtemp(prefix='financiaai-bench-db-')
+atexit.register(shutil.rmtree, DB_DIR, ignore_errors=True)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(DB_DIR, 'app.db')
+os.environ.setdefault('OUTBOX_DATABASE', os.path.join(DB_DIR, 'outbox.db'))
+os.environ.setdefault('OUTBOX_WORKER', 'none')
+
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+
+from db_engine import configure_sqlite, engine_options  # noqa: E402
+
+MODES = {
+    'delete': ('DELETE', 'FULL'),
+    'wal': ('WAL', 'NORMAL'),
+}
+
+
+def company_rows(start, count):
+    return [{
+        'name': f"Financeira {i:06d}",
+        'code': f"B{i:06d}",
+        'basic_interest_rate': round(0.5 + (i % 300) / 100, 2),
+        'last_updated': date.today(),
+        'cnpj': f"{i:014d}",
+        'country': 'Brasil',
+    } for i in range(start, start + count)]
+
+
+def build_engine(path, mode, options):
+    url = 'sqlite:///' + path
+    engine = create_engine(url, **engine_options(url, options))
+    journal_mode, synchronous = MODES[mode]
+    configure_sqlite(engine, journal_mode, synchronous)
+    return engine
+
+
+def run_mode(mode, args, metadata, table, options):
+    """Recria o banco, roda leitores e escritores por args.duration segundos e retorna as métricas."""
+    path = os.path.join(DB_DIR, f'{mode}.db')
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = build_engine(path, mode, options)
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(table), company_rows(0, args.rows))
+
+    stop = threading.Event()
+    read_latencies = [[] for _ in range(args.readers)]
+    writes = [0] * args.writers
+    errors = []
+    next_row = [args.rows]
+    lock = threading.Lock()
+    query = select(table).where(table.c.id == 0)
+
+    def reader(slot):
+        rng = random.Random(slot)
+        latencies = read_latencies[slot]
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query.where(table.c.id == rng.randint(1, args.rows))).first()
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    def writer(slot):
+        while not stop.is_set():
+            with lock:
+                start, next_row[0] = next_row[0], next_row[0] + args.write_batch
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(table), company_rows(start, args.write_batch))
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            writes[slot] += 1
+
+    threads = ([threading.Thread(target=reader, args=(slot,)) for slot in range(args.readers)]
+               + [threading.Thread(target=writer, args=(slot,)) for slot in range(args.writers)])
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    latencies = np.concatenate([np.array(slot_latencies) for slot_latencies in read_latencies]) * 1000
+    p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        'reads_per_s': len(latencies) / elapsed,
+        'write_batches_per_s': sum(writes) / elapsed,
+        'read_p50_ms': float(p50),
+        'read_p95_ms': float(p95),
+        'read_p99_ms': float(p99),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='delete,wal', help="Modos comparados, separados por vírgula.")
+    parser.add_argument('--readers', type=int, default=8, help="Threads leitoras.")
+    parser.add_argument('--writers', type=int, default=1, help="Threads escritoras.")
+    parser.add_argument('--duration', type=float, default=5.0, help="Duração de cada modo, em segundos.")
+    parser.add_argument('--rows', type=int, default=10000, help="Financeiras no banco inicial.")
+    parser.add_argument('--write-batch', type=int, default=200, help="Financeiras inseridas por transação.")
+    parser.add_argument('--output', help="Arquivo JSON onde os resultados são salvos.")
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Modos desconhecidos: {', '.join(sorted(unknown))}. Use: {', '.join(MODES)}.")
+
+    logging.disable(logging.INFO)  # O aplicativo registra cada inicialização em INFO
+    from app import app, FinanceCompany
+
+    table = FinanceCompany.__table__
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    print(f"Leitores={args.readers}, escritores={args.writers}, {args.duration:.0f} s por modo, "
+          f"{args.rows} financeiras, lotes de {args.write_batch}; pool: {options}")
+    results = {}
+    print(f"{'Modo':<8} {'leituras/s':>11} {'lotes/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6}")
+    for mode in modes:
+        stats = run_mode(mode, args, table.metadata, table, options)
+        results[mode] = stats
+        print(f"{mode:<8} {stats['reads_per_s']:>11.0f} {stats['write_batches_per_s']:>8.1f} "
+              f"{stats['read_p50_ms']:>8.2f} {stats['read_p95_ms']:>8.2f} {stats['read_p99_ms']:>8.2f} "
+              f"{stats['errors']:>6}")
+        if stats['first_error']:
+            print(f"    primeiro erro: {stats['first_error']}")
+    if 'delete' in results and 'wal' in results and results['delete']['reads_per_s']:
+        print(f"Ganho de vazão de leitura com WAL: {results['wal']['reads_per_s'] / results['delete']['reads_per_s']:.2f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"Resultados salvos em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# benchmarks/bench_suite.py
+"""
+Suíte de benchmarks do motor de amortização e das rotas do aplicativo, com comparação contra
+uma linha de base salva em JSON.
+
+Mede:
+    - engine/*: calculate_amortization de 12 a 360 meses, com e sem amortização extra;
+    - routes/*: '/', '/loan_simulation' (GET e POST) e '/add_company' pelo cliente de teste do
+      Flask, com um banco SQLite temporário populado com 10, 1.000 e 50.000 financeiras;
+    - template/*: renderização de loan_simulation.html com uma tabela de 360 linhas.
+
+Cada medição é repetida e a mediana (ou o mínimo, com --metric min_ms) é comparada com a da
+linha de base: há regressão quando ela passa do limite relativo (--threshold, ou o 'threshold'
+salvo na própria entrada da linha de base) e a diferença absoluta passa de --noise-floor ms.
+Os tempos dependem da máquina, então a linha de base deve ser gerada (--save-baseline) na mesma
+máquina em que a comparação é feita; sem linha de base, os tempos são apenas exibidos.
+
+Uso:
+    python benchmarks/bench_suite.py [--only engine,routes,template] [--sizes 10,1000,50000]
+        [--repeat 10] [--output resultados.json] [--baseline benchmarks/baseline.json]
+        [--save-baseline] [--threshold 0.25] [--noise-floor 0.5] [--metric median_ms]
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# O banco precisa ser definido antes de importar o aplicativo (lido em Config)
+DB_DIR = tempfile.mkdtemp(prefix='financiaai-bench-')
+atexit.register(shutil.rmtree, DB_DIR, ignore_errors=True)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(DB_DIR, 'bench.db')
+os.environ.setdefault('OUTBOX_DATABASE', os.path.join(DB_DIR, 'outbox.db'))
+os.environ.setdefault('OUTBOX_WORKER', 'none')  # As rotas medidas não enviam mensagens
+
+from loan_simulation import calculate_amortization  # noqa: E402
+
+GROUPS = ('engine', 'routes', 'template')
+DEFAULT_SIZES = (10, 1000, 50000)
+ENGINE_TERMS = (1, 5, 10, 20, 30)  # Anos: 12 a 360 meses
+ENGINE_EXTRA = (0.0, 500.0)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def measure(function, repeat, warmup=1):
+    """Executa `function` `warmup` + `repeat` vezes e retorna as estatísticas dos tempos (ms)."""
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'repeat': repeat,
+    }
+
+
+def bench_engine(repeat):
+    """Simulações escalares de 12 a 360 meses, com e sem amortização extra."""
+    results = {}
+    for years in ENGINE_TERMS:
+        for extra in ENGINE_EXTRA:
+            name = f"engine/calculate_amortization[months={years * 12},extra={extra:g}]"
+            results[name] = measure(lambda: calculate_amortization(100000.0, 12.0, years, extra), repeat * 10)
+    return results
+
+
+def company_rows(count):
+    """Financeiras sintéticas com nome, código e CNPJ únicos (válidos para AddCompanyForm)."""
+    rng = np.random.default_rng(count)
+    rates = np.round(rng.uniform(0.5, 30, count), 2)
+    today = date.today()
+    return [{
+        'name': f"Financeira {i:05d}",
+        'code': f"BF{i:05d}",
+        'cnpj': f"{i // 1000000:02d}.{i // 1000 % 1000:03d}.{i % 1000:03d}/0001-{i % 100:02d}",
+        'basic_interest_rate': float(rates[i]),
+        'country': 'Brasil',
+        'last_updated': today,
+    } for i in range(count)]
+
+
+def seed_database(app_module, count):
+    """Recria as tabelas e insere `count` financeiras com um único INSERT em lote."""
+    from sqlalchemy import insert
+
+    db = app_module.db
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(app_module.FinanceCompany), company_rows(count))
+    # INSERT em lote não passa pelos eventos do ORM: invalida o catálogo explicitamente
+    app_module.company_catalog.mark_dirty(db.session)
+    db.session.commit()
+    app_module.company_catalog.snapshot()
+
+
+def check_response(response, expected_status=200):
+    if response.status_code != expected_status:
+        raise RuntimeError(f"Resposta inesperada: {response.status_code} (esperado {expected_status}).")
+
+
+def bench_routes(app_module, size, repeat):
+    """Rotas principais pelo cliente de teste, com o banco populado com `size` financeiras."""
+    client = app_module.app.test_client()
+    company_id = app_module.company_catalog.snapshot().by_name[0].id
+    results = {}
+
+    def index_cold():
+        app_module.purge_company_pages()  # Força a renderização (sem a página em cache)
+        check_response(client.get('/'))
+
+    results[f"routes/index_uncached[companies={size}]"] = measure(index_cold, repeat)
+    results[f"routes/index_cached[companies={size}]"] = measure(lambda: check_response(client.get('/')), repeat * 10)
+    results[f"routes/loan_simulation_get[companies={size}]"] = measure(
+        lambda: check_response(client.get('/loan_simulation')), repeat)
+
+    counter = iter(range(10 ** 9))
+
+    def simulate():
+        # Um valor diferente por requisição para não reaproveitar o cache de simulações
+        check_response(client.post('/loan_simulation', data={
+            'company': company_id,
+            'principal': f"{100000 + next(counter):.2f}",
+            'years': 30,
+            'extra_amortization': '0.00',
+        }))
+
+    results[f"routes/loan_simulation_post[companies={size}]"] = measure(simulate, repeat)
+
+    def add_company():
+        i = size + next(counter)
+        response = client.post('/add_company', data={
+            'name': f"Nova Financeira {i}",
+            'code': f"NF{i:07d}",
+            'cnpj': f"{i // 1000000 % 100:02d}.{i // 1000 % 1000:03d}.{i % 1000:03d}/0002-{i % 100:02d}",
+            'basic_interest_rate': '12.5',
+            'country': 'Brasil',
+        })
+        check_response(response, expected_status=302)  # Redireciona após inserir
+
+    # Por último: cada inserção invalida o catálogo, o que afetaria as medições seguintes
+    results[f"routes/add_company_post[companies={size}]"] = measure(add_company, repeat)
+    return results
+
+
+def bench_template(app_module, size, repeat):
+    """Renderização de loan_simulation.html com uma tabela de 360 linhas."""
+    from flask import render_template
+
+    app = app_module.app
+    catalog = app_module.company_catalog.snapshot()
+    schedule, total_interest, total_principal, total_paid = calculate_amortization(100000.0, 12.0, 30, 0.0)
+    summary = {
+        'principal': '100000.00',
+        'total_interest': f"{total_interest:.2f}",
+        'total_principal': f"{total_principal:.2f}",
+        'total_paid': f"{total_paid:.2f}",
+    }
+    with app.test_request_context('/loan_simulation'):
+        form = app_module.LoanSimulationForm()
+        form.company.choices = catalog.choices
+
+        def render():
+            render_template(
+                'loan_simulation.html', form=form, companies=catalog.by_name, schedule=schedule,
+                summary=summary, sensitivity=None, show_sensitivity=False, principal_value='100000.00',
+                years_value='30', selected_company_id=catalog.by_name[0].id, extra_amortization_value='0.00'
+            )
+
+        return {f"template/loan_simulation_360_rows[companies={size}]": measure(render, repeat)}
+
+
+def run_suite(groups, sizes, repeat):
+    results = {}
+    if 'engine' in groups:
+        print("Medindo o motor de amortização...")
+        results.update(bench_engine(repeat))
+    if 'routes' in groups or 'template' in groups:
+        import app as app_module
+
+        app_module.app.config['WTF_CSRF_ENABLED'] = False
+        with app_module.app.app_context():
+            for size in sizes:
+                print(f"Populando o banco com {size} financeiras...")
+                seed_database(app_module, size)
+                if 'template' in groups:
+                    results.update(bench_template(app_module, size, repeat))
+                if 'routes' in groups:
+                    results.update(bench_routes(app_module, size, repeat))
+    return results
+
+
+def compare(results, baseline, threshold, noise_floor, metric='median_ms'):
+    """Compara `metric` com a linha de base. Retorna as linhas do relatório e as regressões."""
+    lines = []
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            lines.append(f"{name:<64} {result[metric]:>10.3f} ms   (sem linha de base)")
+            continue
+        limit = reference.get('threshold', threshold)
+        ratio = result[metric] / reference[metric] if reference[metric] else float('inf')
+        regressed = ratio > 1 + limit and result[metric] - reference[metric] > noise_floor
+        status = 'REGRESSÃO' if regressed else 'ok'
+        lines.append(f"{name:<64} {result[metric]:>10.3f} ms   {ratio:>5.2f}x (limite {1 + limit:.2f}x)  {status}")
+        if regressed:
+            regressions.append(name)
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=','.join(GROUPS), help="Grupos medidos, separados por vírgula.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Quantidades de financeiras no banco, separadas por vírgula.")
+    parser.add_argument('--repeat', type=int, default=10, help="Repetições por medição.")
+    parser.add_argument('--output', help="Arquivo JSON onde os resultados são salvos.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Arquivo JSON da linha de base.")
+    parser.add_argument('--save-baseline', action='store_true', help="Salva os resultados como nova linha de base.")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Aumento relativo máximo da mediana (0.25 = 25%%) antes de acusar regressão.")
+    parser.add_argument('--noise-floor', type=float, default=0.5,
+                        help="Diferença absoluta mínima (ms) para acusar regressão.")
+    parser.add_argument('--metric', choices=('median_ms', 'min_ms'), default='median_ms',
+                        help="Estatística comparada (min_ms é menos sensível a ruído em máquinas compartilhadas).")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.only.split(',') if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"Grupos desconhecidos: {', '.join(sorted(unknown))}. Use {', '.join(GROUPS)}.")
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    logging.disable(logging.INFO)  # As rotas registram uma linha por requisição
+    results = run_suite(groups, sizes, args.repeat)
+    document = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"Resultados salvos em {args.output}")
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+    lines, regressions = compare(results, baseline, args.threshold, args.noise_floor, args.metric)
+    print('\n'.join(lines))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"Linha de base salva em {args.baseline}")
+    if regressions:
+        print(f"ERRO: {len(regressions)} medição(ões) acima do limite da linha de base.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# benchmarks/replay_traffic.py
+"""
+Reproduz o tráfego gravado pelo TrafficRecorder (JSONL, TRAFFIC_RECORDER_ENABLED=1) contra um
+servidor local e relata, por rota, vazão, latências p50/p95/p99 e taxa de erros.
+
+Uso:
+    SECRET_KEY=chave-fixa gunicorn -w 4 -b 127.0.0.1:8000 app:app &
+    python benchmarks/replay_traffic.py instance/requests.jsonl [--base-url http://127.0.0.1:8000]
+        [--concurrency 8] [--speedup 1.0] [--limit 0] [--timeout 30] [--output relatorio.json]
+
+--speedup 2 reproduz as requisições com metade dos intervalos gravados; --speedup 0 dispara o mais
+rápido possível, limitado apenas por --concurrency. Antes do primeiro POST de formulário em cada
+página, cada thread faz um GET na mesma página para obter o token CSRF (por isso os workers do
+gunicorn precisam compartilhar a SECRET_KEY, definida no ambiente). Requisições com upload de
+arquivos não são reproduzidas, pois o conteúdo dos arquivos não é gravado.
+
+Erros: falhas de conexão e respostas 5xx. Respostas com status diferente do gravado (ex: um
+formulário que deixou de validar) são contadas à parte, em 'divergentes'.
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+import numpy as np
+
+CSRF_TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"|value="([^"]+)"[^>]*name="csrf_token"')
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """Mede apenas a requisição reproduzida: os redirecionamentos não são seguidos."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def load_entries(path, limit=0):
+    """Lê as requisições gravadas, em ordem cronológica."""
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda entry: entry['time'])
+    return entries[:limit] if limit else entries
+
+
+class ReplayClient:
+    """Cliente HTTP por thread, com cookies (sessão do Flask) e tokens CSRF por página."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _state(self):
+        state = self._local
+        if not hasattr(state, 'opener'):
+            state.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect)
+            state.tokens = {}
+        return state
+
+    def _open(self, request):
+        try:
+            with self._state().opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except HTTPError as e:  # 3xx (não seguidos), 4xx e 5xx
+            return e.code, e.read()
+
+    def csrf_token(self, path):
+        tokens = self._state().tokens
+        if path not in tokens:
+            _, body = self._open(Request(self.base_url + path))
+            match = CSRF_TOKEN.search(body.decode('utf-8', 'replace'))
+            tokens[path] = (match.group(1) or match.group(2)) if match else None
+        return tokens[path]
+
+    def send(self, entry):
+        """Reproduz uma requisição gravada. Retorna (status, segundos); status None em falha de conexão."""
+        url = self.base_url + entry['path']
+        if entry.get('query'):
+            url += '?' + urlencode(entry['query'], doseq=True)
+        data = None
+        headers = {}
+        if entry.get('json') is not None:
+            data = json.dumps(entry['json']).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif entry.get('form') is not None:
+            form = dict(entry['form'])
+            token = self.csrf_token(entry['path'])
+            if token:
+                form['csrf_token'] = token
+            data = urlencode(form, doseq=True).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request = Request(url, data=data, headers=headers, method=entry['method'])
+        start = time.perf_counter()
+        try:
+            status, _ = self._open(request)
+        except (URLError, OSError):
+            status = None
+        return status, time.perf_counter() - start
+
+
+def replay(entries, client, concurrency, speedup):
+    """
+    Dispara as requisições respeitando os intervalos gravados (divididos por `speedup`) e no máximo
+    `concurrency` requisições em andamento. Retorna os resultados e o tempo total, em segundos.
+    """
+    results = []
+    slots = threading.BoundedSemaphore(concurrency)
+    lock = threading.Lock()
+
+    def run(entry):
+        try:
+            status, elapsed = client.send(entry)
+            with lock:
+                results.append((entry, status, elapsed))
+        finally:
+            slots.release()
+
+    first = entries[0]['time'] if entries else 0.0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in entries:
+            if speedup > 0:
+                delay = start + (entry['time'] - first) / speedup - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            slots.acquire()
+            executor.submit(run, entry)
+    return results, time.perf_counter() - start
+
+
+def summarize(results, wall_time):
+    """Agrupa os resultados por método e rota."""
+    groups = defaultdict(list)
+    for entry, status, elapsed in results:
+        groups[f"{entry['method']} {entry.get('route') or entry['path']}"].append((entry, status, elapsed))
+    report = {}
+    for name, items in sorted(groups.items()):
+        latencies = np.array([elapsed for _, _, elapsed in items]) * 1000
+        errors = sum(1 for _, status, _ in items if status is None or status >= 500)
+        mismatched = sum(1 for entry, status, _ in items
+                         if status is not None and status < 500 and status != entry.get('status'))
+        p50, p95, p99 = np.percentile(latencies, (50, 95, 99))
+        report[name] = {
+            'requests': len(items),
+            'throughput_rps': len(items) / wall_time if wall_time else 0.0,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'error_rate': errors / len(items),
+            'mismatched': mismatched,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="Arquivo JSONL gravado pelo TrafficRecorder.")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help="Endereço do servidor.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Requisições simultâneas.")
+    parser.add_argument('--speedup', type=float, default=1.0,
+                        help="Aceleração em relação aos intervalos gravados (0 = sem intervalos).")
+    parser.add_argument('--limit', type=int, default=0, help="Reproduz apenas as N primeiras requisições.")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Tempo máximo por requisição (s).")
+    parser.add_argument('--output', help="Arquivo JSON onde o relatório é salvo.")
+    args = parser.parse_args()
+    if args.concurrency <= 0 or args.speedup < 0:
+        parser.error("--concurrency deve ser positivo e --speedup não pode ser negativo.")
+
+    entries = load_entries(args.input, args.limit)
+    skipped = [entry for entry in entries if entry.get('files')]
+    entries = [entry for entry in entries if not entry.get('files')]
+    if not entries:
+        print("Nenhuma requisição para reproduzir.")
+        return 1
+
+    results, wall_time = replay(entries, ReplayClient(args.base_url, args.timeout), args.concurrency, args.speedup)
+    report = summarize(results, wall_time)
+
+    print(f"Requisições: {len(results)} em {wall_time:.2f} s ({len(results) / wall_time:.1f} req/s); "
+          f"{len(skipped)} com upload ignorada(s)")
+    print(f"{'Rota':<40} {'Req':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Erros':>7} {'Diverg.':>8}")
+    for name, stats in report.items():
+        print(f"{name:<40} {stats['requests']:>6} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['error_rate']:>7.1%} {stats['mismatched']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'requests': len(results),
+                'wall_time_s': wall_time,
+                'throughput_rps': len(results) / wall_time,
+                'skipped_uploads': len(skipped),
+                'concurrency': args.concurrency,
+                'speedup': args.speedup,
+                'routes': report,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
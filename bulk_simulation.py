@@ -0,0 +1,190 @@
+# bulk_simulation.py
+
+import csv
+import io
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from loan_simulation import calculate_amortization_summary_batch
+
+# Colunas aceitas no CSV de entrada (extra_amortization é opcional)
+INPUT_FIELDS = ('principal', 'years', 'company_code', 'extra_amortization')
+REQUIRED_FIELDS = ('principal', 'years', 'company_code')
+OUTPUT_FIELDS = INPUT_FIELDS + (
+    'annual_interest_rate', 'monthly_payment', 'total_interest', 'total_principal', 'total_paid',
+    'payoff_month', 'error'
+)
+OUTPUT_FORMATS = ('csv', 'ndjson')
+
+# Mesmos limites aplicados pelo formulário de simulação
+MIN_PRINCIPAL, MAX_PRINCIPAL = 100, 1000000
+MIN_YEARS, MAX_YEARS = 1, 30
+
+# Taxas por código de financeira no processo atual (definidas pelo inicializador do pool)
+_worker_rates = None
+
+
+def read_scenario_chunks(text_stream, chunk_size=5000):
+    """
+    Lê um CSV de cenários em blocos, sem carregar o arquivo inteiro em memória.
+    O cabeçalho é lido e validado imediatamente; as linhas são lidas sob demanda.
+
+    Args:
+        text_stream: Arquivo (ou iterável de linhas) em modo texto, com cabeçalho.
+        chunk_size (int): Número de linhas por bloco.
+
+    Returns:
+        generator: Blocos de até `chunk_size` linhas, cada linha como tupla na ordem de INPUT_FIELDS.
+
+    Raises:
+        ValueError: Se o cabeçalho não tiver as colunas obrigatórias.
+    """
+    if chunk_size <= 0:
+        raise ValueError("O tamanho do bloco deve ser positivo.")
+    reader = csv.DictReader(text_stream)
+    missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(missing)}.")
+    rows = (tuple((row.get(field) or '').strip() for field in INPUT_FIELDS) for row in reader)
+    return iter(lambda: list(islice(rows, chunk_size)), [])
+
+
+def _parse_row(row, rates):
+    """Converte e valida uma linha de cenário. Retorna (principal, anos, taxa, extra) ou levanta ValueError."""
+    principal_text, years_text, code, extra_text = row
+    try:
+        principal = float(principal_text)
+        years = int(years_text)
+        extra = float(extra_text) if extra_text else 0.0
+    except ValueError:
+        raise ValueError("Valores numéricos inválidos.")
+    if not MIN_PRINCIPAL <= principal <= MAX_PRINCIPAL:
+        raise ValueError(f"O valor deve ser entre R${MIN_PRINCIPAL} e R${MAX_PRINCIPAL}.")
+    if not MIN_YEARS <= years <= MAX_YEARS:
+        raise ValueError(f"O prazo deve ser entre {MIN_YEARS} e {MAX_YEARS} anos.")
+    if extra < 0:
+        raise ValueError("A amortização extra não pode ser negativa.")
+    if code not in rates:
+        raise ValueError(f"Financeira com código '{code}' não encontrada.")
+    return principal, years, rates[code], extra
+
+
+def simulate_chunk(rows, rates=None):
+    """
+    Simula um bloco de cenários em uma única chamada vetorizada.
+
+    Args:
+        rows (list): Linhas no formato retornado por read_scenario_chunks.
+        rates (dict): Taxas de juros anuais por código de financeira. Quando omitido, usa as
+            taxas carregadas no processo pelo inicializador do pool.
+
+    Returns:
+        list: Um dicionário por linha, com as colunas de OUTPUT_FIELDS, na mesma ordem da entrada.
+    """
+    rates = _worker_rates if rates is None else rates
+    results = []
+    valid_positions, principals, years, annual_rates, extras = [], [], [], [], []
+    for position, row in enumerate(rows):
+        result = dict(zip(INPUT_FIELDS, row))
+        try:
+            principal, term, rate, extra = _parse_row(row, rates)
+        except ValueError as ve:
+            result['error'] = str(ve)
+        else:
+            valid_positions.append(position)
+            principals.append(principal)
+            years.append(term)
+            annual_rates.append(rate)
+            extras.append(extra)
+            result['annual_interest_rate'] = rate
+        results.append(result)
+
+    if valid_positions:
+        totals = calculate_amortization_summary_batch(principals, annual_rates, years, extras)
+        for index, position in enumerate(valid_positions):
+            results[position].update({
+                'monthly_payment': round(float(totals['first_payment'][index]), 2),
+                'total_interest': round(float(totals['total_interest'][index]), 2),
+                'total_principal': round(float(totals['total_principal'][index]), 2),
+                'total_paid': round(float(totals['total_paid'][index]), 2),
+                'payoff_month': int(totals['months'][index]),
+            })
+    return results
+
+
+def _init_worker(rates):
+    """Inicializador dos processos do pool: recebe as taxas uma única vez por processo."""
+    global _worker_rates
+    _worker_rates = rates
+
+
+def run_bulk_simulation(text_stream, rates, workers=1, chunk_size=5000):
+    """
+    Simula todos os cenários de um CSV, devolvendo os resultados em streaming e na ordem da entrada.
+    Com `workers` > 1 os blocos são distribuídos em um pool de processos; no máximo 2 blocos por
+    processo ficam pendentes ao mesmo tempo, mantendo o uso de memória constante.
+
+    Args:
+        text_stream: Arquivo CSV em modo texto (ver read_scenario_chunks).
+        rates (dict): Taxas de juros anuais por código de financeira, consultadas uma única vez.
+        workers (int): Número de processos (1 executa no processo atual).
+        chunk_size (int): Número de linhas por bloco.
+
+    Returns:
+        generator: Um dicionário de resultado por linha de entrada, com as colunas de OUTPUT_FIELDS.
+
+    Raises:
+        ValueError: Se o cabeçalho do CSV for inválido (verificado antes de qualquer simulação).
+    """
+    chunks = read_scenario_chunks(text_stream, chunk_size)
+    return _simulate_chunks(chunks, rates, workers)
+
+
+def _simulate_chunks(chunks, rates, workers):
+    """Gera os resultados dos blocos, no próprio processo ou em um pool de processos."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield from simulate_chunk(chunk, rates)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rates,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(simulate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def format_results(results, output_format='csv'):
+    """
+    Serializa os resultados em streaming, um pedaço de texto por linha.
+
+    Args:
+        results: Iterável de dicionários produzido por run_bulk_simulation.
+        output_format (str): 'csv' (com cabeçalho) ou 'ndjson'.
+
+    Yields:
+        str: Linhas de texto prontas para escrita ou envio na resposta.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de saída inválido: {output_format}. Use 'csv' ou 'ndjson'.")
+    if output_format == 'ndjson':
+        for result in results:
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for result in results:
+        writer.writerow(result)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
@@ -0,0 +1,279 @@
+# company_catalog.py
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from company_search import PrefixIndex
+
+# Entrada imutável e compacta do catálogo: apenas os campos usados pelas rotas mais acessadas.
+# last_updated faz parte da chave do cache de simulações; cnpj é usado pela busca.
+CompanyEntry = namedtuple('CompanyEntry', ('id', 'name', 'code', 'basic_interest_rate', 'last_updated', 'cnpj'))
+
+# Versão do formato do snapshot (campos de CompanyEntry, ordenações, índice de busca). Entra na marca
+# guardada no cache: incremente ao mudar como o snapshot é montado, para que a primeira revalidação
+# da nova versão do código invalide o catálogo (e os ETags e fragmentos derivados dele) já publicados.
+SNAPSHOT_FORMAT = 1
+
+# Chaves de ordenação do catálogo (únicas, terminando no id) e os tipos de cada parte, usados pela
+# paginação por chave: o cursor de uma página é a chave do seu último item.
+SORT_KEYS = {
+    'name': lambda entry: (entry.name, entry.id),
+    'rate': lambda entry: (entry.basic_interest_rate, entry.name, entry.id),
+}
+SORT_KEY_TYPES = {
+    'name': (str, int),
+    'rate': ((int, float), str, int),
+}
+
+
+def encode_cursor(key):
+    """Cursor opaco (seguro para URLs) a partir da chave de ordenação do último item de uma página."""
+    data = json.dumps(list(key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by):
+    """
+    Converte o cursor de volta na chave de ordenação `sort_by`.
+
+    Raises:
+        ValueError: Se o cursor estiver mal formado ou não corresponder à ordenação.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError as e:  # Inclui erros de base64, de UTF-8 e de JSON
+        raise ValueError("Cursor de paginação inválido.") from e
+    types = SORT_KEY_TYPES[sort_by]
+    if (not isinstance(key, list) or len(key) != len(types)
+            or any(isinstance(value, bool) or not isinstance(value, kind) for value, kind in zip(key, types))):
+        raise ValueError("Cursor de paginação inválido.")
+    return tuple(key)
+
+
+class CatalogSnapshot:
+    """
+    Fotografia imutável do catálogo de financeiras em uma determinada versão,
+    com as entradas já ordenadas por nome e por taxa e um índice de prefixos para a busca.
+    """
+    __slots__ = ('version', 'by_name', 'by_rate', 'by_id', 'choices', 'rates_by_code', 'search_index', '_digest')
+
+    def __init__(self, version, entries, previous=None):
+        """
+        Args:
+            version (int): Versão do catálogo.
+            entries (list): Entradas (CompanyEntry).
+            previous (CatalogSnapshot): Snapshot anterior, cujo índice de busca é atualizado
+                incrementalmente em vez de reconstruído.
+        """
+        self.version = version
+        self.by_name = tuple(sorted(entries, key=SORT_KEYS['name']))
+        self.by_rate = tuple(sorted(entries, key=SORT_KEYS['rate']))
+        self.by_id = {entry.id: entry for entry in entries}
+        # Estruturas derivadas usadas a cada requisição, calculadas uma única vez por versão
+        self.choices = [(entry.id, entry.name) for entry in self.by_name]
+        self.rates_by_code = {entry.code: entry.basic_interest_rate for entry in entries}
+        self.search_index = (previous.search_index.updated(self.by_id) if previous is not None
+                             else PrefixIndex(self.by_id))
+        self._digest = None
+
+    @property
+    def digest(self):
+        """
+        Hash do conteúdo do snapshot (e de SNAPSHOT_FORMAT), calculado na primeira consulta. Ao contrário
+        de `version`, que é o relógio do processo que detectou a alteração, é o mesmo em todos os processos
+        que leram os mesmos dados, então serve de base para ETags.
+        """
+        if self._digest is None:
+            # by_name tem ordem determinística (nome, id); str(float) é exato (o mesmo que repr)
+            content = '\n'.join('\x1f'.join(map(str, entry)) for entry in self.by_name)
+            self._digest = hashlib.sha1(f'{SNAPSHOT_FORMAT}\n{content}'.encode('utf-8')).hexdigest()
+        return self._digest
+
+    @property
+    def last_updated(self):
+        """Data da atualização mais recente entre as financeiras (None se o catálogo estiver vazio)."""
+        return max((entry.last_updated for entry in self.by_name if entry.last_updated is not None), default=None)
+
+    def get(self, company_id):
+        """Retorna a entrada da financeira pelo id, ou None se não existir."""
+        return self.by_id.get(company_id)
+
+    def page(self, sort_by='name', after=None, limit=50):
+        """
+        Paginação por chave: as `limit` entradas seguintes à chave `after` na ordenação `sort_by`
+        ('name' ou 'rate'), localizadas por busca binária (o custo não cresce com o número da página).
+
+        Returns:
+            tuple: (entradas da página, chave do último item ou None se não houver próxima página).
+        """
+        entries = self.by_rate if sort_by == 'rate' else self.by_name
+        sort_key = SORT_KEYS['rate' if sort_by == 'rate' else 'name']
+        start = bisect_right(entries, tuple(after), key=sort_key) if after else 0
+        page = entries[start:start + limit]
+        has_next = start + limit < len(entries)
+        return page, (sort_key(page[-1]) if page and has_next else None)
+
+    def search(self, query, limit=10):
+        """Busca por prefixo do nome (ou de uma palavra dele), do código ou do CNPJ (ver PrefixIndex.search)."""
+        return self.search_index.search(query, limit)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_name)
+
+
+class CompanyCatalog:
+    """
+    Catálogo de financeiras mantido em memória, para que as rotas mais acessadas não precisem
+    consultar o banco de dados.
+
+    O snapshot só é reconstruído quando o contador de versão muda. A versão fica no cache do
+    aplicativo e é incrementada após cada commit que insere, altera ou remove financeiras (ver `watch`).
+    Funções registradas com `on_change` são chamadas nesse momento (ex: para limpar páginas em cache).
+
+    O commit só avisa o próprio processo quando o cache é local (SimpleCache), e escritas feitas por
+    outro processo (outro worker, `flask import-companies`, alterações direto no banco) não passam
+    pelos eventos. Por isso, com `stamp_loader`, a versão é revalidada contra uma marca barata do
+    banco (ex: contagem, maior id, última atualização), acrescida de SNAPSHOT_FORMAT, no máximo a
+    cada `revalidate_interval` segundos: se a marca mudou, a versão é incrementada e os `on_change`
+    são chamados, como após um commit local. Alterações que não mudam a marca só são vistas pelos
+    processos que compartilham o cache com quem fez o commit.
+    """
+
+    def __init__(self, loader, cache, version_key='company_catalog_version', stamp_loader=None,
+                 revalidate_interval=2.0):
+        """
+        Args:
+            loader (callable): Função sem argumentos que retorna as linhas do catálogo na ordem
+                dos campos de CompanyEntry (id, name, code, basic_interest_rate, last_updated, cnpj).
+            cache (flask_caching.Cache): Cache onde a versão do catálogo é armazenada.
+            version_key (str): Chave da versão no cache.
+            stamp_loader (callable): Função sem argumentos que retorna a marca atual do catálogo no
+                banco (qualquer valor comparável por igualdade), ou None para não revalidar.
+            revalidate_interval (float): Intervalo mínimo, em segundos, entre duas consultas da marca
+                em um processo (0 = a cada acesso).
+        """
+        self.loader = loader
+        self.cache = cache
+        self.version_key = version_key
+        self.stamp_loader = stamp_loader
+        self.revalidate_interval = revalidate_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._revalidate_lock = threading.Lock()
+        self._revalidated_at = None
+        self._listeners = []
+
+    def version(self):
+        """Retorna a versão atual do catálogo, criando-a se ainda não existir (ou tiver sido descartada)."""
+        self.revalidate()
+        version = self.cache.get(self.version_key)
+        if version is None:
+            version = self.bump_version()
+        return version
+
+    def revalidate(self, force=False):
+        """
+        Compara a marca do banco com a última vista (guardada no cache, ao lado da versão) e, se mudou,
+        incrementa a versão e chama os `on_change`. Só consulta o banco depois de `revalidate_interval`
+        segundos da última consulta neste processo, a menos que `force` seja verdadeiro; enquanto uma
+        thread consulta, as demais seguem com a versão atual.
+
+        Returns:
+            bool: True se o catálogo foi marcado como alterado.
+        """
+        if self.stamp_loader is None:
+            return False
+        now = time.monotonic()
+        if (not force and self._revalidated_at is not None
+                and now - self._revalidated_at < self.revalidate_interval):
+            return False
+        if not self._revalidate_lock.acquire(blocking=False):
+            return False
+        try:
+            self._revalidated_at = now
+            stamp = (SNAPSHOT_FORMAT, self.stamp_loader())
+            if self.cache.get(self._stamp_key) == stamp:
+                return False
+            self.cache.set(self._stamp_key, stamp, timeout=0)
+            self.bump_version()
+            self._notify()
+            return True
+        finally:
+            self._revalidate_lock.release()
+
+    def bump_version(self):
+        """
+        Marca o catálogo como alterado, forçando a reconstrução dos snapshots em todos os processos.
+        A versão é baseada no relógio, de modo que uma nova versão nunca repete uma anterior,
+        mesmo que a chave tenha sido descartada pelo cache.
+        """
+        version = time.time_ns()
+        self.cache.set(self.version_key, version, timeout=0)  # timeout=0: nunca expira
+        return version
+
+    def snapshot(self):
+        """Retorna o snapshot do catálogo, reconstruindo-o apenas se a versão tiver mudado."""
+        version = self.version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                entries = [CompanyEntry(*row) for row in self.loader()]
+                self._snapshot = CatalogSnapshot(version, entries, previous=self._snapshot)
+            return self._snapshot
+
+    def watch(self, model):
+        """
+        Registra eventos do SQLAlchemy para que qualquer inserção, alteração ou remoção de `model`
+        incremente a versão do catálogo após o commit da transação (nada muda se houver rollback).
+        """
+        def mark_dirty_on_write(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                self.mark_dirty(session)
+
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, mark_dirty_on_write)
+
+        @event.listens_for(Session, 'after_commit')
+        def bump_after_commit(session):
+            if session.info.pop(self._dirty_flag, False):
+                self.bump_version()
+                self._notify()
+
+        @event.listens_for(Session, 'after_rollback')
+        def discard_after_rollback(session):
+            session.info.pop(self._dirty_flag, None)
+
+    def on_change(self, listener):
+        """Registra uma função (sem argumentos) chamada após cada commit que altera o catálogo. Pode ser usado como decorador."""
+        self._listeners.append(listener)
+        return listener
+
+    def mark_dirty(self, session):
+        """Marca a sessão como tendo alterado o catálogo (para escritas que não passam pelos eventos do ORM)."""
+        session.info[self._dirty_flag] = True
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    @property
+    def _dirty_flag(self):
+        return f'{self.version_key}_dirty'
+
+    @property
+    def _stamp_key(self):
+        return f'{self.version_key}_stamp'
@@ -0,0 +1,146 @@
+# company_import.py
+
+import csv
+import json
+from datetime import date
+from itertools import islice
+
+from sqlalchemy import insert, or_
+from werkzeug.datastructures import MultiDict
+
+from rate_history import append_current_rates
+
+# Campos aceitos na importação (os mesmos do formulário de adição de financeira)
+COMPANY_FIELDS = (
+    'name', 'cnpj', 'code', 'basic_interest_rate', 'country',
+    'address_street', 'address_number', 'address_complement', 'address_neighborhood',
+    'address_city', 'address_state', 'address_zipcode',
+    'contact_phone', 'contact_email', 'website_url'
+)
+IMPORT_FORMATS = ('csv', 'json')
+
+
+def read_company_rows(text_stream, input_format='csv'):
+    """
+    Lê as financeiras a importar de um CSV (com cabeçalho) ou de um JSON.
+
+    Args:
+        text_stream: Arquivo em modo texto.
+        input_format (str): 'csv' ou 'json'. O JSON pode ser uma lista de objetos ou um objeto
+            com a lista na chave 'companies'.
+
+    Returns:
+        iterator: Um dicionário por financeira.
+
+    Raises:
+        ValueError: Se o formato for desconhecido ou o conteúdo não puder ser lido.
+    """
+    if input_format not in IMPORT_FORMATS:
+        raise ValueError(f"Formato de importação inválido: {input_format}. Use 'csv' ou 'json'.")
+    if input_format == 'csv':
+        return csv.DictReader(text_stream)
+    try:
+        data = json.load(text_stream)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido: {e}")
+    return iter(parse_company_json(data))
+
+
+def parse_company_json(data):
+    """Extrai a lista de financeiras de um documento JSON já decodificado."""
+    if isinstance(data, dict):
+        data = data.get('companies')
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise ValueError("O JSON deve ser uma lista de financeiras ou um objeto com a chave 'companies'.")
+    return data
+
+
+def validate_company_row(row, form_class):
+    """
+    Valida uma financeira com as mesmas regras do formulário informado (AddCompanyForm).
+
+    Returns:
+        tuple: (dados normalizados, None) se válida, ou (None, erros do formulário).
+    """
+    formdata = MultiDict({
+        field: '' if row.get(field) is None else str(row.get(field)).strip()
+        for field in COMPANY_FIELDS
+    })
+    form = form_class(formdata=formdata, meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    values = {field: getattr(form, field).data for field in COMPANY_FIELDS}
+    # Campos opcionais vazios são gravados como NULL
+    return {field: (value if value != '' else None) for field, value in values.items()}, None
+
+
+def import_companies(rows, model, session, form_class, batch_size=500, history_model=None):
+    """
+    Importa financeiras em lote, dentro da transação corrente da sessão (sem commit).
+
+    Para cada bloco de `batch_size` linhas: valida cada linha com `form_class`, descobre os
+    códigos e CNPJs já cadastrados com uma única consulta e insere as linhas novas com um único
+    INSERT em lote. Duplicatas dentro do próprio arquivo também são descartadas.
+
+    Args:
+        rows (iterable): Dicionários com os campos de COMPANY_FIELDS.
+        model: Modelo FinanceCompany.
+        session: Sessão do SQLAlchemy; o commit (ou rollback) fica a cargo de quem chama.
+        form_class: Formulário WTForms usado na validação (AddCompanyForm).
+        batch_size (int): Número de linhas por bloco.
+        history_model: Modelo do histórico de taxas (opcional). O INSERT em lote não passa pelos
+            eventos do ORM, então a taxa inicial de cada financeira importada é gravada aqui.
+
+    Returns:
+        dict: Relatório com 'inserted' (quantidade), 'invalid' e 'duplicates' (listas com o
+            número da linha e o motivo).
+    """
+    if batch_size <= 0:
+        raise ValueError("O tamanho do bloco deve ser positivo.")
+    report = {'inserted': 0, 'invalid': [], 'duplicates': []}
+    today = date.today()
+    numbered_rows = enumerate(rows, start=1)
+
+    while True:
+        batch = list(islice(numbered_rows, batch_size))
+        if not batch:
+            break
+
+        valid = []
+        for line, row in batch:
+            values, errors = validate_company_row(row, form_class)
+            if errors:
+                report['invalid'].append({'row': line, 'errors': errors})
+            else:
+                valid.append((line, values))
+        if not valid:
+            continue
+
+        # Uma única consulta por bloco para encontrar códigos e CNPJs já cadastrados. Os blocos
+        # anteriores já foram inseridos na mesma transação, então também são encontrados aqui.
+        existing = session.query(model.code, model.cnpj).filter(or_(
+            model.code.in_({values['code'] for _, values in valid}),
+            model.cnpj.in_({values['cnpj'] for _, values in valid})
+        )).all()
+        taken_codes = {code for code, _ in existing}
+        taken_cnpjs = {cnpj for _, cnpj in existing}
+
+        new_rows = []
+        for line, values in valid:
+            if values['code'] in taken_codes:
+                report['duplicates'].append({'row': line, 'field': 'code', 'value': values['code']})
+            elif values['cnpj'] in taken_cnpjs:
+                report['duplicates'].append({'row': line, 'field': 'cnpj', 'value': values['cnpj']})
+            else:
+                # Duplicatas dentro do próprio bloco
+                taken_codes.add(values['code'])
+                taken_cnpjs.add(values['cnpj'])
+                new_rows.append(dict(values, last_updated=today))
+
+        if new_rows:
+            session.execute(insert(model), new_rows)
+            if history_model is not None:
+                append_current_rates(session, model, history_model, [values['code'] for values in new_rows], today)
+            report['inserted'] += len(new_rows)
+
+    return report
@@ -0,0 +1,98 @@
+# company_search.py
+
+import unicodedata
+from bisect import bisect_left, insort
+
+# Caracteres aceitos em um CNPJ digitado com pontuação (ex: '01.234.567/0001-89')
+CNPJ_PUNCTUATION = frozenset('./- ')
+
+
+def normalize(text):
+    """Texto em minúsculas e sem acentos, para comparação: 'Empréstimos Delta' -> 'emprestimos delta'."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ' '.join(''.join(char for char in text if not unicodedata.combining(char)).casefold().split())
+
+
+def only_digits(text):
+    return ''.join(char for char in text or '' if char.isdigit())
+
+
+def entry_terms(entry):
+    """Termos indexados de uma financeira: o nome completo, cada palavra do nome, o código e os dígitos do CNPJ."""
+    name = normalize(entry.name)
+    terms = {name, *name.split(), normalize(entry.code), only_digits(entry.cnpj)}
+    terms.discard('')
+    return terms
+
+
+class PrefixIndex:
+    """
+    Índice de prefixos em memória para a busca de financeiras: uma lista ordenada de (termo, id).
+    Uma busca é um bisect até o primeiro termo com o prefixo seguido da leitura dos termos seguintes,
+    então o custo depende do número de resultados pedidos, não do tamanho do catálogo.
+
+    O índice é imutável (pode ser lido por várias threads); `updated` cria o índice de uma nova
+    versão do catálogo aplicando só as diferenças: apenas os termos das financeiras incluídas,
+    alteradas ou removidas são calculados novamente.
+    """
+    __slots__ = ('_entries', '_terms')
+
+    # Acima desta fração de financeiras alteradas, reconstruir é mais barato que aplicar as diferenças
+    REBUILD_RATIO = 0.25
+
+    def __init__(self, entries, terms=None):
+        """
+        Args:
+            entries (dict): Entradas do catálogo (CompanyEntry) indexadas pelo id.
+            terms (list): Lista ordenada de (termo, id) já calculada (uso interno de `updated`).
+        """
+        self._entries = entries
+        if terms is None:
+            terms = sorted((term, entry.id) for entry in entries.values() for term in entry_terms(entry))
+        self._terms = terms
+
+    def updated(self, entries):
+        """Retorna o índice de `entries` (dict por id), reaproveitando os termos das financeiras inalteradas."""
+        removed = [entry for company_id, entry in self._entries.items() if entries.get(company_id) != entry]
+        added = [entry for company_id, entry in entries.items() if self._entries.get(company_id) != entry]
+        if not removed and not added:
+            return PrefixIndex(entries, self._terms)
+        if len(removed) + len(added) > self.REBUILD_RATIO * max(len(entries), 1):
+            return PrefixIndex(entries)
+        terms = list(self._terms)
+        for entry in removed:
+            for term in entry_terms(entry):
+                position = bisect_left(terms, (term, entry.id))
+                if position < len(terms) and terms[position] == (term, entry.id):
+                    del terms[position]
+        for entry in added:
+            for term in entry_terms(entry):
+                insort(terms, (term, entry.id))
+        return PrefixIndex(entries, terms)
+
+    def search(self, query, limit=10):
+        """
+        Financeiras cujo nome (ou uma palavra dele), código ou CNPJ começa com `query`, sem diferenciar
+        maiúsculas nem acentos. Um CNPJ pode ser digitado com ou sem pontuação.
+
+        Returns:
+            list: Até `limit` entradas, na ordem alfabética do termo encontrado.
+        """
+        prefixes = [normalize(query)]
+        if query and all(char.isdigit() or char in CNPJ_PUNCTUATION for char in query):
+            prefixes.append(only_digits(query))
+        found = {}
+        for prefix in prefixes:
+            if not prefix:
+                continue
+            position = bisect_left(self._terms, (prefix,))
+            while position < len(self._terms) and len(found) < limit:
+                term, company_id = self._terms[position]
+                if not term.startswith(prefix):
+                    break
+                found.setdefault(company_id, None)
+                position += 1
+        return [self._entries[company_id] for company_id in found]
+
+    def __len__(self):
+        return len(self._terms)
@@ -0,0 +1,84 @@
+# conditional_requests.py
+
+import hashlib
+import os
+from functools import wraps
+
+from flask import make_response, request
+from werkzeug.wrappers import Response
+
+
+def make_etag(*parts):
+    """ETag estável e curto a partir das partes informadas (ex: versão do catálogo, ordenação)."""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:24]
+
+
+def source_stamp(*paths):
+    """
+    Marca da versão implantada: hash do conteúdo dos arquivos .py e .html nos diretórios informados.
+    Entra nos ETags calculados sem renderizar a página, para que uma nova versão dos templates ou do
+    código invalide as cópias guardadas pelos navegadores e CDNs. Depende só do conteúdo (não das datas
+    de modificação), então é a mesma em todos os processos e servidores com o mesmo código.
+    """
+    hasher = hashlib.sha1()
+    for path in paths:
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories.sort()  # Ordem de visita estável
+            if '__pycache__' in directory:
+                continue
+            for filename in sorted(filenames):
+                if filename.endswith(('.py', '.html')):
+                    file_path = os.path.join(directory, filename)
+                    hasher.update(os.path.relpath(file_path, path).encode('utf-8'))
+                    with open(file_path, 'rb') as f:
+                        hasher.update(f.read())
+    return hasher.hexdigest()[:16]
+
+
+def _set_headers(response, etag, last_modified, cache_control):
+    if etag:
+        response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    for directive, value in (cache_control or {}).items():
+        setattr(response.cache_control, directive, value)
+
+
+def conditional(validators=None, cache_control=None):
+    """
+    Decorador de rotas GET que responde 304 (Not Modified) quando a cópia do cliente ainda é válida
+    (If-None-Match / If-Modified-Since).
+
+    Com `validators`, uma função sem argumentos que retorna (etag, last_modified) a partir de dados
+    baratos (ex: a versão do catálogo), a verificação é feita antes da rota: um 304 não renderiza nem
+    consulta o cache da página. Sem `validators`, o ETag é o hash do corpo da resposta, calculado depois
+    da rota (útil para páginas já em cache no servidor, como termos e privacidade).
+
+    Deve ficar acima de @cache.cached, para que o 304 dispense também a leitura do cache.
+
+    Args:
+        validators (callable): Retorna (etag, last_modified); qualquer um pode ser None.
+        cache_control (dict): Diretivas de Cache-Control, ex: {'public': True, 'max_age': 3600}.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            etag = last_modified = None
+            if validators is not None:
+                etag, last_modified = validators()
+                probe = Response()
+                _set_headers(probe, etag, last_modified, cache_control)
+                probe = probe.make_conditional(request)
+                if probe.status_code == 304:
+                    return probe
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if etag is None:
+                response.add_etag()
+            _set_headers(response, etag, last_modified, cache_control)
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,86 @@
+# db_engine.py
+
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+
+# Opções de pool que só valem para o QueuePool (não aceitas pelo StaticPool do SQLite em memória)
+POOL_SIZING_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle')
+
+
+def engine_options(uri, options):
+    """
+    Adapta as opções de engine da configuração ao banco de dados da URI: o SQLite em memória usa uma
+    única conexão (StaticPool, definido pelo Flask-SQLAlchemy) e não aceita as opções de tamanho do pool.
+    """
+    options = dict(options or {})
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        for name in POOL_SIZING_OPTIONS:
+            options.pop(name, None)
+    return options
+
+
+def configure_sqlite(engine, journal_mode='WAL', synchronous='NORMAL', busy_timeout=5000):
+    """
+    Aplica os PRAGMAs de cada nova conexão SQLite do engine (não faz nada em outros bancos).
+
+    Em modo WAL os leitores não esperam pela escrita (e vice-versa); synchronous=NORMAL só
+    sincroniza o disco nos checkpoints, o que é seguro em WAL (uma queda de energia pode perder
+    as últimas transações, mas não corrompe o banco). busy_timeout faz uma escrita concorrente
+    esperar pelo bloqueio em vez de falhar de imediato com 'database is locked'.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if journal_mode:
+                cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+            if synchronous:
+                cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        finally:
+            cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia as leituras das rotas marcadas com `read_only` para a réplica de leitura
+    (bind 'replica', se configurado). Escritas (flush) e o restante das rotas usam o banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context()
+                and g.get('_use_read_replica') and REPLICA_BIND in self._db.engines):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Decorador das rotas somente leitura: as consultas feitas em requisições GET vão para a réplica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            g._use_read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def use_primary():
+    """Força o banco principal dentro do bloco (ex: leituras que não toleram o atraso da réplica)."""
+    previous = g.get('_use_read_replica', False)
+    g._use_read_replica = False
+    try:
+        yield
+    finally:
+        g._use_read_replica = previous
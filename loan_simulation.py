@@ -1,11 +1,113 @@
 # loan_simulation.py
 
 import math
+from array import array
 from datetime import date, timedelta
+from fractions import Fraction
+
+import numpy as np
+
+# Motores de cálculo de calculate_amortization: 'float' (ponto flutuante) ou 'cents' (centavos inteiros)
+AMORTIZATION_ENGINES = ('float', 'cents')
+# Regras de arredondamento para centavos do motor 'cents'
+ROUNDING_MODES = ('half_up', 'half_even', 'down', 'up')
+
+
+class AmortizationSchedule:
+    """
+    Tabela de amortização armazenada em colunas (array('d')) em vez de uma lista de dicionários.
+    Mantém a interface de sequência usada pelos templates: len(), iteração e indexação
+    retornam linhas no formato {'month', 'payment', 'interest', 'principal', 'balance'}.
+    O mês de cada linha é implícito (posição + start_month) e não é armazenado.
+    """
+    FIELDS = ('payment', 'interest', 'principal', 'balance')
+    __slots__ = FIELDS + ('start_month',)
+
+    def __init__(self, payment=(), interest=(), principal=(), balance=(), start_month=1):
+        self.start_month = start_month
+        self.payment = array('d', payment)
+        self.interest = array('d', interest)
+        self.principal = array('d', principal)
+        self.balance = array('d', balance)
+        if not len(self.payment) == len(self.interest) == len(self.principal) == len(self.balance):
+            raise ValueError("As colunas da tabela de amortização devem ter o mesmo tamanho.")
+
+    @classmethod
+    def from_batch(cls, batch, index):
+        """Cria a tabela de um empréstimo a partir do resultado de calculate_amortization_batch."""
+        months = int(batch['months'][index])
+        return cls(*(batch[field][index, :months].tobytes() for field in cls.FIELDS))
+
+    def append(self, payment, interest, principal, balance):
+        """Adiciona uma linha (mês) ao final da tabela."""
+        self.payment.append(payment)
+        self.interest.append(interest)
+        self.principal.append(principal)
+        self.balance.append(balance)
+
+    def row(self, index):
+        """Retorna a linha na posição informada como dicionário."""
+        return {
+            'month': self.start_month + index,
+            'payment': self.payment[index],
+            'interest': self.interest[index],
+            'principal': self.principal[index],
+            'balance': self.balance[index],
+        }
+
+    def to_columns(self, ndigits=None):
+        """
+        Serializa a tabela no formato colunar compacto (uma lista por campo), pronto para JSON.
+
+        Args:
+            ndigits (int | None): Casas decimais para arredondar os valores (opcional).
+                Arredondar para centavos reduz bastante o tamanho do JSON gerado.
+        """
+        columns = {'month': list(range(self.start_month, self.start_month + len(self)))}
+        for field in self.FIELDS:
+            values = getattr(self, field)
+            columns[field] = [round(value, ndigits) for value in values] if ndigits is not None else values.tolist()
+        return columns
+
+    def __len__(self):
+        return len(self.payment)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("A tabela de amortização só aceita fatias contínuas.")
+            return AmortizationSchedule(*(getattr(self, field)[start:stop] for field in self.FIELDS),
+                                        start_month=self.start_month + start)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Índice fora da tabela de amortização.")
+        return self.row(index)
+
+    def __repr__(self):
+        return f"<AmortizationSchedule {len(self)} meses>"
+
+
+def _validate_loan_parameters(principal_value, annual_interest_rate, years_value, extra_amortization_value):
+    """Valida os parâmetros de um empréstimo, levantando ValueError se algum for inválido."""
+    if principal_value <= 0:
+        raise ValueError("O valor principal deve ser positivo.")
+    if annual_interest_rate < 0:
+        raise ValueError("A taxa de juros anual não pode ser negativa.")
+    if years_value <= 0:
+        raise ValueError("O prazo em anos deve ser positivo.")
+    if extra_amortization_value < 0:
+        raise ValueError("O valor da amortização extra não pode ser negativo.")
 
 
 def calculate_amortization(principal_value: float, annual_interest_rate: float,
-                           years_value: int, extra_amortization_value: float = 0.0):
+                           years_value: int, extra_amortization_value: float = 0.0,
+                           engine: str = 'float', rounding: str = 'half_up'):
     """
     Calcula a tabela de amortização de um empréstimo usando o método da Tabela Price.
     Permite amortização extra que reduz o saldo devedor e recalcula as parcelas futuras.
@@ -15,10 +117,13 @@ def calculate_amortization(principal_value: float, annual_interest_rate: float,
         annual_interest_rate (float): A taxa de juros anual (ex: 1.2 para 1.2%).
         years_value (int): O prazo do empréstimo em anos.
         extra_amortization_value (float): Valor de amortização extra por mês (opcional, padrão 0.0).
+        engine (str): 'float' (padrão) ou 'cents', que calcula em centavos inteiros, arredondando
+            parcela e juros de cada mês com a regra `rounding` (ver _amortization_rows_cents).
+        rounding (str): Regra de arredondamento do motor 'cents': 'half_up', 'half_even', 'down' ou 'up'.
 
     Returns:
         tuple: Uma tupla contendo:
-            - list: Uma lista de dicionários, cada um representando uma linha da tabela de amortização.
+            - AmortizationSchedule: A tabela de amortização, uma linha por mês.
             - float: Total de juros pagos.
             - float: Total de principal amortizado.
             - float: Total pago (principal + juros).
@@ -27,92 +132,673 @@ def calculate_amortization(principal_value: float, annual_interest_rate: float,
         ValueError: Se os parâmetros de entrada forem inválidos (ex: valor principal negativo, taxa zero).
         Exception: Para outros erros inesperados durante o cálculo.
     """
-    if principal_value <= 0:
-        raise ValueError("O valor principal deve ser positivo.")
-    if annual_interest_rate < 0:
-        raise ValueError("A taxa de juros anual não pode ser negativa.")
-    if years_value <= 0:
-        raise ValueError("O prazo em anos deve ser positivo.")
-    if extra_amortization_value < 0:
-        raise ValueError("O valor da amortização extra não pode ser negativo.")
+    _validate_loan_parameters(principal_value, annual_interest_rate, years_value, extra_amortization_value)
+    rows = _select_rows(engine, rounding)
 
     try:
-        monthly_interest_rate = (annual_interest_rate / 100) / 12
-        total_months = years_value * 12
-
-        current_balance = principal_value
-        schedule = []
+        schedule = AmortizationSchedule()
+        append_row = schedule.append
         total_interest_paid = 0.0
         total_principal_amortized = 0.0
         total_paid_overall = 0.0
 
-        # Cálculo da parcela mensal fixa (Tabela Price)
-        if monthly_interest_rate > 0:
-            # Fórmula da Tabela Price
-            monthly_payment_fixed = principal_value * (
-                        monthly_interest_rate / (1 - math.pow(1 + monthly_interest_rate, -total_months)))
-        else:
-            # Caso a taxa de juros seja zero
-            monthly_payment_fixed = principal_value / total_months if total_months > 0 else 0
+        for _, payment, interest, principal, balance in rows(
+                principal_value, annual_interest_rate, years_value, extra_amortization_value):
+            total_interest_paid += interest
+            total_principal_amortized += principal
+            total_paid_overall += payment
+            append_row(payment, interest, principal, balance)
+
+        return schedule, total_interest_paid, total_principal_amortized, total_paid_overall
+
+    except ValueError as ve:
+        raise ve
+    except Exception as e:
+        # Logar o erro para depuração
+        print(f"Erro inesperado no cálculo da amortização: {e}")
+        raise Exception(f"Erro inesperado ao calcular a amortização: {e}")
+
+
+def iter_amortization(principal_value: float, annual_interest_rate: float,
+                      years_value: int, extra_amortization_value: float = 0.0,
+                      engine: str = 'float', rounding: str = 'half_up'):
+    """
+    Gera as linhas da tabela de amortização uma a uma, à medida que são calculadas,
+    sem manter a tabela inteira em memória (útil para respostas em streaming).
+    Os parâmetros são validados imediatamente, antes da primeira linha ser pedida.
+
+    Args:
+        principal_value (float): O valor principal do empréstimo.
+        annual_interest_rate (float): A taxa de juros anual (ex: 1.2 para 1.2%).
+        years_value (int): O prazo do empréstimo em anos.
+        extra_amortization_value (float): Valor de amortização extra por mês (opcional, padrão 0.0).
+        engine (str): 'float' (padrão) ou 'cents' (ver calculate_amortization).
+        rounding (str): Regra de arredondamento do motor 'cents'.
 
-        current_month = 1
-        while current_balance > 0 and current_month <= total_months:
-            interest_for_month = current_balance * monthly_interest_rate
+    Returns:
+        generator: Dicionários no mesmo formato das linhas de AmortizationSchedule.
 
-            # Amortização principal da parcela fixa
-            principal_payment_fixed = monthly_payment_fixed - interest_for_month
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos.
+    """
+    _validate_loan_parameters(principal_value, annual_interest_rate, years_value, extra_amortization_value)
+    rows = _select_rows(engine, rounding)
+    return (
+        {'month': month, 'payment': payment, 'interest': interest, 'principal': principal, 'balance': balance}
+        for month, payment, interest, principal, balance in rows(
+            principal_value, annual_interest_rate, years_value, extra_amortization_value)
+    )
 
-            # Aplicar amortização extra, garantindo que não amortize mais do que o saldo restante
-            # e que não seja negativo.
-            effective_extra_amortization = min(extra_amortization_value, current_balance - principal_payment_fixed)
-            if effective_extra_amortization < 0:
-                effective_extra_amortization = 0
 
-            # Total de amortização para o mês (principal da parcela fixa + extra)
-            total_amortization_for_month = principal_payment_fixed + effective_extra_amortization
+def _select_rows(engine, rounding):
+    """Retorna o gerador de linhas do motor de cálculo escolhido, validando motor e arredondamento."""
+    if engine not in AMORTIZATION_ENGINES:
+        raise ValueError(f"Motor de cálculo inválido: {engine}. Use 'float' ou 'cents'.")
+    if engine == 'float':
+        return _amortization_rows
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"Regra de arredondamento inválida: {rounding}. Use {', '.join(ROUNDING_MODES)}.")
 
-            # Pagamento total do mês
+    def rows(principal_value, annual_interest_rate, years_value, extra_amortization_value):
+        return _amortization_rows_cents(
+            principal_value, annual_interest_rate, years_value, extra_amortization_value, rounding)
+    return rows
+
+
+def _divide_rounded(numerator, denominator, rounding):
+    """Divisão inteira (numerador >= 0, denominador > 0) com a regra de arredondamento informada."""
+    quotient, remainder = divmod(numerator, denominator)
+    if remainder == 0 or rounding == 'down':
+        return quotient
+    if rounding == 'up':
+        return quotient + 1
+    doubled = 2 * remainder
+    if doubled > denominator or (doubled == denominator and (rounding == 'half_up' or quotient % 2 == 1)):
+        return quotient + 1
+    return quotient
+
+
+def _round_to_cents(value, rounding):
+    """Arredonda um valor em centavos (float, não negativo) para centavos inteiros."""
+    if rounding == 'half_even':
+        return round(value)  # round() do Python arredonda para o par mais próximo
+    if rounding == 'half_up':
+        return math.floor(value + 0.5)
+    if rounding == 'down':
+        return math.floor(value)
+    return math.ceil(value)
+
+
+def _amortization_rows_cents(principal_value, annual_interest_rate, years_value, extra_amortization_value,
+                             rounding='half_up'):
+    """
+    Núcleo do cálculo da Tabela Price em centavos inteiros (mesma lógica de _amortization_rows).
+
+    Saldo, parcela, juros e amortização são inteiros em centavos, de modo que não há acúmulo de
+    erros de ponto flutuante: a soma das amortizações é exatamente o valor principal. A cada mês:
+        - a parcela da Tabela Price é arredondada para centavos com a regra `rounding`;
+        - os juros (saldo * taxa mensal) são calculados com a taxa como fração exata e arredondados
+          com a mesma regra;
+        - a amortização é a diferença entre parcela e juros (mais a amortização extra);
+        - no último mês do prazo a parcela quita exatamente o saldo restante.
+
+    Yields:
+        tuple: (mês, pagamento, juros, amortização, saldo restante) de cada mês, em reais.
+    """
+    # Taxa mensal como fração exata (ex: 1.2% a.a. -> 1/1000 a.m.), para juros sem erro de ponto flutuante
+    monthly_rate = Fraction(str(annual_interest_rate)) / 1200
+    rate_numerator, rate_denominator = monthly_rate.numerator, monthly_rate.denominator
+    rate_float = float(monthly_rate)
+    total_months = years_value * 12
+
+    balance = round(principal_value * 100)
+    extra = round(extra_amortization_value * 100)
+
+    def installment(balance_cents, months):
+        if rate_numerator:
+            return _round_to_cents(balance_cents * (rate_float / (1 - math.pow(1 + rate_float, -months))), rounding)
+        return _divide_rounded(balance_cents, months, rounding)
+
+    monthly_payment = installment(balance, total_months)
+    month = 1
+    while balance > 0 and month <= total_months:
+        interest = _divide_rounded(balance * rate_numerator, rate_denominator, rounding)
+        principal_payment = monthly_payment - interest
+        effective_extra = min(extra, balance - principal_payment)
+        if effective_extra < 0:
+            effective_extra = 0
+        amortization = principal_payment + effective_extra
+        if balance < amortization or month == total_months:
+            amortization = balance  # Último mês: quita exatamente o saldo restante
+        balance -= amortization
+
+        yield month, (interest + amortization) / 100, interest / 100, amortization / 100, balance / 100
+        month += 1
+
+        if balance > 0 and month <= total_months:
+            monthly_payment = installment(balance, total_months - month + 1)
+
+
+def _amortization_rows(principal_value, annual_interest_rate, years_value, extra_amortization_value):
+    """
+    Núcleo do cálculo escalar da Tabela Price com amortização extra.
+
+    Yields:
+        tuple: (mês, pagamento, juros, amortização, saldo restante) de cada mês.
+    """
+    monthly_interest_rate = (annual_interest_rate / 100) / 12
+    total_months = years_value * 12
+
+    current_balance = principal_value
+
+    # Cálculo da parcela mensal fixa (Tabela Price)
+    if monthly_interest_rate > 0:
+        # Fórmula da Tabela Price
+        monthly_payment_fixed = principal_value * (
+                    monthly_interest_rate / (1 - math.pow(1 + monthly_interest_rate, -total_months)))
+    else:
+        # Caso a taxa de juros seja zero
+        monthly_payment_fixed = principal_value / total_months if total_months > 0 else 0
+
+    current_month = 1
+    while current_balance > 0 and current_month <= total_months:
+        interest_for_month = current_balance * monthly_interest_rate
+
+        # Amortização principal da parcela fixa
+        principal_payment_fixed = monthly_payment_fixed - interest_for_month
+
+        # Aplicar amortização extra, garantindo que não amortize mais do que o saldo restante
+        # e que não seja negativo.
+        effective_extra_amortization = min(extra_amortization_value, current_balance - principal_payment_fixed)
+        if effective_extra_amortization < 0:
+            effective_extra_amortization = 0
+
+        # Total de amortização para o mês (principal da parcela fixa + extra)
+        total_amortization_for_month = principal_payment_fixed + effective_extra_amortization
+
+        # Pagamento total do mês
+        monthly_payment_actual = interest_for_month + total_amortization_for_month
+
+        # Ajustar para o último mês se o saldo for menor que o pagamento calculado
+        if current_balance < total_amortization_for_month:
+            total_amortization_for_month = current_balance
             monthly_payment_actual = interest_for_month + total_amortization_for_month
+            current_balance = 0
+        else:
+            current_balance -= total_amortization_for_month
+
+        yield (
+            current_month,
+            monthly_payment_actual,
+            interest_for_month,
+            total_amortization_for_month,
+            max(0.0, current_balance)  # Garante que o saldo não seja negativo
+        )
+        current_month += 1
 
-            # Ajustar para o último mês se o saldo for menor que o pagamento calculado
-            if current_balance < total_amortization_for_month:
-                total_amortization_for_month = current_balance
-                monthly_payment_actual = interest_for_month + total_amortization_for_month
-                current_balance = 0
+        # Recalcular parcela fixa para o saldo remanescente se houver amortização extra
+        # ou se o saldo foi reduzido significativamente.
+        # Isso é crucial para a Tabela Price com amortização extra, a fim de reduzir pagamentos/duração futuros.
+        if current_balance > 0 and current_month <= total_months:
+            remaining_months = total_months - current_month + 1 # Meses restantes incluindo o atual
+            if monthly_interest_rate > 0:
+                # Recalcular pagamento mensal com base no novo saldo e meses restantes
+                monthly_payment_fixed = current_balance * (
+                            monthly_interest_rate / (1 - math.pow(1 + monthly_interest_rate, -remaining_months)))
             else:
-                current_balance -= total_amortization_for_month
-
-            total_interest_paid += interest_for_month
-            total_principal_amortized += total_amortization_for_month
-            total_paid_overall += monthly_payment_actual
-
-            schedule.append({
-                'month': current_month,
-                'payment': monthly_payment_actual,
-                'interest': interest_for_month,
-                'principal': total_amortization_for_month,
-                'balance': max(0.0, current_balance) # Garante que o saldo não seja negativo
-            })
-            current_month += 1
-
-            # Recalcular parcela fixa para o saldo remanescente se houver amortização extra
-            # ou se o saldo foi reduzido significativamente.
-            # Isso é crucial para a Tabela Price com amortização extra, a fim de reduzir pagamentos/duração futuros.
-            if current_balance > 0 and current_month <= total_months:
-                remaining_months = total_months - current_month + 1 # Meses restantes incluindo o atual
-                if monthly_interest_rate > 0:
-                    # Recalcular pagamento mensal com base no novo saldo e meses restantes
-                    monthly_payment_fixed = current_balance * (
-                                monthly_interest_rate / (1 - math.pow(1 + monthly_interest_rate, -remaining_months)))
-                else:
-                    monthly_payment_fixed = current_balance / remaining_months
+                monthly_payment_fixed = current_balance / remaining_months
 
 
-        return schedule, total_interest_paid, total_principal_amortized, total_paid_overall
+def calculate_amortization_summary(principal_value: float, annual_interest_rate: float,
+                                   years_value: int, extra_amortization_value: float = 0.0):
+    """
+    Calcula apenas os totais de um empréstimo (Tabela Price), sem montar a tabela de amortização.
+    Sem amortização extra, usa as fórmulas fechadas da Tabela Price. Com amortização extra,
+    percorre os meses com a mesma lógica de calculate_amortization, mas sem criar nenhum
+    objeto por mês.
 
-    except ValueError as ve:
-        raise ve
-    except Exception as e:
-        # Logar o erro para depuração
-        print(f"Erro inesperado no cálculo da amortização: {e}")
-        raise Exception(f"Erro inesperado ao calcular a amortização: {e}")
+    Args:
+        principal_value (float): O valor principal do empréstimo.
+        annual_interest_rate (float): A taxa de juros anual (ex: 1.2 para 1.2%).
+        years_value (int): O prazo do empréstimo em anos.
+        extra_amortization_value (float): Valor de amortização extra por mês (opcional, padrão 0.0).
+
+    Returns:
+        tuple: Uma tupla contendo:
+            - float: Total de juros pagos.
+            - float: Total de principal amortizado.
+            - float: Total pago (principal + juros).
+            - int: Mês de quitação do empréstimo.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos.
+    """
+    _validate_loan_parameters(principal_value, annual_interest_rate, years_value, extra_amortization_value)
+
+    monthly_interest_rate = (annual_interest_rate / 100) / 12
+    total_months = years_value * 12
+
+    if monthly_interest_rate > 0:
+        monthly_payment = principal_value * (
+                monthly_interest_rate / (1 - math.pow(1 + monthly_interest_rate, -total_months)))
+    else:
+        monthly_payment = principal_value / total_months
+
+    if extra_amortization_value == 0:
+        # Sem amortização extra a parcela é constante durante todo o prazo.
+        total_paid = monthly_payment * total_months
+        return total_paid - principal_value, principal_value, total_paid, total_months
+
+    # Laço enxuto equivalente ao de calculate_amortization, acumulando apenas os totais.
+    pow_ = math.pow
+    rate = monthly_interest_rate
+    extra = extra_amortization_value
+    balance = principal_value
+    total_interest = 0.0
+    total_principal = 0.0
+    total_paid = 0.0
+    month = 0
+    while balance > 0 and month < total_months:
+        month += 1
+        interest = balance * rate
+        principal_payment = monthly_payment - interest
+        effective_extra = balance - principal_payment
+        if extra < effective_extra:
+            effective_extra = extra
+        if effective_extra < 0:
+            effective_extra = 0.0
+        amortization = principal_payment + effective_extra
+        payment = interest + amortization
+        if balance < amortization:
+            amortization = balance
+            payment = interest + amortization
+            balance = 0.0
+        else:
+            balance -= amortization
+
+        total_interest += interest
+        total_principal += amortization
+        total_paid += payment
+
+        if balance > 0 and month < total_months:
+            remaining_months = total_months - month
+            if rate > 0:
+                monthly_payment = balance * (rate / (1 - pow_(1 + rate, -remaining_months)))
+            else:
+                monthly_payment = balance / remaining_months
+
+    return total_interest, total_principal, total_paid, month
+
+
+def _prepare_batch_inputs(principal_values, annual_interest_rates, years_values, extra_amortization_values):
+    """Converte e valida os parâmetros de um lote, retornando arrays NumPy de mesmo tamanho."""
+    principal = np.atleast_1d(np.asarray(principal_values, dtype=np.float64))
+    rates = np.atleast_1d(np.asarray(annual_interest_rates, dtype=np.float64))
+    years = np.atleast_1d(np.asarray(years_values, dtype=np.int64))
+    try:
+        principal, rates, years, extra = np.broadcast_arrays(
+            principal, rates, years, np.asarray(extra_amortization_values, dtype=np.float64))
+    except ValueError:
+        raise ValueError("Os parâmetros do lote devem ter o mesmo tamanho.")
+
+    if np.any(principal <= 0):
+        raise ValueError("O valor principal deve ser positivo.")
+    if np.any(rates < 0):
+        raise ValueError("A taxa de juros anual não pode ser negativa.")
+    if np.any(years <= 0):
+        raise ValueError("O prazo em anos deve ser positivo.")
+    if np.any(extra < 0):
+        raise ValueError("O valor da amortização extra não pode ser negativo.")
+    return principal, rates, years, extra
+
+
+def _price_payment(balance, monthly_rate, months):
+    """Parcela da Tabela Price (vetorizada); usa balance / months quando a taxa é zero."""
+    # As divisões por zero nos ramos descartados pelo np.where são esperadas e ignoradas.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(
+            monthly_rate > 0,
+            balance * (monthly_rate / (1 - np.power(1 + monthly_rate, -months.astype(np.float64)))),
+            balance / months)
+
+
+def _iterate_batch(principal, rates, years, extra):
+    """
+    Núcleo do cálculo em lote: percorre os meses aplicando a lógica de calculate_amortization
+    a todos os empréstimos ao mesmo tempo.
+
+    Yields:
+        tuple: (mês, máscara de empréstimos ativos, pagamento, juros, amortização, novo saldo),
+            com arrays de tamanho n_emprestimos. Valores de empréstimos inativos devem ser ignorados.
+    """
+    monthly_rate = (rates / 100) / 12
+    total_months = years * 12
+    max_months = int(total_months.max()) if total_months.size else 0
+
+    monthly_payment = _price_payment(principal, monthly_rate, total_months)
+    balance = principal.copy()
+    for month in range(1, max_months + 1):
+        active = (balance > 0) & (month <= total_months)
+        if not active.any():
+            break
+
+        interest = balance * monthly_rate
+        principal_payment_fixed = monthly_payment - interest
+        effective_extra = np.minimum(extra, balance - principal_payment_fixed)
+        effective_extra = np.where(effective_extra < 0, 0.0, effective_extra)
+        amortization = principal_payment_fixed + effective_extra
+        payment = interest + amortization
+
+        # Ajuste do último mês: quita exatamente o saldo restante
+        last_month = balance < amortization
+        amortization = np.where(last_month, balance, amortization)
+        payment = np.where(last_month, interest + amortization, payment)
+        new_balance = np.where(last_month, 0.0, balance - amortization)
+
+        yield month, active, payment, interest, amortization, new_balance
+        balance = np.where(active, new_balance, balance)
+
+        # Recalcula a parcela fixa para o saldo remanescente, como no cálculo escalar
+        remaining_months = total_months - month
+        recalculate = active & (balance > 0) & (remaining_months > 0)
+        if recalculate.any():
+            monthly_payment = np.where(
+                recalculate, _price_payment(balance, monthly_rate, remaining_months), monthly_payment)
+
+
+def calculate_amortization_batch(principal_values, annual_interest_rates, years_values,
+                                 extra_amortization_values=0.0):
+    """
+    Calcula as tabelas de amortização de vários empréstimos de uma só vez (Tabela Price).
+    Versão vetorizada de calculate_amortization: cada mês é processado para todos os
+    empréstimos simultaneamente com operações NumPy, reproduzindo exatamente a mesma
+    sequência de operações do cálculo escalar (recálculo da parcela após amortização
+    extra e ajuste do último mês).
+
+    Args:
+        principal_values (array-like): Valores principais dos empréstimos.
+        annual_interest_rates (array-like): Taxas de juros anuais (ex: 1.2 para 1.2%).
+        years_values (array-like): Prazos dos empréstimos em anos.
+        extra_amortization_values (array-like | float): Amortização extra mensal de cada
+            empréstimo (opcional, padrão 0.0). Um escalar é aplicado a todos os empréstimos.
+
+    Returns:
+        dict: Dicionário com as chaves:
+            - 'payment', 'interest', 'principal', 'balance': arrays de formato
+              (n_emprestimos, max_meses). Meses após a quitação ficam zerados.
+            - 'months': array com o número de meses efetivamente pagos por empréstimo.
+            - 'total_interest', 'total_principal', 'total_paid': arrays com os totais
+              de cada empréstimo.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos ou tiverem tamanhos diferentes.
+    """
+    principal, rates, years, extra = _prepare_batch_inputs(
+        principal_values, annual_interest_rates, years_values, extra_amortization_values)
+
+    n_loans = principal.shape[0]
+    max_months = int(years.max()) * 12 if n_loans else 0
+    payments = np.zeros((n_loans, max_months))
+    interests = np.zeros((n_loans, max_months))
+    principals = np.zeros((n_loans, max_months))
+    balances = np.zeros((n_loans, max_months))
+    months_paid = np.zeros(n_loans, dtype=np.int64)
+    total_interest = np.zeros(n_loans)
+    total_principal = np.zeros(n_loans)
+    total_paid = np.zeros(n_loans)
+
+    for month, active, payment, interest, amortization, new_balance in _iterate_batch(principal, rates, years, extra):
+        column = month - 1
+        payments[:, column] = np.where(active, payment, 0.0)
+        interests[:, column] = np.where(active, interest, 0.0)
+        principals[:, column] = np.where(active, amortization, 0.0)
+        balances[:, column] = np.where(active, np.maximum(0.0, new_balance), 0.0)
+
+        total_interest += interests[:, column]
+        total_principal += principals[:, column]
+        total_paid += payments[:, column]
+        months_paid += active
+
+    return {
+        'payment': payments,
+        'interest': interests,
+        'principal': principals,
+        'balance': balances,
+        'months': months_paid,
+        'total_interest': total_interest,
+        'total_principal': total_principal,
+        'total_paid': total_paid,
+    }
+
+
+def calculate_amortization_summary_batch(principal_values, annual_interest_rates, years_values,
+                                         extra_amortization_values=0.0):
+    """
+    Versão em lote de calculate_amortization_summary: calcula apenas os totais de vários
+    empréstimos, sem montar as matrizes mês a mês. Empréstimos sem amortização extra usam as
+    fórmulas fechadas da Tabela Price; os demais passam pelo núcleo vetorizado, acumulando
+    somente os totais.
+
+    Args:
+        principal_values (array-like): Valores principais dos empréstimos.
+        annual_interest_rates (array-like): Taxas de juros anuais (ex: 1.2 para 1.2%).
+        years_values (array-like): Prazos dos empréstimos em anos.
+        extra_amortization_values (array-like | float): Amortização extra mensal de cada
+            empréstimo (opcional, padrão 0.0).
+
+    Returns:
+        dict: Dicionário de arrays com as chaves 'first_payment' (parcela do primeiro mês),
+            'total_interest', 'total_principal', 'total_paid' e 'months' (mês de quitação).
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos ou tiverem tamanhos diferentes.
+    """
+    principal, rates, years, extra = _prepare_batch_inputs(
+        principal_values, annual_interest_rates, years_values, extra_amortization_values)
+
+    monthly_rate = (rates / 100) / 12
+    total_months = years * 12
+    monthly_payment = _price_payment(principal, monthly_rate, total_months)
+
+    # Fórmulas fechadas (corretas para os empréstimos sem amortização extra)
+    first_payment = monthly_payment.copy()
+    total_paid = monthly_payment * total_months
+    total_principal = principal.copy()
+    total_interest = total_paid - principal
+    months_paid = total_months.copy()
+
+    with_extra = np.flatnonzero(extra > 0)
+    if with_extra.size:
+        sub_principal = principal[with_extra]
+        n_loans = with_extra.size
+        sub_first_payment = np.zeros(n_loans)
+        sub_interest = np.zeros(n_loans)
+        sub_principal_paid = np.zeros(n_loans)
+        sub_paid = np.zeros(n_loans)
+        sub_months = np.zeros(n_loans, dtype=np.int64)
+        for month, active, payment, interest, amortization, _ in _iterate_batch(
+                sub_principal, rates[with_extra], years[with_extra], extra[with_extra]):
+            if month == 1:
+                sub_first_payment = np.where(active, payment, 0.0)
+            sub_interest += np.where(active, interest, 0.0)
+            sub_principal_paid += np.where(active, amortization, 0.0)
+            sub_paid += np.where(active, payment, 0.0)
+            sub_months += active
+
+        first_payment[with_extra] = sub_first_payment
+        total_interest[with_extra] = sub_interest
+        total_principal[with_extra] = sub_principal_paid
+        total_paid[with_extra] = sub_paid
+        months_paid[with_extra] = sub_months
+
+    return {
+        'first_payment': first_payment,
+        'total_interest': total_interest,
+        'total_principal': total_principal,
+        'total_paid': total_paid,
+        'months': months_paid,
+    }
+
+
+def calculate_sensitivity_grid(principal_value, annual_interest_rates, years_values, extra_amortization_value=0.0):
+    """
+    Calcula a parcela e os juros totais de um mesmo empréstimo para todas as combinações de taxa e
+    prazo informadas (grade de sensibilidade), em uma única chamada vetorizada.
+
+    Args:
+        principal_value (float): O valor principal do empréstimo.
+        annual_interest_rates (array-like): Taxas de juros anuais das linhas da grade (ex: 1.2 para 1.2%).
+        years_values (array-like): Prazos, em anos, das colunas da grade.
+        extra_amortization_value (float): Valor de amortização extra por mês (opcional).
+
+    Returns:
+        dict: Dicionário com as chaves 'rates' e 'years' (eixos da grade) e os arrays de formato
+            (n_taxas, n_prazos) 'monthly_payment' (parcela do primeiro mês), 'total_interest',
+            'total_paid' e 'months' (mês de quitação).
+
+    Raises:
+        ValueError: Se algum eixo estiver vazio ou os parâmetros de entrada forem inválidos.
+    """
+    rates = np.atleast_1d(np.asarray(annual_interest_rates, dtype=np.float64)).ravel()
+    years = np.atleast_1d(np.asarray(years_values, dtype=np.int64)).ravel()
+    if rates.size == 0 or years.size == 0:
+        raise ValueError("A grade deve ter ao menos uma taxa e um prazo.")
+
+    # Cada célula da grade é um empréstimo do lote: taxas nas linhas, prazos nas colunas
+    rate_grid, years_grid = np.meshgrid(rates, years, indexing='ij')
+    totals = calculate_amortization_summary_batch(
+        principal_value, rate_grid.ravel(), years_grid.ravel(), extra_amortization_value)
+    shape = rate_grid.shape
+    return {
+        'rates': rates,
+        'years': years,
+        'monthly_payment': totals['first_payment'].reshape(shape),
+        'total_interest': totals['total_interest'].reshape(shape),
+        'total_paid': totals['total_paid'].reshape(shape),
+        'months': totals['months'].reshape(shape),
+    }
+
+
+def _prepare_solver_inputs(target_payments, *arrays):
+    """Converte a parcela-alvo e os demais parâmetros do solver em arrays NumPy de mesmo tamanho."""
+    target = np.atleast_1d(np.asarray(target_payments, dtype=np.float64))
+    arrays = [np.asarray(array, dtype=np.float64) for array in arrays]
+    try:
+        target, *arrays = np.broadcast_arrays(target, *arrays)
+    except ValueError:
+        raise ValueError("Os parâmetros do lote devem ter o mesmo tamanho.")
+    if np.any(target <= 0):
+        raise ValueError("A parcela-alvo deve ser positiva.")
+    return (target, *arrays)
+
+
+def solve_max_principal_batch(target_payments, annual_interest_rates, years_values, extra_amortization_values=0.0):
+    """
+    Problema inverso de calculate_amortization: o maior valor principal cuja maior parcela (a do
+    primeiro mês) não ultrapassa a parcela-alvo, para vários empréstimos de uma só vez.
+
+    Com a regra de amortização extra de calculate_amortization, a primeira parcela vale
+    min(PMT(P) + extra, P * (1 + i)), onde PMT(P) = P * fator da Tabela Price. Como as duas
+    expressões são lineares em P, a inversão é fechada mesmo com amortização extra:
+    P = max((alvo - extra) / fator, alvo / (1 + i)).
+
+    Args:
+        target_payments (array-like): Parcelas máximas (ex: renda * comprometimento).
+        annual_interest_rates (array-like): Taxas de juros anuais (ex: 1.2 para 1.2%).
+        years_values (array-like): Prazos em anos.
+        extra_amortization_values (array-like | float): Amortização extra mensal (opcional).
+
+    Returns:
+        numpy.ndarray: Maior valor principal de cada empréstimo.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos ou tiverem tamanhos diferentes.
+    """
+    target, rates, years, extra = _prepare_solver_inputs(
+        target_payments, annual_interest_rates, years_values, extra_amortization_values)
+    if np.any(rates < 0):
+        raise ValueError("A taxa de juros anual não pode ser negativa.")
+    if np.any(years <= 0):
+        raise ValueError("O prazo em anos deve ser positivo.")
+    if np.any(extra < 0):
+        raise ValueError("O valor da amortização extra não pode ser negativo.")
+
+    monthly_rate = (rates / 100) / 12
+    payment_factor = _price_payment(np.ones_like(target), monthly_rate, (years * 12).astype(np.int64))
+    return np.maximum((target - extra) / payment_factor, target / (1 + monthly_rate))
+
+
+def solve_min_term_batch(target_payments, principal_values, annual_interest_rates, extra_amortization_values=0.0,
+                         max_years=30):
+    """
+    Problema inverso de calculate_amortization: o menor prazo, em anos inteiros, cuja primeira
+    parcela não ultrapassa a parcela-alvo, para vários empréstimos de uma só vez.
+
+    A primeira parcela, min(PMT(n) + extra, P * (1 + i)), diminui com o prazo n; o número mínimo
+    de meses sai da inversão fechada da Tabela Price, n = -log(1 - P * i / (alvo - extra)) / log(1 + i).
+
+    Args:
+        target_payments (array-like): Parcelas máximas.
+        principal_values (array-like): Valores principais dos empréstimos.
+        annual_interest_rates (array-like): Taxas de juros anuais (ex: 1.2 para 1.2%).
+        extra_amortization_values (array-like | float): Amortização extra mensal (opcional).
+        max_years (int): Maior prazo aceito, em anos.
+
+    Returns:
+        numpy.ndarray: Menor prazo em anos de cada empréstimo, ou 0 quando nenhum prazo até
+            `max_years` atende à parcela-alvo.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos ou tiverem tamanhos diferentes.
+    """
+    target, principal, rates, extra = _prepare_solver_inputs(
+        target_payments, principal_values, annual_interest_rates, extra_amortization_values)
+    if np.any(principal <= 0):
+        raise ValueError("O valor principal deve ser positivo.")
+    if np.any(rates < 0):
+        raise ValueError("A taxa de juros anual não pode ser negativa.")
+    if np.any(extra < 0):
+        raise ValueError("O valor da amortização extra não pode ser negativo.")
+
+    monthly_rate = (rates / 100) / 12
+    available = target - extra  # Parte da parcela-alvo disponível para a prestação da Tabela Price
+    # As divisões e logaritmos inválidos nos ramos descartados pelo np.where são esperados e ignorados.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        months = np.where(
+            monthly_rate > 0,
+            -np.log1p(-principal * monthly_rate / available) / np.log1p(monthly_rate),
+            principal / available)
+        months = np.where((available > 0) & (available > principal * monthly_rate), months, np.inf)
+    # Quitação no primeiro mês (saldo mais juros) quando a parcela-alvo já cobre esse valor
+    months = np.where(principal * (1 + monthly_rate) <= target, 1.0, months)
+
+    # Tolerância para que arredondamentos de ponto flutuante não acrescentem um mês inteiro
+    years = np.ceil(np.ceil(months - 1e-9) / 12)
+    feasible = np.isfinite(years) & (years <= max_years)
+    return np.where(feasible, years, 0).astype(np.int64)
+
+
+def solve_max_principal(target_payment, annual_interest_rate, years_value, extra_amortization_value=0.0):
+    """
+    Maior valor principal de um empréstimo cuja maior parcela não ultrapassa a parcela-alvo
+    (ver solve_max_principal_batch).
+
+    Returns:
+        float: O maior valor principal.
+    """
+    return float(solve_max_principal_batch(
+        target_payment, annual_interest_rate, years_value, extra_amortization_value)[0])
+
+
+def solve_min_term(target_payment, principal_value, annual_interest_rate, extra_amortization_value=0.0,
+                   max_years=30):
+    """
+    Menor prazo, em anos, de um empréstimo cuja primeira parcela não ultrapassa a parcela-alvo
+    (ver solve_min_term_batch).
+
+    Returns:
+        int | None: O menor prazo em anos, ou None se nenhum prazo até `max_years` for suficiente.
+    """
+    years = int(solve_min_term_batch(
+        target_payment, principal_value, annual_interest_rate, extra_amortization_value, max_years)[0])
+    return years or None
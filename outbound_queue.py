@@ -0,0 +1,322 @@
+# outbound_queue.py
+
+import json
+import logging
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('pending', 'sending', 'sent', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    locked_until REAL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_outbound_messages_status_available ON outbound_messages (status, available_at);
+"""
+
+
+class OutboundQueue:
+    """
+    Fila persistente de mensagens a enviar, em uma tabela SQLite própria.
+
+    Ciclo de vida de uma mensagem: 'pending' -> 'sending' (reservada por um processo por `lease`
+    segundos) -> 'sent', ou de volta a 'pending' com nova tentativa agendada, até 'failed' depois
+    de `max_attempts` tentativas. Reservas vencidas (ex: processo encerrado no meio do envio)
+    voltam a ser entregues, a menos que já tenham esgotado as tentativas ('failed'). Vários
+    processos podem consumir a mesma fila: a reserva é feita dentro de uma transação exclusiva
+    (BEGIN IMMEDIATE).
+    """
+
+    def __init__(self, path, max_attempts=8, backoff_base=30.0, backoff_max=3600.0, lease=120.0):
+        """
+        Args:
+            path (str): Arquivo SQLite da fila (criado se não existir).
+            max_attempts (int): Tentativas antes de marcar a mensagem como 'failed'.
+            backoff_base (float): Espera, em segundos, antes da segunda tentativa; dobra a cada falha.
+            backoff_max (float): Espera máxima entre tentativas, em segundos.
+            lease (float): Tempo, em segundos, pelo qual uma mensagem fica reservada durante o envio.
+
+        Raises:
+            ValueError: Se os parâmetros forem inválidos.
+        """
+        if max_attempts <= 0:
+            raise ValueError("O número máximo de tentativas deve ser positivo.")
+        if backoff_base < 0 or backoff_max < backoff_base or lease <= 0:
+            raise ValueError("Intervalos de nova tentativa ou de reserva inválidos.")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self._local = threading.local()
+        self.wakeup = threading.Event()  # Acorda o worker do próprio processo a cada nova mensagem
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False  # O arquivo e a tabela só são criados no primeiro uso da fila
+
+    def _connection(self):
+        """Uma conexão por thread (conexões sqlite3 não devem ser compartilhadas entre threads)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')  # Leitores não bloqueiam a escrita das requisições
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    connection.executescript(SCHEMA)
+                    self._schema_ready = True
+        return connection
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def enqueue(self, kind, payload):
+        """Grava uma mensagem para envio imediato e retorna o seu id."""
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO outbound_messages (kind, payload, created_at, available_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload), now, now)
+            )
+        self.wakeup.set()
+        return cursor.lastrowid
+
+    def claim(self, limit=10, now=None):
+        """
+        Reserva até `limit` mensagens prontas para envio (mais antigas primeiro). Reservas vencidas
+        que já usaram todas as tentativas são marcadas como 'failed' em vez de reservadas de novo.
+
+        Returns:
+            list: Dicionários com 'id', 'kind', 'payload', 'attempts' (já contando esta) e 'created_at'.
+        """
+        now = time.time() if now is None else now
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE outbound_messages SET status = 'failed', locked_until = NULL, "
+                "last_error = COALESCE(last_error, 'Reserva vencida sem confirmação do envio.') "
+                "WHERE status = 'sending' AND locked_until <= ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            rows = connection.execute(
+                "SELECT id, kind, payload, attempts, created_at FROM outbound_messages "
+                "WHERE (status = 'pending' AND available_at <= ?) OR (status = 'sending' AND locked_until <= ?) "
+                "ORDER BY available_at LIMIT ?",
+                (now, now, limit)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE outbound_messages SET status = 'sending', locked_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(now + self.lease, row['id']) for row in rows]
+            )
+        return [{
+            'id': row['id'],
+            'kind': row['kind'],
+            'payload': json.loads(row['payload']),
+            'attempts': row['attempts'] + 1,
+            'created_at': row['created_at'],
+        } for row in rows]
+
+    def complete(self, message_id, now=None):
+        """Marca a mensagem como enviada."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE outbound_messages SET status = 'sent', sent_at = ?, locked_until = NULL, last_error = NULL "
+                "WHERE id = ?",
+                (time.time() if now is None else now, message_id)
+            )
+
+    def retry_delay(self, attempts):
+        """Espera antes da próxima tentativa: backoff exponencial a partir de backoff_base, limitado a backoff_max."""
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    def fail(self, message_id, attempts, error, now=None):
+        """Registra uma falha de envio: agenda nova tentativa ou, esgotadas as tentativas, marca como 'failed'."""
+        now = time.time() if now is None else now
+        status = 'failed' if attempts >= self.max_attempts else 'pending'
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE outbound_messages SET status = ?, available_at = ?, locked_until = NULL, last_error = ? "
+                "WHERE id = ?",
+                (status, now + self.retry_delay(attempts), str(error)[:1000], message_id)
+            )
+        return status
+
+    def stats(self, latency_window=200, now=None):
+        """
+        Retorna a profundidade da fila e a latência de entrega.
+
+        Returns:
+            dict: Quantidade por status ('pending', 'sending', 'sent', 'failed'), idade da mensagem
+                pendente mais antiga ('oldest_pending_seconds') e latência (criação até envio) das
+                últimas `latency_window` mensagens enviadas: 'latency_p50_seconds', 'latency_p95_seconds'.
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(connection.execute(
+            "SELECT status, COUNT(*) FROM outbound_messages GROUP BY status").fetchall())
+        oldest = connection.execute(
+            "SELECT MIN(created_at) FROM outbound_messages WHERE status IN ('pending', 'sending')").fetchone()[0]
+        latencies = sorted(row[0] for row in connection.execute(
+            "SELECT sent_at - created_at FROM outbound_messages WHERE status = 'sent' "
+            "ORDER BY sent_at DESC LIMIT ?", (latency_window,)))
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+        return dict(
+            counts,
+            oldest_pending_seconds=now - oldest if oldest is not None else 0.0,
+            latency_p50_seconds=percentile(0.50),
+            latency_p95_seconds=percentile(0.95),
+        )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ou ROLLBACK em caso de erro) em uma conexão em modo autocommit."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+class SmtpSender:
+    """Envia as mensagens do formulário de contato por SMTP (uma conexão por lote de mensagens)."""
+
+    def __init__(self, host, port=25, sender=None, recipient=None, username=None, password=None,
+                 use_tls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def build_message(self, kind, payload):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = self.recipient
+        message['Reply-To'] = payload.get('email', '')
+        message['Subject'] = f"[FinanciaAi] Contato de {payload.get('name', '')}"
+        message.set_content(f"Nome: {payload.get('name', '')}\nE-mail: {payload.get('email', '')}\n\n"
+                            f"{payload.get('message', '')}\n")
+        return message
+
+    def send_batch(self, messages):
+        """
+        Envia as mensagens e retorna, para cada uma, None (enviada) ou a exceção da falha.
+        Uma falha de conexão é atribuída a todas as mensagens do lote; um erro ao montar ou enviar
+        uma mensagem (ex: quebra de linha no nome, recusada no cabeçalho Subject) só afeta essa mensagem.
+        """
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                results = []
+                for message in messages:
+                    try:
+                        smtp.send_message(self.build_message(message['kind'], message['payload']))
+                        results.append(None)
+                    except Exception as e:
+                        results.append(e)
+                return results
+        except (OSError, smtplib.SMTPException) as e:
+            return [e] * len(messages)
+
+
+class LogSender:
+    """Substituto do SmtpSender quando nenhum servidor de e-mail está configurado: apenas registra as mensagens."""
+
+    def send_batch(self, messages):
+        for message in messages:
+            logger.info("Mensagem %s (%s) sem servidor de e-mail configurado: %s",
+                        message['id'], message['kind'], message['payload'])
+        return [None] * len(messages)
+
+
+class DeliveryWorker:
+    """Thread que consome a fila: envia as mensagens prontas e agenda novas tentativas nas falhas."""
+
+    def __init__(self, queue, sender, poll_interval=5.0, batch_size=10):
+        self.queue = queue
+        self.sender = sender
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def drain(self):
+        """Envia tudo o que estiver pronto agora. Retorna o número de mensagens processadas."""
+        processed = 0
+        while True:
+            messages = self.queue.claim(self.batch_size)
+            if not messages:
+                return processed
+            for message, error in zip(messages, self.sender.send_batch(messages)):
+                if error is None:
+                    self.queue.complete(message['id'])
+                else:
+                    status = self.queue.fail(message['id'], message['attempts'], error)
+                    log = logger.error if status == 'failed' else logger.warning
+                    log("Falha ao enviar a mensagem %s (tentativa %s, %s): %s",
+                        message['id'], message['attempts'], status, error)
+            processed += len(messages)
+
+    def run(self):
+        while not self._stop.is_set():
+            # Limpa o aviso antes de consumir a fila: uma mensagem gravada durante o drain() deixa o
+            # aviso ligado e é enviada logo em seguida, sem esperar o intervalo de verificação
+            self.queue.wakeup.clear()
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("Erro inesperado no envio de mensagens da fila.")
+            # Espera uma nova mensagem (neste processo) ou o intervalo de verificação
+            self.queue.wakeup.wait(self.poll_interval)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._start_lock:  # Requisições simultâneas não iniciam duas threads
+            if not self.is_running():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name='outbound-queue', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self.queue.wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
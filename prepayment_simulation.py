@@ -0,0 +1,243 @@
+# prepayment_simulation.py
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from loan_simulation import AmortizationSchedule, _validate_loan_parameters
+
+AMORTIZATION_SYSTEMS = ('price', 'sac')
+PREPAYMENT_MODES = ('reduce_payment', 'reduce_term')
+
+# Trecho do empréstimo com regra de pagamento constante: `months` meses a partir de `start_month`,
+# com parcela fixa (Tabela Price) ou amortização fixa (SAC) e, opcionalmente, uma amortização
+# antecipada (lump_sum) aplicada ao fim do último mês do trecho.
+Segment = namedtuple('Segment', (
+    'start_month', 'months', 'opening_balance', 'installment', 'amortization', 'closing_balance',
+    'interest', 'payment', 'lump_sum'
+))
+
+
+def _price_installment(balance, monthly_rate, months):
+    """Parcela da Tabela Price (escalar); usa balance / months quando a taxa é zero."""
+    if monthly_rate > 0:
+        return balance * (monthly_rate / (1 - math.pow(1 + monthly_rate, -months)))
+    return balance / months
+
+
+def _regular_segment(system, start_month, months, balance, monthly_rate, installment, amortization):
+    """Fecha um trecho de `months` meses regulares em forma fechada (sem percorrer os meses)."""
+    if system == 'price':
+        if monthly_rate > 0:
+            growth = math.pow(1 + monthly_rate, months)
+            closing = balance * growth - installment * (growth - 1) / monthly_rate
+        else:
+            closing = balance - installment * months
+        payment = installment * months
+        interest = payment - (balance - closing)
+    else:
+        closing = balance - amortization * months
+        interest = monthly_rate * (months * balance - amortization * months * (months - 1) / 2)
+        payment = amortization * months + interest
+    return Segment(start_month, months, balance, installment, amortization, max(closing, 0.0), interest, payment, 0.0)
+
+
+def _settlement_segment(system, month, balance, monthly_rate):
+    """Último mês: a parcela quita exatamente o saldo restante mais os juros do mês."""
+    interest = balance * monthly_rate
+    return Segment(month, 1, balance, balance + interest if system == 'price' else 0.0,
+                   balance if system == 'sac' else 0.0, 0.0, interest, balance + interest, 0.0)
+
+
+def _months_to_payoff(system, balance, monthly_rate, installment, amortization):
+    """Meses necessários para quitar o saldo mantendo a parcela (Price) ou a amortização (SAC)."""
+    if system == 'price':
+        if monthly_rate > 0:
+            months = -math.log1p(-balance * monthly_rate / installment) / math.log1p(monthly_rate)
+        else:
+            months = balance / installment
+    else:
+        months = balance / amortization
+    # Tolerância para que arredondamentos de ponto flutuante não acrescentem um mês inteiro
+    return max(1, math.ceil(months - 1e-9))
+
+
+def normalize_prepayments(prepayments):
+    """
+    Valida e ordena as amortizações antecipadas, somando as que caem no mesmo mês.
+
+    Args:
+        prepayments (iterable): Pares (mês, valor).
+
+    Returns:
+        list: Pares (mês, valor) em ordem crescente de mês.
+
+    Raises:
+        ValueError: Se algum mês ou valor for inválido.
+    """
+    totals = {}
+    for month, amount in prepayments:
+        if int(month) != month or month < 1:
+            raise ValueError("O mês da amortização antecipada deve ser um inteiro positivo.")
+        if amount <= 0:
+            raise ValueError("O valor da amortização antecipada deve ser positivo.")
+        totals[int(month)] = totals.get(int(month), 0.0) + float(amount)
+    return sorted(totals.items())
+
+
+def build_segments(principal_value, annual_interest_rate, years_value, prepayments=(), system='price',
+                   mode='reduce_payment'):
+    """
+    Divide o empréstimo em trechos entre as amortizações antecipadas. Cada trecho é resolvido em
+    forma fechada, de modo que o custo depende do número de eventos e não do número de meses.
+
+    Depois de cada amortização antecipada, o empréstimo é replanejado:
+        - 'reduce_payment': mantém o prazo e recalcula a parcela (Price) ou a amortização (SAC);
+        - 'reduce_term': mantém a parcela (Price) ou a amortização (SAC) e encurta o prazo.
+
+    Args:
+        principal_value (float): O valor principal do empréstimo.
+        annual_interest_rate (float): A taxa de juros anual (ex: 1.2 para 1.2%).
+        years_value (int): O prazo do empréstimo em anos.
+        prepayments (iterable): Pares (mês, valor) de amortizações antecipadas, aplicadas ao fim do mês.
+        system (str): 'price' (Tabela Price) ou 'sac' (Sistema de Amortização Constante).
+        mode (str): 'reduce_payment' ou 'reduce_term'.
+
+    Returns:
+        list: Trechos (Segment) em ordem cronológica; o último quita o saldo.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos ou se alguma amortização antecipada
+            cair no mês da quitação do empréstimo ou depois dele.
+    """
+    _validate_loan_parameters(principal_value, annual_interest_rate, years_value, 0.0)
+    if system not in AMORTIZATION_SYSTEMS:
+        raise ValueError(f"Sistema de amortização inválido: {system}. Use 'price' ou 'sac'.")
+    if mode not in PREPAYMENT_MODES:
+        raise ValueError(f"Modo de amortização antecipada inválido: {mode}. Use 'reduce_payment' ou 'reduce_term'.")
+
+    monthly_rate = (annual_interest_rate / 100) / 12
+    end_month = years_value * 12  # Mês em que o saldo é quitado com a regra de pagamento atual
+    events = normalize_prepayments(prepayments)
+    event_index = 0
+
+    balance = float(principal_value)
+    installment = _price_installment(balance, monthly_rate, end_month) if system == 'price' else 0.0
+    amortization = balance / end_month if system == 'sac' else 0.0
+    segments = []
+    month = 1
+    while balance > 0 and month <= end_month:
+        if month == end_month:
+            segments.append(_settlement_segment(system, month, balance, monthly_rate))
+            break
+
+        event_month = events[event_index][0] if event_index < len(events) else None
+        last_regular = end_month - 1 if event_month is None else min(event_month, end_month - 1)
+        segment = _regular_segment(system, month, last_regular - month + 1, balance, monthly_rate,
+                                   installment, amortization)
+        balance = segment.closing_balance
+        month = last_regular + 1
+
+        if event_month == last_regular:
+            lump_sum = min(events[event_index][1], balance)
+            event_index += 1
+            segment = segment._replace(lump_sum=lump_sum, closing_balance=balance - lump_sum)
+            balance -= lump_sum
+            if balance <= 1e-9:
+                balance = 0.0
+            elif mode == 'reduce_payment':
+                remaining_months = end_month - last_regular
+                installment = _price_installment(balance, monthly_rate, remaining_months) if system == 'price' else 0.0
+                amortization = balance / remaining_months if system == 'sac' else 0.0
+            else:
+                end_month = last_regular + _months_to_payoff(system, balance, monthly_rate, installment, amortization)
+        segments.append(segment)
+
+    if event_index < len(events):
+        # O último trecho já quita o saldo: uma amortização nesse mês ou depois dele não teria efeito
+        last = segments[-1]
+        payoff_month = last.start_month + last.months - 1
+        raise ValueError(f"A amortização antecipada do mês {events[event_index][0]} não pode ser aplicada: "
+                         f"o empréstimo é quitado no mês {payoff_month}. Informe meses anteriores ao da quitação.")
+    return segments
+
+
+class SegmentedSchedule:
+    """
+    Resultado de um empréstimo com amortizações antecipadas, representado pelos seus trechos.
+    Os totais são somados trecho a trecho; as linhas mês a mês só são geradas por `to_schedule`.
+    """
+
+    def __init__(self, segments, principal_value, annual_interest_rate, system='price'):
+        self.segments = segments
+        self.principal_value = principal_value
+        self.system = system
+        self.monthly_rate = (annual_interest_rate / 100) / 12
+        self.total_interest = sum(segment.interest for segment in segments)
+        self.total_prepaid = sum(segment.lump_sum for segment in segments)
+        self.total_paid = sum(segment.payment for segment in segments) + self.total_prepaid
+        self.total_principal = self.total_paid - self.total_interest
+        first, last = segments[0], segments[-1]
+        self.payoff_month = last.start_month + last.months - 1
+        if system == 'price':
+            self.first_payment = first.installment
+        else:
+            self.first_payment = first.opening_balance * self.monthly_rate + first.amortization
+
+    def summary(self):
+        """Retorna os totais do empréstimo como dicionário."""
+        return {
+            'system': self.system,
+            'first_payment': self.first_payment,
+            'total_interest': self.total_interest,
+            'total_principal': self.total_principal,
+            'total_paid': self.total_paid,
+            'total_prepaid': self.total_prepaid,
+            'payoff_month': self.payoff_month,
+            'segments': len(self.segments),
+        }
+
+    def to_schedule(self):
+        """
+        Expande os trechos em uma tabela mês a mês (AmortizationSchedule). A amortização
+        antecipada entra no pagamento e na amortização do mês em que é feita.
+        """
+        columns = {field: [] for field in AmortizationSchedule.FIELDS}
+        rate = self.monthly_rate
+        for segment in self.segments:
+            steps = np.arange(segment.months)
+            if self.system == 'price':
+                if rate > 0:
+                    growth = np.power(1 + rate, steps)
+                    opening = segment.opening_balance * growth - segment.installment * (growth - 1) / rate
+                else:
+                    opening = segment.opening_balance - segment.installment * steps
+                principal = segment.installment - opening * rate
+            else:
+                opening = segment.opening_balance - segment.amortization * steps
+                principal = np.full(segment.months, segment.amortization)
+            interest = opening * rate
+            principal[-1] += segment.lump_sum
+            columns['payment'].append(interest + principal)
+            columns['interest'].append(interest)
+            columns['principal'].append(principal)
+            columns['balance'].append(np.maximum(opening - principal, 0.0))
+        return AmortizationSchedule(*(np.concatenate(columns[field]).tobytes() if columns[field] else ()
+                                      for field in AmortizationSchedule.FIELDS))
+
+
+def calculate_segmented_amortization(principal_value, annual_interest_rate, years_value, prepayments=(),
+                                     system='price', mode='reduce_payment'):
+    """
+    Calcula um empréstimo pela Tabela Price ou pelo SAC com amortizações antecipadas pontuais
+    (ver build_segments). A tabela mês a mês só é montada se for pedida (SegmentedSchedule.to_schedule).
+
+    Returns:
+        SegmentedSchedule: Trechos e totais do empréstimo.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos.
+    """
+    segments = build_segments(principal_value, annual_interest_rate, years_value, prepayments, system, mode)
+    return SegmentedSchedule(segments, principal_value, annual_interest_rate, system)
@@ -0,0 +1,144 @@
+# queue_logging.py
+
+import atexit
+import logging
+import os
+import random
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+from flask import has_request_context, request
+
+
+def parse_sample_rates(value):
+    """
+    Converte 'index=0.1,terms=0' em {'index': 0.1, 'terms': 0.0} (chaves são os endpoints das rotas).
+
+    Raises:
+        ValueError: Se alguma taxa estiver fora do intervalo [0, 1] ou mal formatada.
+    """
+    if isinstance(value, dict):
+        rates = dict(value)
+    else:
+        rates = {}
+        for item in (value or '').split(','):
+            if not item.strip():
+                continue
+            endpoint, separator, rate = item.partition('=')
+            if not separator:
+                raise ValueError(f"Taxa de amostragem mal formatada: '{item}'. Use endpoint=taxa.")
+            rates[endpoint.strip()] = float(rate)
+    for endpoint, rate in rates.items():
+        if not 0 <= rate <= 1:
+            raise ValueError(f"A taxa de amostragem de '{endpoint}' deve estar entre 0 e 1.")
+    return rates
+
+
+class RouteSamplingFilter(logging.Filter):
+    """
+    Amostra as mensagens abaixo de WARNING emitidas durante uma requisição, com uma taxa por
+    endpoint (ex: {'index': 0.1} mantém cerca de 10% das linhas de acesso da página inicial).
+    Só são amostradas as mensagens dos loggers em `loggers` (e dos seus filhos), como o log de
+    acesso; as demais (ex: registros de auditoria), os avisos e erros e qualquer mensagem fora de
+    uma requisição são sempre mantidos.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0, loggers=()):
+        super().__init__()
+        self.rates = parse_sample_rates(rates)
+        self.default_rate = default_rate
+        self.loggers = tuple(loggers)
+
+    def _sampled_logger(self, name):
+        return any(name == logger or name.startswith(logger + '.') for logger in self.loggers)
+
+    def filter(self, record):
+        if (record.levelno >= logging.WARNING or not has_request_context()
+                or not self._sampled_logger(record.name)):
+            return True
+        rate = self.rates.get(request.endpoint, self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que enfileira o registro sem formatá-lo: a mensagem (msg % args) e o traceback só
+    são montados pela thread do QueueListener. Só é seguro com uma fila em memória (mesmo processo),
+    e os argumentos do log não devem ser alterados depois da chamada.
+
+    O handler é dono do seu QueueListener e o inicia no processo atual no primeiro registro: depois
+    de um fork (ex: gunicorn --preload), a thread do listener só existe no processo pai, então o
+    processo filho cria uma fila e um listener próprios em vez de enfileirar para ninguém.
+    """
+
+    def __init__(self, handlers):
+        """
+        Args:
+            handlers (list): Handlers para os quais o listener entrega os registros.
+        """
+        super().__init__(SimpleQueue())
+        self.target_handlers = list(handlers)
+        self.listener = None
+        self._pid = None
+        atexit.register(self.stop)  # Esvazia a fila antes de sair
+
+    def start(self):
+        """Inicia o listener deste processo, se ainda não estiver rodando, e o retorna."""
+        if self._pid == os.getpid():
+            return self.listener
+        if self._pid is not None:
+            # Processo filho: a fila copiada do pai não tem quem a consuma
+            self.queue = SimpleQueue()
+        self.listener = QueueListener(self.queue, *self.target_handlers, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+        return self.listener
+
+    def stop(self):
+        """Para o listener deste processo, entregando os registros ainda na fila."""
+        if self._pid == os.getpid():
+            self.listener.stop()
+            self._pid = None
+
+    def enqueue(self, record):
+        # Chamado com o lock do handler (reiniciado pelo logging após um fork), um registro por vez
+        if self._pid != os.getpid():
+            self.start()
+        super().enqueue(record)
+
+    def prepare(self, record):
+        return record
+
+
+def setup_queue_logging(sample_rates=None, default_rate=1.0, logger=None, sampled_loggers=()):
+    """
+    Passa os handlers atuais de `logger` (padrão: o logger raiz, configurado por basicConfig) para
+    uma thread em segundo plano: as requisições apenas enfileiram os registros e a escrita em
+    stderr/arquivo, assim como a formatação, acontecem no QueueListener.
+
+    Pode ser chamada antes de um fork: cada processo inicia o próprio listener no primeiro registro
+    (ver DeferredQueueHandler).
+
+    Args:
+        sample_rates (dict | str): Taxas de amostragem por endpoint (ver RouteSamplingFilter).
+        default_rate (float): Taxa dos endpoints não listados.
+        logger (logging.Logger): Logger cujos handlers são movidos para a fila.
+        sampled_loggers (iterable): Nomes dos loggers amostrados (ex: o log de acesso).
+
+    Returns:
+        DeferredQueueHandler: O handler da fila (o listener é parado automaticamente ao encerrar o
+            processo), ou None se o logger já estiver usando a fila.
+    """
+    logger = logger or logging.getLogger()
+    if any(isinstance(handler, DeferredQueueHandler) for handler in logger.handlers):
+        return None  # Já configurado (ex: módulo importado novamente)
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    queue_handler = DeferredQueueHandler(handlers)
+    # O filtro roda na thread da requisição: mensagens descartadas nem chegam à fila
+    queue_handler.addFilter(RouteSamplingFilter(sample_rates, default_rate, sampled_loggers))
+    logger.addHandler(queue_handler)
+    queue_handler.start()
+    return queue_handler
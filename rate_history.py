@@ -0,0 +1,97 @@
+# rate_history.py
+
+from datetime import date
+
+from sqlalchemy import event, exists, func, insert, inspect, literal, select
+
+
+def watch_rate_changes(company_model, history_model):
+    """
+    Registra eventos do SQLAlchemy para que cada financeira inserida, ou cuja taxa seja alterada,
+    ganhe uma linha no histórico de taxas, na mesma transação (vigente a partir da data atual).
+    O histórico é somente de inclusão: alterar ou remover linhas pelo ORM gera um erro.
+
+    Escritas que não passam pelos eventos do ORM (ex: INSERT em lote) devem chamar
+    append_current_rates com os códigos inseridos.
+    """
+    history_table = history_model.__table__
+
+    def append_rate(connection, target):
+        connection.execute(insert(history_table).values(
+            company_id=target.id,
+            annual_rate=target.basic_interest_rate,
+            effective_date=date.today()
+        ))
+
+    @event.listens_for(company_model, 'after_insert')
+    def append_rate_on_insert(mapper, connection, target):
+        append_rate(connection, target)
+
+    @event.listens_for(company_model, 'after_update')
+    def append_rate_on_change(mapper, connection, target):
+        if inspect(target).attrs.basic_interest_rate.history.has_changes():
+            append_rate(connection, target)
+
+    @event.listens_for(history_model, 'before_update')
+    @event.listens_for(history_model, 'before_delete')
+    def reject_history_changes(mapper, connection, target):
+        raise ValueError("O histórico de taxas é somente de inclusão: registre uma nova taxa em vez de alterar.")
+
+
+def append_current_rates(session, company_model, history_model, codes, effective_date=None):
+    """Grava, com um único INSERT ... SELECT, a taxa atual das financeiras com os códigos informados."""
+    effective_date = effective_date or date.today()
+    session.execute(insert(history_model).from_select(
+        ['company_id', 'annual_rate', 'effective_date'],
+        select(company_model.id, company_model.basic_interest_rate, literal(effective_date))
+        .where(company_model.code.in_(codes))
+    ))
+
+
+def backfill_rate_history(session, company_model, history_model):
+    """
+    Cria a primeira linha do histórico das financeiras que ainda não têm nenhuma (ex: cadastradas
+    antes do histórico existir), com a taxa atual vigente desde last_updated. Retorna as linhas criadas.
+    """
+    result = session.execute(insert(history_model).from_select(
+        ['company_id', 'annual_rate', 'effective_date'],
+        select(company_model.id, company_model.basic_interest_rate,
+               func.coalesce(company_model.last_updated, date.today()))
+        .where(~exists().where(history_model.company_id == company_model.id))
+    ))
+    return result.rowcount
+
+
+def rates_as_of(session, history_model, as_of, company_ids=None, max_filter_ids=500):
+    """
+    Resolve, em uma única consulta, a taxa vigente de cada financeira na data `as_of`: a linha do
+    histórico com a maior data de vigência até `as_of` (a mais recente, em caso de empate na data).
+    A consulta percorre o índice (company_id, effective_date).
+
+    Com mais de `max_filter_ids` financeiras, a consulta é feita sem o filtro IN (...) e o resultado é
+    filtrado em Python: uma lista de parâmetros desse tamanho passaria do limite de variáveis do
+    SQLite em catálogos grandes, e percorrer o histórico inteiro custa o mesmo que filtrar quase todo.
+
+    Args:
+        session: Sessão do SQLAlchemy.
+        history_model: Modelo InterestRateHistory.
+        as_of (date): Data de referência.
+        company_ids (iterable): Financeiras consultadas (padrão: todas).
+        max_filter_ids (int): Máximo de ids enviados como parâmetros da consulta.
+
+    Returns:
+        dict: Taxa anual (em %) indexada pelo id da financeira. Financeiras sem taxa registrada
+            até a data (ex: cadastradas depois) ficam de fora.
+    """
+    position = func.row_number().over(
+        partition_by=history_model.company_id,
+        order_by=(history_model.effective_date.desc(), history_model.id.desc())
+    ).label('position')
+    ranked = select(history_model.company_id, history_model.annual_rate, position).where(
+        history_model.effective_date <= as_of)
+    wanted = set(company_ids) if company_ids is not None else None
+    if wanted is not None and len(wanted) <= max_filter_ids:
+        ranked = ranked.where(history_model.company_id.in_(wanted))
+    ranked = ranked.subquery()
+    rows = session.execute(select(ranked.c.company_id, ranked.c.annual_rate).where(ranked.c.position == 1))
+    return {company_id: rate for company_id, rate in rows if wanted is None or company_id in wanted}
@@ -0,0 +1,297 @@
+# request_metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROBES = ('latency', 'sql', 'engine', 'template', 'cache')
+# Faixas (em segundos) dos histogramas de duração
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Chaves dos fragmentos de template do flask_caching ({% cache %}), agrupadas como 'fragment'
+FRAGMENT_KEY_PREFIX = '_template_fragment_cache_'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotônico com rótulos."""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Histograma cumulativo com rótulos, no formato de exposição do Prometheus."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # rótulos -> [contagem por faixa (não cumulativa), soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                label_text = _format_labels(self.label_names, labels, (('le', _format_value(float(bound))),))
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class Gauge:
+    """Medida instantânea calculada no momento da coleta por uma função (ex: estatísticas de cache)."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.function = function  # Retorna um número ou um dicionário {rótulos: valor}
+        self.label_names = tuple(label_names)
+
+    def samples(self):
+        values = self.function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class RequestMetrics:
+    """
+    Instrumentação por rota do aplicativo, exposta no formato texto do Prometheus.
+
+    Sondas (cada uma pode ser desativada em `probes`; sondas desativadas não registram nenhum evento):
+        - 'latency': histograma da duração das requisições e contador por status HTTP;
+        - 'sql': número e tempo das consultas por requisição (eventos de cursor do SQLAlchemy);
+        - 'engine': tempo no motor de amortização (trechos marcados com `timing('engine')` ou `timed`);
+        - 'template': tempo de renderização de cada template Jinja (sinais do Flask);
+        - 'cache': acertos e falhas do backend do flask_caching, por tipo de chave.
+
+    As medidas são agregadas por regra de rota (ex: '/company/<int:id>'), o que mantém a
+    cardinalidade dos rótulos limitada; requisições sem rota correspondente usam 'unmatched'.
+    """
+
+    def __init__(self, app=None, cache=None, probes=PROBES, prefix='financiaai'):
+        self.prefix = prefix
+        self.probes = frozenset()
+        self.metrics = []
+        self._configure_probes(probes)
+        if app is not None:
+            self.init_app(app, cache)
+
+    def _configure_probes(self, probes):
+        if isinstance(probes, str):
+            probes = [probe.strip() for probe in probes.split(',') if probe.strip()]
+        unknown = set(probes) - set(PROBES)
+        if unknown:
+            raise ValueError(f"Sondas desconhecidas: {', '.join(sorted(unknown))}. Use {', '.join(PROBES)}.")
+        self.probes = frozenset(probes)
+
+    def enabled(self, probe):
+        return probe in self.probes
+
+    def register(self, metric):
+        """Adiciona uma métrica (Counter, Histogram ou Gauge) à exposição."""
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, function, label_names=()):
+        """Registra uma medida calculada na coleta (ex: `lambda: simulation_cache.stats()['size']`)."""
+        return self.register(Gauge(f"{self.prefix}_{name}", documentation, function, label_names))
+
+    def init_app(self, app, cache=None, probes=None):
+        if probes is not None:
+            self._configure_probes(probes)
+        name = self.prefix
+        self.requests_total = self.register(Counter(
+            f"{name}_http_requests_total", "Requisições atendidas.", ('route', 'method', 'status')))
+        self.request_duration = self.register(Histogram(
+            f"{name}_http_request_duration_seconds", "Duração das requisições.", ('route', 'method')))
+        self.sql_queries = self.register(Counter(
+            f"{name}_sql_queries_total", "Consultas SQL executadas.", ('route',)))
+        self.sql_duration = self.register(Histogram(
+            f"{name}_sql_duration_seconds", "Tempo total em consultas SQL por requisição.", ('route',)))
+        self.engine_duration = self.register(Histogram(
+            f"{name}_engine_duration_seconds", "Tempo no motor de amortização por requisição.", ('route',)))
+        self.template_duration = self.register(Histogram(
+            f"{name}_template_render_duration_seconds", "Tempo de renderização de templates.", ('route', 'template')))
+        self.cache_requests = self.register(Counter(
+            f"{name}_cache_requests_total", "Leituras do cache do flask_caching.", ('route', 'kind', 'result')))
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if self.enabled('sql'):
+            # Em Engine (classe): cobre todos os engines do aplicativo, inclusive os criados depois
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        if self.enabled('template'):
+            before_render_template.connect(self._before_render, app)
+            template_rendered.connect(self._after_render, app)
+        if self.enabled('cache') and cache is not None:
+            with app.app_context():
+                self._wrap_cache_backend(cache.cache)
+        app.extensions['request_metrics'] = self
+
+    # --- Coleta por requisição ---
+    @staticmethod
+    def _route():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @staticmethod
+    def _current():
+        """Acumuladores da requisição corrente (None fora de uma requisição)."""
+        if not has_app_context():
+            return None
+        return g.get('_request_metrics')
+
+    def _start_request(self):
+        g._request_metrics = {
+            'start': time.perf_counter(),
+            'sql_count': 0,
+            'sql_seconds': 0.0,
+            'engine_seconds': 0.0,
+            'render_starts': [],
+        }
+
+    def _finish_request(self, response):
+        current = self._current()
+        if current is None:
+            return response
+        route = self._route()
+        if self.enabled('latency'):
+            self.request_duration.observe(time.perf_counter() - current['start'], (route, request.method))
+            self.requests_total.inc((route, request.method, str(response.status_code)))
+        if self.enabled('sql'):
+            if current['sql_count']:
+                self.sql_queries.inc((route,), current['sql_count'])
+            self.sql_duration.observe(current['sql_seconds'], (route,))
+        if self.enabled('engine') and current['engine_seconds']:
+            self.engine_duration.observe(current['engine_seconds'], (route,))
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_request_metrics_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_request_metrics_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        current = self._current()
+        if current is not None:
+            current['sql_count'] += 1
+            current['sql_seconds'] += elapsed
+
+    def _before_render(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None:
+            current['render_starts'].append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        current = self._current()
+        if current is None or not current['render_starts']:
+            return
+        elapsed = time.perf_counter() - current['render_starts'].pop()
+        self.template_duration.observe(elapsed, (self._route(), template.name or 'string'))
+
+    def _wrap_cache_backend(self, backend):
+        """Conta acertos e falhas das leituras do backend, agrupadas pelo tipo da chave."""
+        original_get = backend.get
+
+        @wraps(original_get)
+        def get(key, *args, **kwargs):
+            value = original_get(key, *args, **kwargs)
+            if has_request_context():
+                # Tipo da chave: 'view' (páginas), 'simulation', 'company_catalog_version', 'fragment' etc.
+                key = str(key)
+                kind = 'fragment' if key.startswith(FRAGMENT_KEY_PREFIX) else key.split('/', 1)[0].split(':', 1)[0]
+                self.cache_requests.inc((self._route(), kind, 'miss' if value is None else 'hit'))
+            return value
+
+        backend.get = get
+
+    # --- Marcação de trechos do motor ---
+    @contextmanager
+    def timing(self, probe='engine'):
+        """Acumula o tempo do bloco na requisição corrente (ex: `with metrics.timing('engine'):`)."""
+        current = self._current() if self.enabled(probe) else None
+        if current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current[f'{probe}_seconds'] += time.perf_counter() - start
+
+    def timed(self, function, probe='engine'):
+        """Envolve `function` para que o tempo de cada chamada seja acumulado na sonda `probe`."""
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.timing(probe):
+                return function(*args, **kwargs)
+        return wrapper
+
+    # --- Exposição ---
+    def render(self):
+        """Retorna todas as métricas no formato texto do Prometheus (versão 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,140 @@
+# simulation_cache.py
+
+import threading
+from collections import OrderedDict
+
+from loan_simulation import calculate_amortization
+
+
+class SimulationCache:
+    """
+    Cache memoizado de resultados de calculate_amortization.
+
+    A chave é formada pelos parâmetros normalizados da simulação (principal, taxa, prazo e
+    amortização extra) mais o id e a data de atualização (last_updated) da financeira, de modo
+    que uma alteração de taxa invalida automaticamente as entradas antigas.
+
+    Funciona em dois níveis:
+        - Um LRU local, limitado a `maxsize` entradas, que evita até a desserialização.
+        - A instância `flask_caching.Cache` do aplicativo, compartilhada entre os workers do
+          gunicorn quando um backend compartilhado (filesystem, Redis etc.) está configurado.
+    """
+    EVICTION_POLICIES = ('lru', 'fifo')
+
+    def __init__(self, cache, maxsize=512, timeout=600, eviction='lru', key_prefix='simulation',
+                 compute=calculate_amortization):
+        """
+        Args:
+            cache (flask_caching.Cache): Instância de cache do aplicativo.
+            maxsize (int): Número máximo de entradas no nível local (0 desativa o nível local).
+            timeout (int): Tempo de expiração, em segundos, das entradas no cache compartilhado.
+            eviction (str): Política de descarte do nível local: 'lru' ou 'fifo'.
+            key_prefix (str): Prefixo das chaves gravadas no cache compartilhado.
+            compute (callable): Função chamada nas falhas do cache (padrão: calculate_amortization).
+
+        Raises:
+            ValueError: Se a política de descarte ou o tamanho forem inválidos.
+        """
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Política de descarte inválida: {eviction}. Use 'lru' ou 'fifo'.")
+        if maxsize < 0:
+            raise ValueError("O tamanho do cache não pode ser negativo.")
+        self.cache = cache
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.eviction = eviction
+        self.key_prefix = key_prefix
+        self.compute = compute
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(principal_value, annual_interest_rate, years_value, extra_amortization_value):
+        """Normaliza os parâmetros da simulação: valores em centavos, taxa com 6 casas e prazo inteiro."""
+        return (
+            round(float(principal_value), 2),
+            round(float(annual_interest_rate), 6),
+            int(years_value),
+            round(float(extra_amortization_value or 0.0), 2),
+        )
+
+    def make_key(self, company, params):
+        """Monta a chave do cache a partir da financeira e dos parâmetros já normalizados."""
+        principal, rate, years, extra = params
+        last_updated = company.last_updated.isoformat() if company.last_updated else ''
+        return f"{self.key_prefix}:{company.id}:{last_updated}:{principal:.2f}:{rate!r}:{years}:{extra:.2f}"
+
+    def get_or_compute(self, company, principal_value, years_value, extra_amortization_value=0.0):
+        """
+        Retorna o resultado de calculate_amortization para a financeira e os parâmetros informados,
+        reaproveitando um resultado em cache quando existir.
+
+        Returns:
+            tuple: O mesmo retorno de calculate_amortization.
+
+        Raises:
+            ValueError: Se os parâmetros de entrada forem inválidos.
+        """
+        params = self.normalize(principal_value, company.basic_interest_rate, years_value, extra_amortization_value)
+        key = self.make_key(company, params)
+
+        result = self._get_local(key)
+        if result is None:
+            result = self.cache.get(key)
+            if result is not None:
+                self._set_local(key, result)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+
+        with self._lock:
+            self.misses += 1
+        principal, rate, years, extra = params
+        result = self.compute(
+            principal_value=principal,
+            annual_interest_rate=rate,
+            years_value=years,
+            extra_amortization_value=extra
+        )
+        self.cache.set(key, result, timeout=self.timeout)
+        self._set_local(key, result)
+        return result
+
+    def _get_local(self, key):
+        with self._lock:
+            result = self._local.get(key)
+            if result is not None and self.eviction == 'lru':
+                self._local.move_to_end(key)
+            return result
+
+    def _set_local(self, key, result):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._local[key] = result
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def stats(self):
+        """Retorna as estatísticas do cache deste processo (acertos, falhas e ocupação)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'size': len(self._local),
+                'maxsize': self.maxsize,
+                'eviction': self.eviction,
+            }
+
+    def clear(self):
+        """Limpa o nível local e zera as estatísticas. As entradas compartilhadas expiram pelo timeout."""
+        with self._lock:
+            self._local.clear()
+            self.hits = 0
+            self.misses = 0
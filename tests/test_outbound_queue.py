@@ -0,0 +1,60 @@
+# tests/test_outbound_queue.py
+
+import smtplib
+
+import pytest
+
+from outbound_queue import DeliveryWorker, OutboundQueue, SmtpSender
+
+
+class FakeSMTP:
+    """Servidor SMTP falso: guarda as mensagens enviadas em vez de abrir uma conexão."""
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send_message(self, message):
+        FakeSMTP.sent.append(message)
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    FakeSMTP.sent = []
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    return OutboundQueue(str(tmp_path / 'outbox.db'), max_attempts=2, backoff_base=0.0, lease=60.0)
+
+
+def contact(name):
+    return {'name': name, 'email': 'cliente@exemplo.com', 'message': 'Gostaria de uma simulação.'}
+
+
+def test_header_injection_fails_only_its_message(queue):
+    sender = SmtpSender('localhost', sender='site@exemplo.com', recipient='contato@exemplo.com')
+    worker = DeliveryWorker(queue, sender)
+    queue.enqueue('contact', contact('Cliente\r\nBcc: vitima@exemplo.com'))
+    queue.enqueue('contact', contact('Cliente Normal'))
+
+    for _ in range(queue.max_attempts + 1):
+        worker.drain()
+
+    assert len(FakeSMTP.sent) == 1
+    assert 'Cliente Normal' in FakeSMTP.sent[0]['Subject']
+    stats = queue.stats()
+    assert (stats['sent'], stats['failed'], stats['pending'], stats['sending']) == (1, 1, 0, 0)
+
+
+def test_expired_lease_without_attempts_left_is_failed(queue):
+    message_id = queue.enqueue('contact', contact('Cliente'))
+    for attempt in range(queue.max_attempts):
+        # Processo encerrado no meio do envio: a reserva vence sem complete() nem fail()
+        assert [message['id'] for message in queue.claim(now=attempt * 100.0 + 1e10)] == [message_id]
+
+    assert queue.claim(now=1e10 + 1000.0) == []
+    assert queue.stats()['failed'] == 1
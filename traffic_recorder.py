@@ -0,0 +1,154 @@
+# traffic_recorder.py
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Campos removidos das gravações (o token CSRF não serve para a reprodução)
+DROPPED_FIELDS = ('csrf_token',)
+# Campos com dados pessoais: substituídos por valores fictícios, mas válidos para os formulários,
+# para que a reprodução percorra o mesmo caminho de validação.
+REDACTED_FIELDS = {
+    'email': 'usuario@example.com',
+    'contact_email': 'contato@example.com',
+    'contact_phone': '+5500000000000',
+    'message': 'Mensagem omitida na gravação do tráfego.',
+    'password': '',
+}
+# Campos mascarados só em determinados endpoints (ex: 'name' do contato é o nome de uma pessoa,
+# enquanto o 'name' do cadastro de financeiras é o nome da instituição e é mantido).
+ENDPOINT_REDACTED_FIELDS = {
+    'contact': {'name': 'Usuário Anônimo'},
+}
+
+
+def sanitize_fields(fields, redacted=None, dropped=DROPPED_FIELDS):
+    """Remove e mascara os campos sensíveis de um dicionário {campo: valor ou lista de valores}."""
+    redacted = REDACTED_FIELDS if redacted is None else redacted
+    clean = {}
+    for name, value in fields.items():
+        if name in dropped:
+            continue
+        if name in redacted:
+            value = [redacted[name]] * len(value) if isinstance(value, list) else redacted[name]
+        clean[name] = value
+    return clean
+
+
+class TrafficRecorder:
+    """
+    Grava as requisições atendidas em um arquivo JSONL (uma requisição por linha) para reproduzi-las
+    depois como teste de carga (benchmarks/replay_traffic.py).
+
+    Cada registro tem o momento da requisição, método, caminho, regra de rota, query string, campos
+    do formulário ou corpo JSON (sem o token CSRF e com dados pessoais mascarados), status e duração.
+    A requisição só coloca o registro em uma fila limitada, sem bloquear; uma thread serializa e
+    grava os registros em blocos. Com a fila cheia, os registros excedentes são descartados e contados.
+    """
+
+    def __init__(self, app=None, path=None, exclude=('static',), max_queue=10000, flush_interval=1.0,
+                 batch_size=500):
+        """
+        Args:
+            app (Flask): Aplicativo (opcional; ver init_app).
+            path (str): Arquivo JSONL de saída (aberto em modo de acréscimo).
+            exclude (tuple): Endpoints que não são gravados (ex: 'static', 'metrics').
+            max_queue (int): Registros aguardando gravação antes de começar a descartar.
+            flush_interval (float): Intervalo máximo, em segundos, entre gravações no arquivo.
+            batch_size (int): Registros gravados por bloco.
+        """
+        self.path = path
+        self.exclude = frozenset(exclude)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.recorded = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._record)
+        app.extensions['traffic_recorder'] = self
+        self.start()
+
+    def _start_request(self):
+        g._traffic_recorder_start = time.perf_counter()
+
+    def _record(self, response):
+        start = g.pop('_traffic_recorder_start', None)
+        if start is None or request.endpoint in self.exclude:
+            return response
+        redacted = REDACTED_FIELDS
+        if request.endpoint in ENDPOINT_REDACTED_FIELDS:
+            redacted = dict(REDACTED_FIELDS, **ENDPOINT_REDACTED_FIELDS[request.endpoint])
+        entry = {
+            'time': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'route': request.url_rule.rule if request.url_rule is not None else None,
+            'query': sanitize_fields(request.args.to_dict(flat=False), redacted),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+        }
+        if request.is_json:
+            body = request.get_json(silent=True)
+            entry['json'] = sanitize_fields(body, redacted) if isinstance(body, dict) else body
+        elif request.form:
+            entry['form'] = sanitize_fields(request.form.to_dict(flat=False), redacted)
+        if request.files:
+            entry['files'] = sorted(request.files)  # Apenas os nomes dos campos; o conteúdo não é gravado
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+        return response
+
+    # --- Gravação em segundo plano ---
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=5):
+        """Grava o que ainda estiver na fila e encerra a thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _take_batch(self, timeout):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        with open(self.path, 'a', encoding='utf-8', buffering=1024 * 1024) as output:
+            while not (self._stop.is_set() and self._queue.empty()):
+                batch = self._take_batch(self.flush_interval)
+                if batch:
+                    try:
+                        # Um único write por bloco: linhas de processos diferentes não se misturam
+                        output.write(''.join(json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+                                             for entry in batch))
+                        output.flush()
+                        self.recorded += len(batch)
+                    except (OSError, TypeError, ValueError):
+                        logger.exception("Erro ao gravar o tráfego em %s.", self.path)
@@ -0,0 +1,208 @@
+# variable_rate_simulation.py
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from loan_simulation import _price_payment
+
+RATE_MODELS = ('random_walk', 'mean_reverting')
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+BAND_SERIES = ('rate', 'payment', 'balance')
+
+
+def _step_rates(rates, rng, model, volatility, mean_reversion, long_term_rate):
+    """Avança um mês nas trajetórias de taxa anual (em %), sem deixar a taxa ficar negativa."""
+    dt = 1 / 12
+    shocks = rng.standard_normal(rates.shape[0]) * (volatility * np.sqrt(dt))
+    if model == 'mean_reverting':
+        rates = rates + mean_reversion * (long_term_rate - rates) * dt + shocks
+    else:
+        rates = rates + shocks
+    return np.maximum(rates, 0.0)
+
+
+def simulate_paths_chunk(n_paths, seed_sequence, params, band_paths=None):
+    """
+    Simula um bloco de trajetórias de taxa e amortiza todas ao mesmo tempo, mês a mês.
+
+    A cada mês a parcela é recalculada pela Tabela Price com a taxa vigente e o prazo restante,
+    aplicando a mesma regra de amortização extra e de ajuste do último mês de calculate_amortization
+    (com volatilidade zero o resultado coincide com o cálculo de taxa fixa).
+
+    Args:
+        n_paths (int): Número de trajetórias do bloco.
+        seed_sequence (numpy.random.SeedSequence): Semente do bloco.
+        params (dict): Parâmetros da simulação (ver run_variable_rate_simulation).
+        band_paths (int): Trajetórias do bloco cujos valores mês a mês são devolvidos para as faixas
+            de percentis (as primeiras do bloco; padrão: todas).
+
+    Returns:
+        dict: Em 'bands', arrays de formato (meses, band_paths) com a taxa, a parcela e o saldo devedor
+            mês a mês das trajetórias amostradas; 'total_interest' e 'total_paid' de cada trajetória.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    principal = params['principal']
+    total_months = params['years'] * 12
+    extra = params['extra_amortization']
+    band_paths = n_paths if band_paths is None else min(band_paths, n_paths)
+    bands = {name: np.empty((total_months, band_paths)) for name in BAND_SERIES}
+
+    balance = np.full(n_paths, principal)
+    rates = np.full(n_paths, params['initial_rate'])
+    total_interest = np.zeros(n_paths)
+    total_paid = np.zeros(n_paths)
+    for month in range(1, total_months + 1):
+        if month > 1:
+            rates = _step_rates(rates, rng, params['model'], params['volatility'],
+                                params['mean_reversion'], params['long_term_rate'])
+        active = balance > 0
+        monthly_rate = rates / 1200
+        remaining = np.full(n_paths, total_months - month + 1)
+
+        interest = balance * monthly_rate
+        principal_payment_fixed = _price_payment(balance, monthly_rate, remaining) - interest
+        effective_extra = np.maximum(np.minimum(extra, balance - principal_payment_fixed), 0.0)
+        amortization = np.minimum(principal_payment_fixed + effective_extra, balance)  # Ajuste do último mês
+        payment = np.where(active, interest + amortization, 0.0)
+        balance = np.where(active, np.maximum(balance - amortization, 0.0), 0.0)
+
+        total_interest += np.where(active, interest, 0.0)
+        total_paid += payment
+        bands['rate'][month - 1] = rates[:band_paths]
+        bands['payment'][month - 1] = payment[:band_paths]
+        bands['balance'][month - 1] = balance[:band_paths]
+
+    return {
+        'bands': bands,
+        'total_interest': total_interest,
+        'total_paid': total_paid,
+    }
+
+
+def _simulate_chunk_task(args):
+    """Ponto de entrada dos processos do pool (argumentos em uma única tupla)."""
+    return simulate_paths_chunk(*args)
+
+
+def run_variable_rate_simulation(principal_value, initial_rate, years_value, extra_amortization_value=0.0,
+                                 model='random_walk', volatility=1.0, mean_reversion=0.5, long_term_rate=None,
+                                 paths=10000, seed=None, percentiles=DEFAULT_PERCENTILES, chunk_size=5000,
+                                 workers=1, band_paths=5000):
+    """
+    Simulação de Monte Carlo de um empréstimo com taxa variável.
+
+    Gera `paths` trajetórias mensais da taxa anual a partir de `initial_rate`:
+        - 'random_walk': a taxa varia a cada mês com choques normais de desvio `volatility` p.p. ao ano.
+        - 'mean_reverting': como acima, mas atraída para `long_term_rate` com velocidade `mean_reversion`.
+    As trajetórias são processadas em blocos de `chunk_size` (distribuídos em um pool de processos
+    quando `workers` > 1), e cada bloco só mantém em memória os vetores do mês corrente e os valores
+    mês a mês da sua parte da amostra usada nas faixas.
+
+    As faixas mês a mês (taxa, parcela e saldo) são os percentis exatos (numpy.percentile) de uma
+    amostra de no máximo `band_paths` trajetórias, dividida entre os blocos na proporção do seu
+    tamanho: com `paths` <= `band_paths` elas usam todas as trajetórias; acima disso, a memória fica
+    limitada a meses × `band_paths` por série e as faixas passam a ter o erro de amostragem dessa
+    amostra. Os percentis dos totais usam sempre todas as trajetórias. Os resultados são
+    reprodutíveis para a mesma `seed`, independentemente do número de processos.
+
+    Args:
+        principal_value (float): O valor principal do empréstimo.
+        initial_rate (float): Taxa de juros anual inicial (ex: 1.2 para 1.2%).
+        years_value (int): O prazo do empréstimo em anos.
+        extra_amortization_value (float): Valor de amortização extra por mês (opcional).
+        model (str): 'random_walk' ou 'mean_reverting'.
+        volatility (float): Desvio padrão anual da taxa, em pontos percentuais.
+        mean_reversion (float): Velocidade de reversão à média (apenas 'mean_reverting').
+        long_term_rate (float): Taxa de longo prazo (padrão: a taxa inicial).
+        paths (int): Número de trajetórias.
+        seed (int): Semente do gerador aleatório (opcional).
+        percentiles (tuple): Percentis calculados.
+        chunk_size (int): Trajetórias por bloco.
+        workers (int): Número de processos (1 executa no processo atual).
+        band_paths (int): Máximo de trajetórias usadas nas faixas mês a mês.
+
+    Returns:
+        dict: 'percentiles', 'paths', 'months', 'band_paths' (trajetórias usadas nas faixas) e, para
+            'rate', 'payment' e 'balance', arrays de formato (len(percentiles), meses) com as faixas
+            mês a mês; para 'total_interest' e
+            'total_paid', arrays com os percentis (exatos) dos totais e a média em 'mean_total_interest'.
+
+    Raises:
+        ValueError: Se os parâmetros de entrada forem inválidos.
+    """
+    if principal_value <= 0:
+        raise ValueError("O valor principal deve ser positivo.")
+    if initial_rate < 0:
+        raise ValueError("A taxa de juros anual não pode ser negativa.")
+    if years_value <= 0:
+        raise ValueError("O prazo em anos deve ser positivo.")
+    if extra_amortization_value < 0:
+        raise ValueError("O valor da amortização extra não pode ser negativo.")
+    if model not in RATE_MODELS:
+        raise ValueError(f"Modelo de taxa inválido: {model}. Use 'random_walk' ou 'mean_reverting'.")
+    if volatility < 0 or mean_reversion < 0:
+        raise ValueError("A volatilidade e a reversão à média não podem ser negativas.")
+    if paths <= 0 or chunk_size <= 0 or band_paths <= 0:
+        raise ValueError("O número de trajetórias, o tamanho do bloco e a amostra das faixas devem ser positivos.")
+
+    params = {
+        'principal': float(principal_value),
+        'initial_rate': float(initial_rate),
+        'years': int(years_value),
+        'extra_amortization': float(extra_amortization_value),
+        'model': model,
+        'volatility': float(volatility),
+        'mean_reversion': float(mean_reversion),
+        'long_term_rate': float(initial_rate if long_term_rate is None else long_term_rate),
+    }
+    # Uma semente independente por bloco: o resultado não depende de como os blocos são distribuídos
+    starts = range(0, paths, chunk_size)
+    sizes = [min(chunk_size, paths - start) for start in starts]
+    # Parte de cada bloco na amostra das faixas, proporcional ao tamanho (as trajetórias são independentes,
+    # então as primeiras de cada bloco formam uma amostra sem viés)
+    band_paths = min(band_paths, paths)
+    shares = [(start + size) * band_paths // paths - start * band_paths // paths for start, size in zip(starts, sizes)]
+    tasks = zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)), [params] * len(sizes), shares)
+
+    bands = {name: [] for name in BAND_SERIES}
+    total_interest = []
+    total_paid = []
+    for chunk in _run_chunks(tasks, workers):
+        for name in BAND_SERIES:
+            bands[name].append(chunk['bands'][name])
+        total_interest.append(chunk['total_interest'])
+        total_paid.append(chunk['total_paid'])
+
+    total_interest = np.concatenate(total_interest)
+    total_paid = np.concatenate(total_paid)
+    result = {
+        'percentiles': list(percentiles),
+        'paths': paths,
+        'months': params['years'] * 12,
+        'band_paths': band_paths,
+        'total_interest': np.percentile(total_interest, percentiles),
+        'total_paid': np.percentile(total_paid, percentiles),
+        'mean_total_interest': float(total_interest.mean()),
+    }
+    for name in BAND_SERIES:
+        result[name] = np.percentile(np.concatenate(bands[name], axis=1), percentiles, axis=1)
+    return result
+
+
+def _run_chunks(tasks, workers):
+    """Executa os blocos no próprio processo ou em um pool, com no máximo 2 blocos pendentes por processo."""
+    if workers <= 1:
+        for task in tasks:
+            yield _simulate_chunk_task(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_simulate_chunk_task, task))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()